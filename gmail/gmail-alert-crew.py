@@ -1,11 +1,146 @@
 from crewai import Agent, Crew, Process, Task
-from crewai.project import CrewBase, agent, crew, task
+from crewai.project import CrewBase, after_kickoff, agent, before_kickoff, crew, task
+
+from trigger_utils.alerts import (
+    AlertDedupCache,
+    load_incident,
+    merge_alerts,
+    needs_crew,
+    occurrence_note,
+    parse_alert,
+    render_incident,
+    render_summary,
+    restrict_incident,
+)
+from trigger_utils.budget import GMAIL_RULES, enforce_budget
+from trigger_utils.gmail import ALERT_HEADERS, prepare_message
+from trigger_utils.kickoff import run_trigger
+from trigger_utils.payload import dump_payload
 
 
 @CrewBase
 class GmailAlertTrigger:
     """GmailAlertTrigger crew for system alert and notification emails"""
 
+    token_budget = 4000
+    budget_rules = GMAIL_RULES
+
+    header_projection = ALERT_HEADERS
+    summary_file = 'system_alert_summary.md'
+    # Shared by every instance in the process; pass path='alerts.sqlite3' to persist across restarts
+    alert_cache = AlertDedupCache()
+    # 'count' appends an occurrence line to the alert's own summary, 'skip' drops repeats silently
+    repeat_policy = 'count'
+    # Alerts below this level or outside these environments get a template summary with no LLM calls
+    crew_min_level = 'error'
+    crew_environments = ('production', 'prod')
+    # Set by CrewPool(sink=...); triage summaries then go to the sink instead of summary_file
+    output_sink = None
+
+    def triage(self, inputs):
+        """Skips the crew for repeated alerts and renders low-severity ones from a template
+
+        An alert only counts as seen once its summary was written, by the template
+        here or by a successful crew run (remember_alert), so repeats of an alert
+        whose run failed still reach the crew.
+        """
+        self._pending_notes = ''
+        incident = load_incident(inputs.get('crewai_trigger_payload'))
+        if incident is not None:
+            return self._triage_incident(inputs, incident)
+        document = parse_alert(inputs.get('crewai_trigger_payload'))
+        if document is None:
+            return None
+        if self.alert_cache.seen(document) is not None:
+            note, summary = self._repeat(document)
+            if self.repeat_policy == 'count':
+                self._write_summary(summary, 'w')
+            return note
+        if needs_crew(document, self.crew_min_level, self.crew_environments):
+            return None
+        summary_text = render_summary(document)
+        self._write_summary(summary_text, 'w')
+        self.alert_cache.record(document, summary=summary_text)
+        return summary_text
+
+    def _repeat(self, document):
+        """Counts a repeated alert; returns its occurrence note and its own summary with the note appended"""
+        entry = self.alert_cache.record(document, document.get('occurrences', 1))
+        note = occurrence_note(entry, document['headers'].get('Subject', ''))
+        if self.repeat_policy == 'count':
+            entry = self.alert_cache.annotate(document, note)
+        return note, entry.get('summary') or note
+
+    def _triage_incident(self, inputs, incident):
+        """Incident version of triage: repeats become occurrence notes, the rest runs the crew or a template"""
+        notes, summaries, fresh = [], [], []
+        for alert in incident['alerts']:
+            if self.alert_cache.seen(alert) is not None:
+                note, summary = self._repeat(alert)
+                notes.append(note)
+                summaries.append(summary)
+            else:
+                fresh.append(alert)
+        note = ''.join(notes)
+        if not fresh:
+            if self.repeat_policy == 'count':
+                # Alerts summarized together share a summary; each repeat annotated its own copy
+                self._write_summary('\n'.join(dict.fromkeys(summaries)), 'w')
+            return note
+        incident = restrict_incident(incident, fresh)
+        if incident['incident']['needsCrew']:
+            # Written by remember_alert, after the crew has replaced summary_file with its own summary
+            self._pending_notes = note if self.repeat_policy == 'count' else ''
+            inputs['crewai_trigger_payload'] = dump_payload(incident)
+            return None
+        summary_text = render_incident(incident)
+        for alert in fresh:
+            self.alert_cache.record(alert, alert.get('occurrences', 1), summary_text)
+        summary_text += note if self.repeat_policy == 'count' else ''
+        self._write_summary(summary_text, 'w')
+        return summary_text
+
+    def _write_summary(self, text, mode):
+        if self.output_sink is not None:
+            self.output_sink.emit(type(self).__name__, self.summary_file, text, task='triage')
+            return
+        with open(self.summary_file, mode, encoding='utf-8') as summary:
+            summary.write(text)
+
+    def incident_inputs(self, documents):
+        """Kickoff inputs for a batch released by AlertCoalescer, so an alert storm costs one run"""
+        return {'crewai_trigger_payload': dump_payload(
+            merge_alerts(documents, self.crew_min_level, self.crew_environments)
+        )}
+
+    @before_kickoff
+    def prepare_payload(self, inputs):
+        """Decodes the Gmail payload so the analyzer receives plain text instead of base64"""
+        incident = load_incident(inputs.get('crewai_trigger_payload'))
+        self._alerts = incident['alerts'] if incident else [
+            alert for alert in (parse_alert(inputs.get('crewai_trigger_payload')),) if alert is not None
+        ]
+        inputs['crewai_trigger_payload'] = prepare_message(inputs.get('crewai_trigger_payload'), self.header_projection)
+        inputs['crewai_trigger_payload'] = enforce_budget(
+            inputs.get('crewai_trigger_payload'), self.token_budget, self.budget_rules
+        )
+        return inputs
+
+    @after_kickoff
+    def remember_alert(self, result):
+        """Counts the alert (or every alert of an incident) once the crew has written its summary
+
+        Occurrence notes for the repeats of a mixed incident are appended after
+        the crew summary here; written before kickoff, the crew would overwrite them.
+        """
+        summary = getattr(result, 'raw', None) or str(result)
+        for alert in self._alerts:
+            self.alert_cache.record(alert, alert.get('occurrences', 1), summary)
+        notes, self._pending_notes = getattr(self, '_pending_notes', ''), ''
+        if notes:
+            self._write_summary(notes, 'a')
+        return result
+
     @agent
     def alert_analyzer(self) -> Agent:
         return Agent(
@@ -28,16 +163,23 @@ class GmailAlertTrigger:
     def alert_analysis_task(self) -> Task:
         return Task(
             description="""
-            The payload contains a Gmail message with system alert content with the following structure:
-            - result.id: Message ID
-            - result.payload.headers[]: Array with alert-specific headers including:
+            The payload contains a pre-parsed Gmail message with system alert content with the following structure:
+            - id: Message ID
+            - receivedAt: ISO timestamp when Gmail received the alert
+            - headers: Object mapping header names to values, including alert-specific headers:
               - "Subject": Alert description and error type
               - "From": Alert service (e.g., "AlertService <noreply@alertservice.com>")
               - "X-AlertService-Project": Project/service name
               - "X-Alert-Type": Alert category (if present)
               - "X-Alert-Level": Severity level (if present)
-            - result.payload.parts[]: Message body with alert details
-            - result.snippet: Brief alert summary
+            - body: Already decoded message body with alert details (no base64 decoding needed)
+            - snippet: Brief alert summary
+
+            During an alert storm the payload is instead a coalesced incident:
+            - incident: group (project), alertEmails, distinctAlerts, firstReceivedAt, lastReceivedAt
+            - alerts[]: One entry per distinct alert with the fields above plus
+              occurrences and messageIds of every email that repeated it
+            Analyze a coalesced incident as a single incident covering all of its alerts.
 
             IMPORTANT: Extract the following information from the payload:
 
@@ -54,7 +196,7 @@ class GmailAlertTrigger:
                - Alert source and monitoring system
 
             3. Alert Content Analysis:
-               - Decoded message body with error details
+               - Message body with error details
                - Stack traces or technical details
                - Affected components and services
                - Recovery actions or troubleshooting info
@@ -106,6 +248,9 @@ class GmailAlertTrigger:
 
             IMPORTANT: Ensure the alert type and affected system are displayed prominently at the top
             of your summary as these are critical for incident response.
+
+            For a coalesced incident, write one incident summary: list each distinct alert with its
+            occurrence count and time range instead of repeating the summary per email.
             """,
             expected_output="""
             A critical system alert summary in markdown format containing:
@@ -130,7 +275,7 @@ class GmailAlertTrigger:
             Format this as an urgent incident response document with clear action items.
             """,
             agent=self.alert_summarizer,
-            output_file='system_alert_summary.md'
+            output_file=self.summary_file
         )
 
     @crew
@@ -144,7 +289,7 @@ class GmailAlertTrigger:
         )
 
 if __name__ == "__main__":
-    crew = GmailAlertTrigger().crew()
+    trigger = GmailAlertTrigger()
     # Example payload from new-email-payload-1.json (system alert)
     crewai_trigger_payload = """{
         "result": {
@@ -180,4 +325,4 @@ if __name__ == "__main__":
             }
         }
     }"""
-    crew.kickoff({'crewai_trigger_payload': crewai_trigger_payload})
+    run_trigger(trigger, {'crewai_trigger_payload': crewai_trigger_payload})
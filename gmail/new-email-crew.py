@@ -1,17 +1,59 @@
 from crewai import Agent, Crew, Process, Task
-from crewai.project import CrewBase, agent, crew, task
+from crewai.project import CrewBase, after_kickoff, agent, before_kickoff, crew, task
+
+from trigger_utils.budget import GMAIL_RULES, enforce_budget
+from trigger_utils.gmail import MESSAGE_HEADERS, load_message, prepare_message
+from trigger_utils.kickoff import run_trigger
+from trigger_utils.threads import ThreadStore
 
 
 @CrewBase
 class GmailNewThreadTrigger:
     """GmailNewThreadTrigger crew"""
 
+    token_budget = 4000
+    budget_rules = GMAIL_RULES
+
+    header_projection = MESSAGE_HEADERS
+    # Shared by every instance in the process; pass path='threads.sqlite3' to persist across restarts
+    thread_store = ThreadStore()
+
+    def triage(self, inputs):
+        """Returns the stored thread summary when this exact message was already summarized"""
+        document = load_message(inputs.get('crewai_trigger_payload'))
+        if document is not None and self.thread_store.is_summarized(document):
+            return self.thread_store.get(document['threadId'])['summary']
+        return None
+
+    @before_kickoff
+    def prepare_payload(self, inputs):
+        """Decodes the Gmail payload and, for known threads, sends only the new message with the previous summary"""
+        self._thread_message = None
+        inputs['crewai_trigger_payload'] = prepare_message(
+            inputs.get('crewai_trigger_payload'), self.header_projection, self._thread_delta
+        )
+        inputs['crewai_trigger_payload'] = enforce_budget(
+            inputs.get('crewai_trigger_payload'), self.token_budget, self.budget_rules
+        )
+        return inputs
+
+    def _thread_delta(self, document):
+        self._thread_message = (document.get('threadId'), document.get('id'))
+        return self.thread_store.incremental_document(document)
+
+    @after_kickoff
+    def remember_summary(self, result):
+        """Stores the summary as the baseline for the next update of the same thread"""
+        if self._thread_message:
+            self.thread_store.remember(*self._thread_message, result.raw)
+        return result
+
     @agent
     def email_analyzer(self) -> Agent:
         return Agent(
             role="Gmail Payload Parser and Analyzer",
-            goal="Parse Gmail payload data to extract header information (sender from 'From' header, subject from 'Subject' header) and decode message body content for analysis",
-            backstory="You're an expert at parsing Gmail API payload structures and email data formats. You excel at navigating complex JSON structures to extract header information from the headers array, decoding base64 encoded message bodies, and understanding different MIME types. You can distinguish between plain text and HTML content and extract meaningful information from both header fields and message body parts.",
+            goal="Parse Gmail payload data to extract header information (sender from 'From' header, subject from 'Subject' header) and analyze the decoded message body content",
+            backstory="You're an expert at parsing Gmail API payload structures and email data formats. You excel at navigating complex JSON structures to extract header information from email headers, reading decoded message bodies, and understanding different MIME types. You can distinguish between plain text and HTML content and extract meaningful information from both header fields and message body parts.",
             verbose=True
         )
 
@@ -28,24 +70,25 @@ class GmailNewThreadTrigger:
     def email_analysis_task(self) -> Task:
         return Task(
             description="""
-            The payload contains a Gmail message with the following structure:
-            - result.id: Message ID
-            - result.payload.headers[]: Array of email headers with name/value pairs
-            - result.payload.parts[]: Array of message body parts (text/plain, text/html)
+            The payload contains a pre-parsed Gmail message with the following structure:
+            - id: Message ID
+            - threadId: Conversation thread ID
+            - headers: Object mapping email header names to values
+            - bodyMimeType: MIME type the body was taken from (text/plain preferred over text/html)
+            - body: Already decoded message body as plain text (HTML-only messages are converted to text)
+            - attachments[]: Attachment filenames and sizes (if any)
 
             IMPORTANT: Extract the following information from the payload structure:
 
-            1. From the headers array (result.payload.headers), find headers with these names:
+            1. From the headers object, read these headers:
                - "From": sender email address and name
                - "Subject": email subject line
                - "To": recipient information
                - "Date": email timestamp
                - "Message-ID": unique message identifier
 
-            2. From the parts array (result.payload.parts), extract and decode message body:
-               - Find parts with mimeType "text/plain" or "text/html"
-               - Decode the base64 encoded body.data content to readable text
-               - Prefer text/plain over text/html for readability
+            2. From the body field, read the message content:
+               - The body is already decoded plain text, do not attempt any base64 decoding
 
             3. Analyze the decoded message content for:
                - Main purpose/intent of the email
@@ -55,16 +98,21 @@ class GmailNewThreadTrigger:
                - Important dates, numbers, or references
 
             Make sure to clearly distinguish between header information and decoded message body content.
+
+            If the payload instead contains "previousSummary", it is an update to a thread that was
+            already summarized: "newMessages" holds only the messages added since then (same structure
+            as above). Analyze just those new messages and state how they change the thread relative
+            to the previous summary; do not re-analyze the earlier conversation.
             """,
             expected_output="""
             A structured analysis containing:
             - Email Headers:
-              * Message ID (from result.id): [Gmail message ID]
+              * Message ID (from id): [Gmail message ID]
               * From (from "From" header): [sender email address and name]
               * Subject (from "Subject" header): [email subject line]
               * To (from "To" header): [recipient information]
               * Date (from "Date" header): [email timestamp]
-            - Decoded Message Body: [full decoded email text from parts array]
+            - Decoded Message Body: [full email text from the body field]
             - Main purpose/intent of the email
             - Key information extracted from the content
             - Action items identified
@@ -81,18 +129,21 @@ class GmailNewThreadTrigger:
             Based on the email analysis from the parsed Gmail payload, create a comprehensive summary that includes:
             - The sender information extracted from the "From" header in the payload
             - The subject line extracted from the "Subject" header in the payload
-            - The decoded and analyzed message content from the email body parts
+            - The analyzed message content from the email body
             - Key points and important information from the analysis
             - Any action items or next steps identified
             - Assessment of priority/urgency
 
+            For a thread update, produce the updated thread summary: merge the previous summary with
+            the new messages, keeping the sender and subject of the latest message at the top.
+
             IMPORTANT: Ensure the sender (from "From" header) and subject (from "Subject" header)
             are displayed prominently at the top of your summary. These are critical pieces of
             information that must be clearly visible for quick email identification.
             """,
             expected_output="""
             A well-structured email summary in markdown format containing:
-            - **Message ID**: Gmail message ID (from result.id in payload)
+            - **Message ID**: Gmail message ID (from id in payload)
             - **From**: Sender email address and name (extracted from "From" header)
             - **Subject**: The email subject line (extracted from "Subject" header)
             - **To**: Recipient information (extracted from "To" header)
@@ -121,6 +172,6 @@ class GmailNewThreadTrigger:
         )
 
 if __name__ == "__main__":
-    crew = GmailNewThreadTrigger().crew()
+    trigger = GmailNewThreadTrigger()
     crewai_trigger_payload = "PUT YOUR TRIGGER PAYLOAD HERE"
-    crew.kickoff({'crewai_trigger_payload': crewai_trigger_payload})
+    run_trigger(trigger, {'crewai_trigger_payload': crewai_trigger_payload})
@@ -1,11 +1,56 @@
 from crewai import Agent, Crew, Process, Task
-from crewai.project import CrewBase, agent, crew, task
+from crewai.project import CrewBase, after_kickoff, agent, before_kickoff, crew, task
+
+from trigger_utils.budget import CALENDAR_RULES, enforce_budget
+from trigger_utils.google_calendar import EVENTS, delta_note, load_event, prepare_event
+from trigger_utils.kickoff import run_trigger
 
 
 @CrewBase
 class GoogleCalendarEventTrigger:
     """GoogleCalendarEventTrigger crew"""
 
+    token_budget = 4000
+    budget_rules = CALENDAR_RULES
+    # Shared by the calendar crews of the process; use EventLifecycle(path='calendar.sqlite3') to persist it
+    lifecycle = EVENTS
+
+    def triage(self, inputs):
+        """Answers started, ended and repeated deliveries of an already analyzed event with a delta note"""
+        event = load_event(inputs.get('crewai_trigger_payload'))
+        if event is None:
+            return None
+        transition = self.lifecycle.transition(event)
+        if transition['run']:
+            return None
+        self.lifecycle.remember(event)
+        return delta_note(event, transition)
+
+    @before_kickoff
+    def prepare_payload(self, inputs):
+        """Adds computed event facts (and the changes of an updated event) and trims the payload to the token budget"""
+        raw = inputs.get('crewai_trigger_payload')
+        self._event = load_event(raw)
+        transition = self.lifecycle.transition(self._event) if self._event is not None else None
+
+        def transform(document):
+            if transition and transition.get('changes'):
+                document['lifecycle'] = {'transition': transition['transition'], 'changes': transition['changes'],
+                                         'previousUpdatedAt': transition['since']}
+            return document
+
+        inputs['crewai_trigger_payload'] = enforce_budget(
+            prepare_event(raw, transform), self.token_budget, self.budget_rules
+        )
+        return inputs
+
+    @after_kickoff
+    def remember_event(self, result):
+        """Stores the event state the next delivery for this event is compared with"""
+        if self._event is not None:
+            self.lifecycle.remember(self._event)
+        return result
+
     @agent
     def calendar_event_analyzer(self) -> Agent:
         return Agent(
@@ -38,6 +83,15 @@ class GoogleCalendarEventTrigger:
             - result.location: Event location (if specified)
             - result.description: Event description/details
             - result.status: Event status (confirmed, tentative, cancelled)
+            - facts: Values computed from the event: startUtc/startLocal, endUtc/endLocal (in the event's
+              timeZone), durationMinutes (durationDays for all-day events), phase (upcoming, in progress,
+              ended), recurring, organizer and attendees (total and counts per response status).
+              These are exact; copy them instead of recomputing and spend the analysis on the
+              qualitative parts.
+
+            For an update of an event analyzed before, "lifecycle" names the transition and maps each
+            changed field (time, title, location, attendee list, ...) to its "before" and "after" values;
+            "previousUpdatedAt" is the time of the previous update. Lead the analysis with what changed.
 
             IMPORTANT: Extract the following information from the payload structure:
 
@@ -50,12 +104,12 @@ class GoogleCalendarEventTrigger:
             2. Date and Time Information:
                - Start date/time (result.start.dateTime or result.start.date)
                - End date/time (result.end.dateTime or result.end.date)
-               - Timezone information (result.start.timeZone, result.end.timeZone)
-               - Duration calculation
+               - Timezone information (facts.timeZone, facts.startLocal, facts.endLocal)
+               - Duration (facts.durationMinutes)
 
             3. People and Organization:
                - Organizer information (result.organizer)
-               - Attendees list (result.attendees) with response status
+               - Attendees list (result.attendees) with response status; counts from facts.attendees
                - Creator information (result.creator)
 
             4. Event Details:
@@ -80,7 +134,7 @@ class GoogleCalendarEventTrigger:
             - Schedule Details:
               * Start: [start date/time with timezone]
               * End: [end date/time with timezone]
-              * Duration: [calculated duration]
+              * Duration: [facts.durationMinutes]
               * Timezone: [timezone information]
             - Participants:
               * Organizer: [organizer name and email]
@@ -148,6 +202,6 @@ class GoogleCalendarEventTrigger:
         )
 
 if __name__ == "__main__":
-    crew = GoogleCalendarEventTrigger().crew()
+    trigger = GoogleCalendarEventTrigger()
     crewai_trigger_payload = "PUT YOUR TRIGGER PAYLOAD HERE"
-    crew.kickoff({'crewai_trigger_payload': crewai_trigger_payload})
+    run_trigger(trigger, {'crewai_trigger_payload': crewai_trigger_payload})
@@ -1,11 +1,56 @@
 from crewai import Agent, Crew, Process, Task
-from crewai.project import CrewBase, agent, crew, task
+from crewai.project import CrewBase, after_kickoff, agent, before_kickoff, crew, task
+
+from trigger_utils.budget import CALENDAR_RULES, enforce_budget
+from trigger_utils.google_calendar import EVENTS, delta_note, load_event, prepare_event
+from trigger_utils.kickoff import run_trigger
 
 
 @CrewBase
 class GoogleCalendarMeetingTrigger:
     """GoogleCalendarMeetingTrigger crew for meeting events with attendees and conference data"""
 
+    token_budget = 4000
+    budget_rules = CALENDAR_RULES
+    # Shared by the calendar crews of the process; use EventLifecycle(path='calendar.sqlite3') to persist it
+    lifecycle = EVENTS
+
+    def triage(self, inputs):
+        """Answers started, ended and repeated deliveries of an already analyzed event with a delta note"""
+        event = load_event(inputs.get('crewai_trigger_payload'))
+        if event is None:
+            return None
+        transition = self.lifecycle.transition(event)
+        if transition['run']:
+            return None
+        self.lifecycle.remember(event)
+        return delta_note(event, transition)
+
+    @before_kickoff
+    def prepare_payload(self, inputs):
+        """Adds computed event facts (and the changes of an updated event) and trims the payload to the token budget"""
+        raw = inputs.get('crewai_trigger_payload')
+        self._event = load_event(raw)
+        transition = self.lifecycle.transition(self._event) if self._event is not None else None
+
+        def transform(document):
+            if transition and transition.get('changes'):
+                document['lifecycle'] = {'transition': transition['transition'], 'changes': transition['changes'],
+                                         'previousUpdatedAt': transition['since']}
+            return document
+
+        inputs['crewai_trigger_payload'] = enforce_budget(
+            prepare_event(raw, transform), self.token_budget, self.budget_rules
+        )
+        return inputs
+
+    @after_kickoff
+    def remember_event(self, result):
+        """Stores the event state the next delivery for this event is compared with"""
+        if self._event is not None:
+            self.lifecycle.remember(self._event)
+        return result
+
     @agent
     def meeting_analyzer(self) -> Agent:
         return Agent(
@@ -39,29 +84,41 @@ class GoogleCalendarMeetingTrigger:
               - responseStatus: accepted/declined/needsAction
               - organizer: true if organizer
               - displayName: Attendee name (optional)
-            - result.conferenceData: Conference/video call information:
-              - conferenceSolution.name: Platform name (e.g., "Zoom Meeting")
-              - entryPoints[]: Array of access methods (video, phone, etc.)
             - result.organizer: Meeting organizer information
             - result.recurringEventId: If part of recurring series
+            - facts: Values computed from the event, exact and to be copied instead of recomputed:
+              - startUtc/startLocal, endUtc/endLocal: Times in UTC and in the event's timeZone
+              - durationMinutes: Meeting length
+              - phase: upcoming, in progress or ended; recurring: part of a series
+              - attendees: total, accepted, tentative, declined, needsAction, optional, rooms,
+                responseRate and acceptanceRate
+              - conference: platform (e.g., "Zoom Meeting"), entryPointTypes and entryPoints
+                (type, uri, meetingCode, passcode, regionCode)
+
+            Take counts, durations and entry points from facts; spend the analysis on the qualitative
+            parts (purpose, key participants, engagement and collaboration).
+
+            For an update of an event analyzed before, "lifecycle" names the transition and maps each
+            changed field (time, title, location, attendee list, ...) to its "before" and "after" values;
+            "previousUpdatedAt" is the time of the previous update. Lead the analysis with what changed.
 
             IMPORTANT: Extract the following information:
 
             1. Meeting Basic Information:
                - Event ID, title, description
-               - Date/time with timezone
+               - Date/time with timezone (facts.startLocal, facts.endLocal)
                - Organizer information
 
             2. Attendee Analysis:
-               - Total attendee count
-               - Response status breakdown (accepted/declined/pending)
+               - Total attendee count (facts.attendees.total)
+               - Response status breakdown (facts.attendees)
                - Organizer identification
                - Key participants
 
             3. Conference Details:
-               - Platform type (Zoom, Teams, etc.)
-               - Access methods available
-               - Meeting codes/links
+               - Platform type (facts.conference.platform)
+               - Access methods available (facts.conference.entryPointTypes)
+               - Meeting codes/links (facts.conference.entryPoints)
 
             4. Collaboration Insights:
                - Meeting engagement level
@@ -74,7 +131,7 @@ class GoogleCalendarMeetingTrigger:
               * Event ID: [Calendar event ID]
               * Title: [Meeting title]
               * Date/Time: [Start to end time with timezone]
-              * Duration: [Calculated meeting length]
+              * Duration: [facts.durationMinutes]
             - Organizer & Attendees:
               * Organizer: [Organizer name and email]
               * Total Attendees: [Count of attendees]
@@ -130,7 +187,7 @@ class GoogleCalendarMeetingTrigger:
         )
 
 if __name__ == "__main__":
-    crew = GoogleCalendarMeetingTrigger().crew()
+    trigger = GoogleCalendarMeetingTrigger()
     # Example payload from event-ended.json
     crewai_trigger_payload = """{
         "result": {
@@ -171,4 +228,4 @@ if __name__ == "__main__":
             "status": "confirmed"
         }
     }"""
-    crew.kickoff({'crewai_trigger_payload': crewai_trigger_payload})
+    run_trigger(trigger, {'crewai_trigger_payload': crewai_trigger_payload})
@@ -1,11 +1,47 @@
 from crewai import Agent, Crew, Process, Task
-from crewai.project import CrewBase, agent, crew, task
+from crewai.project import CrewBase, after_kickoff, agent, before_kickoff, crew, task
+
+from trigger_utils.budget import CALENDAR_RULES, enforce_budget
+from trigger_utils.google_calendar import EVENTS, delta_note, load_event
+from trigger_utils.kickoff import run_trigger
 
 
 @CrewBase
 class GoogleCalendarWorkingLocationTrigger:
     """GoogleCalendarWorkingLocationTrigger crew for working location events"""
 
+    token_budget = 4000
+    budget_rules = CALENDAR_RULES
+    # Shared by the calendar crews of the process; use EventLifecycle(path='calendar.sqlite3') to persist it
+    lifecycle = EVENTS
+
+    def triage(self, inputs):
+        """Answers started, ended and repeated deliveries of an already analyzed event with a delta note"""
+        event = load_event(inputs.get('crewai_trigger_payload'))
+        if event is None:
+            return None
+        transition = self.lifecycle.transition(event)
+        if transition['run']:
+            return None
+        self.lifecycle.remember(event)
+        return delta_note(event, transition)
+
+    @before_kickoff
+    def prepare_payload(self, inputs):
+        """Trims the trigger payload to the token budget before the agents see it"""
+        self._event = load_event(inputs.get('crewai_trigger_payload'))
+        inputs['crewai_trigger_payload'] = enforce_budget(
+            inputs.get('crewai_trigger_payload'), self.token_budget, self.budget_rules
+        )
+        return inputs
+
+    @after_kickoff
+    def remember_event(self, result):
+        """Stores the event state the next delivery for this event is compared with"""
+        if self._event is not None:
+            self.lifecycle.remember(self._event)
+        return result
+
     @agent
     def working_location_analyzer(self) -> Agent:
         return Agent(
@@ -114,7 +150,7 @@ class GoogleCalendarWorkingLocationTrigger:
         )
 
 if __name__ == "__main__":
-    crew = GoogleCalendarWorkingLocationTrigger().crew()
+    trigger = GoogleCalendarWorkingLocationTrigger()
     # Example payload from event-started.json
     crewai_trigger_payload = """{
         "result": {
@@ -141,4 +177,4 @@ if __name__ == "__main__":
             }
         }
     }"""
-    crew.kickoff({'crewai_trigger_payload': crewai_trigger_payload})
+    run_trigger(trigger, {'crewai_trigger_payload': crewai_trigger_payload})
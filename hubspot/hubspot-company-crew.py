@@ -1,11 +1,55 @@
 from crewai import Agent, Crew, Process, Task
-from crewai.project import CrewBase, agent, crew, task
+from crewai.project import CrewBase, after_kickoff, agent, before_kickoff, crew, task
+
+from trigger_utils.budget import HUBSPOT_RULES, enforce_budget
+from trigger_utils.companies import COMPANIES
+from trigger_utils.hubspot import COMPANY_PROPERTIES, load_record, prepare_record
+from trigger_utils.kickoff import run_trigger
+from trigger_utils.snapshots import RecordSnapshots, change_document, skip_note
 
 
 @CrewBase
 class HubSpotCompanyTrigger:
     """HubSpotCompanyTrigger crew for company record operations"""
 
+    token_budget = 4000
+    budget_rules = HUBSPOT_RULES
+    property_projection = COMPANY_PROPERTIES
+    # Shared by every instance in the process; pass path='hubspot.sqlite3' to persist across restarts
+    snapshots = RecordSnapshots()
+    # Profiles kept here enrich contacts of the same company in HubSpotContactTrigger
+    company_store = COMPANIES
+
+    def triage(self, inputs):
+        """Skips updates that only touch HubSpot tracking fields or arrive out of order"""
+        record = load_record(inputs.get('crewai_trigger_payload'))
+        changes = self.snapshots.changes(record) if record is not None else None
+        if changes is None or (changes['significant'] and not changes['stale']):
+            return None
+        self.snapshots.remember(record)
+        return skip_note(record, changes)
+
+    @before_kickoff
+    def prepare_payload(self, inputs):
+        """Projects the record to the fields the tasks use, or to its changes once known, and applies the token budget"""
+        raw = inputs.get('crewai_trigger_payload')
+        self._record = load_record(raw)
+        changes = self.snapshots.changes(self._record) if self._record is not None else None
+        if self._record is not None:
+            self.company_store.remember(self._record)
+        transform = (lambda document: change_document(document, changes)) if changes else None
+        inputs['crewai_trigger_payload'] = enforce_budget(
+            prepare_record(raw, self.property_projection, transform), self.token_budget, self.budget_rules
+        )
+        return inputs
+
+    @after_kickoff
+    def remember_snapshot(self, result):
+        """Stores the record as the baseline for diffing its next update"""
+        if self._record is not None:
+            self.snapshots.remember(self._record)
+        return result
+
     @agent
     def company_analyzer(self) -> Agent:
         return Agent(
@@ -43,6 +87,10 @@ class HubSpotCompanyTrigger:
               - web_technologies: Technology stack
               - market_segment: Business segment classification
 
+            For updates of a record analyzed before, result.properties only holds identity fields,
+            "changes" maps each changed property to its "before" and "after" values and
+            "previousUpdatedAt" is the time of the previous update. Focus the analysis on what changed.
+
             IMPORTANT: Extract the following information:
 
             1. Company Identity:
@@ -141,7 +189,7 @@ class HubSpotCompanyTrigger:
         )
 
 if __name__ == "__main__":
-    crew = HubSpotCompanyTrigger().crew()
+    trigger = HubSpotCompanyTrigger()
     # Example payload from record-created-company.json
     crewai_trigger_payload = """{
         "result": {
@@ -168,4 +216,4 @@ if __name__ == "__main__":
             "archived": false
         }
     }"""
-    crew.kickoff({'crewai_trigger_payload': crewai_trigger_payload})
+    run_trigger(trigger, {'crewai_trigger_payload': crewai_trigger_payload})
@@ -1,11 +1,61 @@
 from crewai import Agent, Crew, Process, Task
-from crewai.project import CrewBase, agent, crew, task
+from crewai.project import CrewBase, after_kickoff, agent, before_kickoff, crew, task
+
+from trigger_utils.budget import HUBSPOT_RULES, enforce_budget
+from trigger_utils.companies import COMPANIES
+from trigger_utils.hubspot import CONTACT_PROPERTIES, load_record, prepare_record
+from trigger_utils.kickoff import run_trigger
+from trigger_utils.snapshots import RecordSnapshots, change_document, skip_note
 
 
 @CrewBase
 class HubSpotContactTrigger:
     """HubSpotContactTrigger crew for contact record operations"""
 
+    token_budget = 4000
+    budget_rules = HUBSPOT_RULES
+    property_projection = CONTACT_PROPERTIES
+    # Shared by every instance in the process; pass path='hubspot.sqlite3' to persist across restarts
+    snapshots = RecordSnapshots()
+    # Fed by HubSpotCompanyTrigger; supplies the associated company's profile
+    company_store = COMPANIES
+
+    def triage(self, inputs):
+        """Skips updates that only touch HubSpot tracking fields or arrive out of order"""
+        record = load_record(inputs.get('crewai_trigger_payload'))
+        changes = self.snapshots.changes(record) if record is not None else None
+        if changes is None or (changes['significant'] and not changes['stale']):
+            return None
+        self.snapshots.remember(record)
+        return skip_note(record, changes)
+
+    @before_kickoff
+    def prepare_payload(self, inputs):
+        """Projects the record (or its changes once known), adds the associated company and applies the token budget"""
+        raw = inputs.get('crewai_trigger_payload')
+        self._record = load_record(raw)
+        changes = self.snapshots.changes(self._record) if self._record is not None else None
+        company = self.company_store.for_contact(self._record) if self._record is not None else None
+
+        def transform(document):
+            if changes:
+                document = change_document(document, changes)
+            if company:
+                document['company'] = company
+            return document
+
+        inputs['crewai_trigger_payload'] = enforce_budget(
+            prepare_record(raw, self.property_projection, transform, facts=True), self.token_budget, self.budget_rules
+        )
+        return inputs
+
+    @after_kickoff
+    def remember_snapshot(self, result):
+        """Stores the record as the baseline for diffing its next update"""
+        if self._record is not None:
+            self.snapshots.remember(self._record)
+        return result
+
     @agent
     def contact_analyzer(self) -> Agent:
         return Agent(
@@ -39,7 +89,18 @@ class HubSpotContactTrigger:
               - lead_score_*: Lead scoring data
               - hs_email_*: Email engagement metrics
               - associatedcompanyid: Linked company
-              - Various HubSpot tracking fields
+              - hs_analytics_num_page_views, hs_analytics_num_visits, *_conversion_*: Website and form activity
+            - facts: Precomputed metrics (emailOpenRatio, emailClickRatio, emailClickToOpen, leadScore,
+              leadScoreBand, daysSinceCreated, daysSinceLastEmailOpen); use these values instead of recomputing them
+            - company: Profile of the associated company (industry, numberofemployees, annualrevenue, market_segment,
+              lifecyclestage) when it is known; use it for Company Context and Revenue Opportunity.
+              When "company" is absent the company profile is unknown: base Company Context and Revenue
+              Opportunity on result.properties.company and jobtitle only, state that the company profile is not
+              available, and do not guess its industry, size or revenue
+
+            For updates of a record analyzed before, result.properties only holds identity fields,
+            "changes" maps each changed property to its "before" and "after" values and
+            "previousUpdatedAt" is the time of the previous update. Focus the analysis on what changed.
 
             IMPORTANT: Extract the following information:
 
@@ -139,7 +200,7 @@ class HubSpotContactTrigger:
         )
 
 if __name__ == "__main__":
-    crew = HubSpotContactTrigger().crew()
+    trigger = HubSpotContactTrigger()
     # Example payload from record-created-contact.json
     crewai_trigger_payload = """{
         "result": {
@@ -169,4 +230,4 @@ if __name__ == "__main__":
             "archived": false
         }
     }"""
-    crew.kickoff({'crewai_trigger_payload': crewai_trigger_payload})
+    run_trigger(trigger, {'crewai_trigger_payload': crewai_trigger_payload})
@@ -1,11 +1,172 @@
+from functools import partial
+
 from crewai import Agent, Crew, Process, Task
-from crewai.project import CrewBase, agent, crew, task
+from crewai.project import CrewBase, after_kickoff, agent, before_kickoff, crew, task
+from pydantic import BaseModel
+
+from trigger_utils.budget import HUBSPOT_RULES, enforce_budget, fit_document
+from trigger_utils.companies import COMPANIES
+from trigger_utils.hubspot import batch_payload, load_batch, load_record, prepare_batch, prepare_record
+from trigger_utils.kickoff import run_trigger
+from trigger_utils.pipeline import DealIndex
+from trigger_utils.sinks import new_run_id
+from trigger_utils.snapshots import RecordSnapshots, change_document, skip_note
+
+
+class RecordAnalysis(BaseModel):
+    """Analysis of one HubSpot record"""
+    record_id: str
+    record_type: str
+    primary_identifier: str
+    operation: str
+    priority: str
+    analysis: str
+    recommended_actions: list[str] = []
+
+
+class RecordBatchAnalysis(BaseModel):
+    """Output of the analysis task: one entry per record, in payload order"""
+    records: list[RecordAnalysis]
+
+
+def record_markdown(entry: RecordAnalysis) -> str:
+    """Markdown summary of one record's analysis, written per record in batch mode"""
+    lines = [
+        f"# {entry.record_type.title()}: {entry.primary_identifier}",
+        '',
+        f"- **Record ID**: {entry.record_id}",
+        f"- **Operation**: {entry.operation}",
+        f"- **Priority**: {entry.priority}",
+        '',
+        entry.analysis.strip(),
+    ]
+    if entry.recommended_actions:
+        lines += ['', '## Recommended Actions', ''] + [f"- {action}" for action in entry.recommended_actions]
+    return '\n'.join(lines) + '\n'
 
 
 @CrewBase
 class HubSpotRecordTrigger:
     """HubSpotRecordTrigger crew"""
 
+    token_budget = 4000
+    budget_rules = HUBSPOT_RULES
+    # None picks the contact, company or deal projection from the record's properties
+    property_projection = None
+    # Shared by every instance in the process; pass path='hubspot.sqlite3' to persist across restarts
+    snapshots = RecordSnapshots()
+    # Every deal event updates the index; query it directly, e.g. deal_index.query(stage='negotiation', min_amount=10_000)
+    deal_index = DealIndex()
+    # Company records update it, contact records are enriched from it
+    company_store = COMPANIES
+
+    # Batch mode (batch_payload): the whole batch shares this budget, each record gets at most token_budget of it
+    batch_token_budget = 24000
+    # Batch mode also writes one summary per record, named after the record id
+    record_summary_file = 'hubspot_record_summary-{record_id}.md'
+    # Set by CrewPool(sink=...); per-record summaries then go to the sink instead of files
+    output_sink = None
+
+    def batch_inputs(self, records):
+        """Kickoff inputs analyzing several records of one object type in a single run"""
+        return {'crewai_trigger_payload': batch_payload(records)}
+
+    def _skip_note(self, record):
+        changes = self.snapshots.changes(record)
+        if changes is None or (changes['significant'] and not changes['stale']):
+            return None
+        self.snapshots.remember(record)
+        return skip_note(record, changes)
+
+    def triage(self, inputs):
+        """Skips updates that only touch HubSpot tracking fields or arrive out of order
+
+        In batch mode skipped records are removed from the batch, and the run is
+        skipped only when none is left.
+        """
+        records = load_batch(inputs.get('crewai_trigger_payload'))
+        if records is None:
+            record = load_record(inputs.get('crewai_trigger_payload'))
+            return self._skip_note(record) if record is not None else None
+        notes, kept = [], []
+        for record in records:
+            note = self._skip_note(record)
+            (notes if note else kept).append(note or record)
+        if kept:
+            if notes:
+                inputs['crewai_trigger_payload'] = batch_payload(kept)
+            return None
+        return ''.join(notes)
+
+    def _enrich(self, record, document):
+        """Rewrites a record's document to its changes once known and adds pipeline or company context"""
+        changes = self.snapshots.changes(record)
+        if changes:
+            document = change_document(document, changes)
+        if self.deal_index.upsert(record):
+            document['pipeline'] = self.deal_index.context(record)
+        elif not self.company_store.remember(record):
+            company = self.company_store.for_contact(record)
+            if company:
+                document['company'] = company
+        return document
+
+    @before_kickoff
+    def prepare_payload(self, inputs):
+        """Projects the record (or its changes once known), adds pipeline or company context and applies the token budget"""
+        raw = inputs.get('crewai_trigger_payload')
+        records = load_batch(raw)
+        if records is not None:
+            self._records, self._batch = records, True
+            record_budget = min(self.token_budget, self.batch_token_budget // max(len(records), 1))
+
+            def transform(record, document):
+                document = self._enrich(record, document)
+                fit_document(document, record_budget, self.budget_rules)
+                return document
+
+            inputs['crewai_trigger_payload'] = prepare_batch(raw, self.property_projection, transform, facts=True)
+            return inputs
+        record = load_record(raw)
+        self._records, self._batch = [record] if record is not None else [], False
+        inputs['crewai_trigger_payload'] = enforce_budget(
+            prepare_record(raw, self.property_projection, partial(self._enrich, record), facts=True),
+            self.token_budget, self.budget_rules
+        )
+        return inputs
+
+    @after_kickoff
+    def remember_snapshot(self, result):
+        """Stores the records as the baseline for diffing their next update"""
+        for record in getattr(self, '_records', ()):
+            self.snapshots.remember(record)
+        return result
+
+    @after_kickoff
+    def write_record_summaries(self, result):
+        """In batch mode, writes each record's entry of the structured analysis as its own summary
+
+        Entries are matched to the batch by record id; ids the model made up are ignored.
+        """
+        if not getattr(self, '_batch', False):
+            return result
+        analysis = next((output.pydantic for output in getattr(result, 'tasks_output', None) or ()
+                         if isinstance(getattr(output, 'pydantic', None), RecordBatchAnalysis)), None)
+        if analysis is None:
+            return result
+        batch_ids = {str(record.get('id')) for record in self._records}
+        run_id = new_run_id()
+        for entry in analysis.records:
+            if entry.record_id not in batch_ids:
+                continue
+            filename, text = self.record_summary_file.format(record_id=entry.record_id), record_markdown(entry)
+            if self.output_sink is not None:
+                self.output_sink.emit(type(self).__name__, filename, text, run_id, 'hubspot_record_analysis_task')
+                continue
+            with open(filename, 'w', encoding='utf-8') as summary:
+                summary.write(text)
+        return result
+
     @agent
     def hubspot_record_analyzer(self) -> Agent:
         return Agent(
@@ -30,11 +191,28 @@ class HubSpotRecordTrigger:
             description="""
             The payload contains a HubSpot record operation with the following structure:
             - result.id: Record ID
-            - result.properties: Object containing all record properties
+            - result.properties: Object containing the record properties relevant to its type (tracking fields are removed)
             - result.createdAt: Record creation timestamp
             - result.updatedAt: Last update timestamp
             - result.archived: Archive status
             - result.associations: Related records (if included)
+            - facts: Precomputed metrics for the record type (deals: amount, arr, stageProbability, weightedAmount,
+              dealAgeDays, daysUntilClose; contacts: email ratios and leadScoreBand; companies: revenuePerEmployee,
+              companyAgeYears); use these values instead of recomputing them
+            - pipeline (deals only): Open deal count and amount across the pipeline, in this deal's stage and for
+              its owner; use it to judge the deal's weight in the portfolio
+            - company (contacts only): Profile of the associated company (industry, size, annual revenue) when known;
+              when it is absent, say the company profile is not available instead of guessing it
+
+            For updates of a record analyzed before, result.properties only holds identity fields,
+            "changes" maps each changed property to its "before" and "after" values and
+            "previousUpdatedAt" is the time of the previous update. Focus the analysis on what changed.
+
+            In batch mode the payload instead holds "batch" (objectType and size) and "records", a list
+            of documents with the structure above, one per record. Analyze every record.
+
+            Return one entry in "records" per record, in payload order (a single entry outside batch
+            mode), with record_id set to the record's result.id exactly as given.
 
             IMPORTANT: Extract the following information from the payload structure:
 
@@ -68,7 +246,9 @@ class HubSpotRecordTrigger:
                - Next steps and action items
             """,
             expected_output="""
-            A structured analysis containing:
+            A "records" list with one entry per record: record_id, record_type (contact/company/deal),
+            primary_identifier, operation (new/update/archive), priority (high/medium/low),
+            recommended_actions, and an "analysis" in markdown covering:
             - Record Information:
               * Record ID: [HubSpot record ID]
               * Type: [contact/company/deal]
@@ -95,7 +275,8 @@ class HubSpotRecordTrigger:
               * Marketing qualification status
               * Recommended next actions
             """,
-            agent=self.hubspot_record_analyzer
+            agent=self.hubspot_record_analyzer,
+            output_pydantic=RecordBatchAnalysis
         )
 
     @task
@@ -112,6 +293,11 @@ class HubSpotRecordTrigger:
             IMPORTANT: Ensure the record type and primary identifier (name/email/deal name)
             are displayed prominently at the top of your summary. These are critical pieces of
             information that must be clearly visible for quick record identification.
+
+            In batch mode start with a "Batch Overview" section (object type, number of records,
+            notable patterns across the batch and the records needing attention first), then write
+            one section per record, headed by its record type and primary identifier, with the fields
+            below.
             """,
             expected_output="""
             A well-structured HubSpot record summary in markdown format containing:
@@ -130,6 +316,8 @@ class HubSpotRecordTrigger:
             - **Priority Assessment**: Business importance and urgency
             - **Recommended Actions**: Next steps for sales/marketing teams
 
+            In batch mode the batch overview comes first, followed by one such summary per record.
+
             Ensure the Record Type and Primary Identifier fields are prominently displayed at the top and
             formatted as clean markdown without code blocks.
             """,
@@ -148,6 +336,6 @@ class HubSpotRecordTrigger:
         )
 
 if __name__ == "__main__":
-    crew = HubSpotRecordTrigger().crew()
+    trigger = HubSpotRecordTrigger()
     crewai_trigger_payload = "PUT YOUR TRIGGER PAYLOAD HERE"
-    crew.kickoff({'crewai_trigger_payload': crewai_trigger_payload})
+    run_trigger(trigger, {'crewai_trigger_payload': crewai_trigger_payload})
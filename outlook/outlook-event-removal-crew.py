@@ -1,11 +1,24 @@
 from crewai import Agent, Crew, Process, Task
-from crewai.project import CrewBase, agent, crew, task
+from crewai.project import CrewBase, agent, before_kickoff, crew, task
+
+from trigger_utils.budget import OUTLOOK_RULES, enforce_budget
 
 
 @CrewBase
 class OutlookEventRemovalTrigger:
     """OutlookEventRemovalTrigger crew for calendar event deletion notifications"""
 
+    token_budget = 4000
+    budget_rules = OUTLOOK_RULES
+
+    @before_kickoff
+    def prepare_payload(self, inputs):
+        """Trims the trigger payload to the token budget before the agents see it"""
+        inputs['crewai_trigger_payload'] = enforce_budget(
+            inputs.get('crewai_trigger_payload'), self.token_budget, self.budget_rules
+        )
+        return inputs
+
     @agent
     def event_removal_analyzer(self) -> Agent:
         return Agent(
@@ -1,11 +1,26 @@
 from crewai import Agent, Crew, Process, Task
-from crewai.project import CrewBase, agent, crew, task
+from crewai.project import CrewBase, agent, before_kickoff, crew, task
+
+from trigger_utils.budget import OUTLOOK_RULES, enforce_budget
+from trigger_utils.outlook import prepare_message
 
 
 @CrewBase
 class OutlookMessageTrigger:
     """OutlookMessageTrigger crew"""
 
+    token_budget = 4000
+    budget_rules = OUTLOOK_RULES
+
+    @before_kickoff
+    def prepare_payload(self, inputs):
+        """Replaces HTML message bodies with their visible text before analysis"""
+        inputs['crewai_trigger_payload'] = prepare_message(inputs.get('crewai_trigger_payload'))
+        inputs['crewai_trigger_payload'] = enforce_budget(
+            inputs.get('crewai_trigger_payload'), self.token_budget, self.budget_rules
+        )
+        return inputs
+
     @agent
     def outlook_message_analyzer(self) -> Agent:
         return Agent(
@@ -36,7 +51,7 @@ class OutlookMessageTrigger:
             - result.toRecipients[]: Array of recipient objects
             - result.ccRecipients[]: Array of CC recipient objects
             - result.bccRecipients[]: Array of BCC recipient objects
-            - result.body: Message body content and type
+            - result.body: Message body content and type (HTML bodies arrive already converted to plain text)
             - result.bodyPreview: Preview text of the message
             - result.receivedDateTime: When message was received
             - result.sentDateTime: When message was sent
@@ -0,0 +1,29 @@
+import pytest
+
+
+class FakeClock:
+    """Settable clock for the TTL, window and aging logic"""
+
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float) -> None:
+        self.now += seconds
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+def alert(message_id, exception='ConnectionError', server='web-1', level='error', environment='production',
+          project='shop', received_at='2025-01-01T00:00:00Z'):
+    """A decoded Gmail alert document, as returned by parse_alert"""
+    headers = {'Subject': f'{exception} on {server}', 'X-Sentry-Project': project, 'From': 'alerts@example.com'}
+    if level:
+        headers['X-Alert-Level'] = level
+    body = f'{exception}: connection pool exhausted\n* environment = {environment}\n* server_name = {server}\n'
+    return {'id': message_id, 'receivedAt': received_at, 'headers': headers, 'body': body}
@@ -0,0 +1,55 @@
+from conftest import alert
+
+from trigger_utils.alerts import (
+    AlertDedupCache,
+    alert_level,
+    fingerprint,
+    needs_crew,
+    occurrence_note,
+    parse_tags,
+    render_summary,
+)
+from trigger_utils.store import StateStore
+
+
+def test_parses_tags_and_level():
+    document = alert('m1', level=None)
+    assert parse_tags(document['body']) == {'environment': 'production', 'server_name': 'web-1'}
+    assert alert_level(document) is None
+    assert alert_level(alert('m1', level=' Critical ')) == 'critical'
+
+
+def test_fingerprint_ignores_message_specific_fields():
+    assert fingerprint(alert('m1')) == fingerprint(alert('m2', received_at='2025-02-01T00:00:00Z'))
+    assert fingerprint(alert('m1')) != fingerprint(alert('m1', server='web-2'))
+    assert fingerprint(alert('m1')) != fingerprint(alert('m1', exception='TimeoutError'))
+
+
+def test_needs_crew_by_level_and_environment():
+    assert needs_crew(alert('m1'))
+    assert not needs_crew(alert('m1', level='warning'))
+    assert not needs_crew(alert('m1', environment='staging'))
+    assert needs_crew(alert('m1', level='unheard-of'))
+    assert needs_crew(alert('m1', level='warning'), min_level='warning')
+
+
+def test_dedup_counts_occurrences_and_keeps_the_summary(clock):
+    cache = AlertDedupCache(store=StateStore(ttl=60, clock=clock))
+    first = alert('m1')
+    assert cache.seen(first) is None
+    cache.record(first, summary=render_summary(first))
+    repeat = alert('m2', received_at='2025-01-01T00:05:00Z')
+    entry = cache.record(repeat)
+    assert entry['count'] == 2 and entry['first_message_id'] == 'm1' and entry['last_message_id'] == 'm2'
+    note = occurrence_note(entry, repeat['headers']['Subject'])
+    annotated = cache.annotate(repeat, note)
+    assert annotated['summary'] == render_summary(first) + note
+    assert cache.seen(alert('m3'))['summary'].endswith(note)
+
+
+def test_dedup_forgets_after_a_quiet_period(clock):
+    cache = AlertDedupCache(store=StateStore(ttl=60, clock=clock))
+    cache.record(alert('m1'))
+    clock.advance(61)
+    assert cache.seen(alert('m2')) is None
+    assert cache.annotate(alert('m2'), 'note') is None
@@ -0,0 +1,84 @@
+import json
+from pathlib import Path
+
+from trigger_utils.budget import (
+    DEFAULT_RULES,
+    HUBSPOT_RULES,
+    BudgetRules,
+    _cut,
+    enforce_budget,
+    fit_document,
+)
+from trigger_utils.payload import estimate_tokens
+
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+
+def load(path):
+    return json.loads((REPO_ROOT / path).read_text(encoding='utf-8'))
+
+
+def test_documents_within_budget_are_untouched():
+    document = load('hubspot/record-created-contact.json')
+    report = fit_document(document, 100_000, HUBSPOT_RULES)
+    assert report['dropped'] == [] and report['truncated'] == {}
+    assert document == load('hubspot/record-created-contact.json')
+
+
+def test_drop_groups_go_first_and_kept_fields_stay():
+    document = load('hubspot/record-created-contact.json')
+    report = fit_document(document, 600, HUBSPOT_RULES)
+    assert report['within_budget']
+    properties = document['result']['properties']
+    assert not any(name.startswith('hs_analytics_') for name in properties)
+    assert {'firstname', 'lastname', 'email'} <= set(properties)
+    assert report['dropped'][0].startswith('result/properties/hs_analytics_')
+
+
+def test_truncate_fields_cut_strings_and_lists():
+    rules = BudgetRules(truncate=('body', 'items'))
+    document = {'id': '1', 'body': 'x' * 4000, 'items': [{'n': n} for n in range(200)]}
+    report = fit_document(document, 300, rules)
+    assert report['within_budget']
+    assert document['body'].endswith(f"[truncated {report['truncated']['body']} chars]")
+
+
+def test_last_resort_keeps_record_properties():
+    document = load('hubspot/record-created-contact.json')
+    report = fit_document(document, 500, DEFAULT_RULES)
+    assert report['within_budget']
+    assert report['tokens_after'] > 400
+    assert document['result']['id'] and document['result']['properties']
+    assert 'result/properties' not in report['dropped']
+
+
+def test_last_resort_drops_scalars_only():
+    document = {'result': {'id': '1', 'nested': {'a': 'x' * 30, 'b': 'y' * 30, 'c': 'z' * 30}}}
+    report = fit_document(document, 30, DEFAULT_RULES)
+    assert report['within_budget']
+    assert 'nested' in document['result']
+    assert all(path.startswith('result/nested/') for path in report['dropped'])
+
+
+def test_repeated_cuts_keep_one_cumulative_mark():
+    once = _cut('x' * 1000, 50)
+    twice = _cut(once, 50)
+    assert twice.count('[truncated') == 1
+    assert twice.endswith(f"[truncated {1000 - len(twice.split(' …')[0])} chars]")
+
+
+def test_last_resort_report_matches_the_mark():
+    document = {'result': {'id': '1', 'text': 'y' * 8000}}
+    report = fit_document(document, 200, DEFAULT_RULES)
+    text = document['result']['text']
+    assert report['truncated']['result/text'] == 8000 - len(text.split(' …')[0])
+    assert text.count('[truncated') == 1
+
+
+def test_enforce_budget_handles_text_and_none():
+    assert enforce_budget(None, 10) is None
+    assert enforce_budget('short', None) == 'short'
+    text = 'plain text ' * 500
+    trimmed = enforce_budget(text, 100)
+    assert estimate_tokens(trimmed) <= 100 and '[truncated' in trimmed
@@ -0,0 +1,91 @@
+import copy
+from datetime import datetime, timezone
+from pathlib import Path
+
+import pytest
+
+from trigger_utils.google_calendar import EventLifecycle, delta_note, event_facts, load_event
+
+
+SAMPLE = Path(__file__).resolve().parent.parent / 'google_calendar' / 'new-event.json'
+BEFORE = datetime(2025, 4, 1, tzinfo=timezone.utc)
+DURING = datetime(2025, 4, 11, 15, 30, tzinfo=timezone.utc)
+AFTER = datetime(2025, 4, 12, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def event():
+    return load_event(SAMPLE.read_text(encoding='utf-8'))
+
+
+def changed(event, updated='2025-03-25T00:00:00.000Z', **fields):
+    event = copy.deepcopy(event)
+    event.update(fields, updated=updated)
+    return event
+
+
+def test_event_facts(event):
+    facts = event_facts(event, BEFORE)
+    assert facts['startUtc'] == '2025-04-11T15:00+00:00'
+    assert facts['startLocal'] == '2025-04-11T12:00-03:00'
+    assert facts['durationMinutes'] == 60
+    assert facts['phase'] == 'upcoming'
+    assert event_facts(event, DURING)['phase'] == 'in progress'
+
+
+def test_new_event_then_repeat_delivery(event):
+    lifecycle = EventLifecycle()
+    assert lifecycle.transition(event, BEFORE) == {'transition': 'created', 'run': True, 'phase': 'upcoming'}
+    lifecycle.remember(event, BEFORE)
+    repeat = lifecycle.transition(event, BEFORE)
+    assert repeat['transition'] == 'unchanged' and not repeat['run'] and not repeat['stale']
+
+
+def test_material_change_runs_the_crew(event):
+    lifecycle = EventLifecycle()
+    lifecycle.remember(event, BEFORE)
+    transition = lifecycle.transition(changed(event, summary='Moved review'), BEFORE)
+    assert transition['transition'] == 'updated' and transition['run']
+    assert transition['changes']['summary'] == {'before': event['summary'], 'after': 'Moved review'}
+
+
+def test_out_of_order_update_is_stale(event):
+    lifecycle = EventLifecycle()
+    newer = changed(event, summary='Latest title')
+    lifecycle.remember(newer, BEFORE)
+    older = changed(event, updated='2025-03-01T00:00:00.000Z', summary='Old title')
+    transition = lifecycle.transition(older, BEFORE)
+    assert transition == {'since': newer['updated'], 'phase': 'upcoming', 'stale': True,
+                          'transition': 'unchanged', 'run': False}
+    assert 'out-of-order update' in delta_note(older, transition)
+    lifecycle.remember(older, BEFORE)
+    assert lifecycle.transition(newer, BEFORE)['transition'] == 'unchanged'
+
+
+def test_phase_changes_only_earn_a_note(event):
+    lifecycle = EventLifecycle()
+    lifecycle.remember(event, BEFORE)
+    started = lifecycle.transition(event, DURING)
+    assert started['transition'] == 'started' and not started['run']
+    lifecycle.remember(event, DURING)
+    ended = lifecycle.transition(event, AFTER)
+    assert ended['transition'] == 'ended'
+    assert delta_note(event, ended).endswith('ended since the last analysis, skipped\n')
+
+
+def test_cancellation_runs_the_crew(event):
+    lifecycle = EventLifecycle()
+    lifecycle.remember(event, BEFORE)
+    transition = lifecycle.transition(changed(event, status='cancelled'), BEFORE)
+    assert transition['transition'] == 'canceled' and transition['run']
+
+
+def test_response_changes_are_skipped(event):
+    event = changed(event, attendees=[{'email': 'a@example.com', 'responseStatus': 'needsAction'}])
+    lifecycle = EventLifecycle()
+    lifecycle.remember(event, BEFORE)
+    accepted = changed(event, updated='2025-03-26T00:00:00.000Z',
+                       attendees=[{'email': 'a@example.com', 'responseStatus': 'accepted'}])
+    transition = lifecycle.transition(accepted, BEFORE)
+    assert transition['transition'] == 'responses' and not transition['run']
+    assert 'a@example.com needsAction -> accepted' in delta_note(accepted, transition)
@@ -0,0 +1,31 @@
+import pytest
+
+from trigger_utils.html_text import html_to_text, iter_text, marketing_email
+
+
+@pytest.mark.parametrize('html, expected', [
+    ('<div style="display:none"><p>preheader</div><p>Visible offer here</p>', 'Visible offer here'),
+    ('<table><tr><td style="display:none">x<td>Real content</table>', 'Real content'),
+    ('<ul><li style="display:none">hidden<li>shown</ul>after', 'shown\nafter'),
+    ('<div style="visibility:hidden"><span><b>gone</div>kept', 'kept'),
+    ('<p>one<p style="display:none">two<p>three', 'one\nthree'),
+])
+def test_hidden_content_ends_with_the_element_that_hid_it(html, expected):
+    assert html_to_text(html) == expected
+
+
+def test_skips_styles_scripts_and_tracking_pixels():
+    html = ('<html><head><style>td{padding:0}</style><script>var t=1;</script></head><body>'
+            '<p>Hello</p><img src="https://t.example.com/o.gif" width="1" height="1" alt="pixel">'
+            '<img src="logo.png" alt="Logo"></body></html>')
+    assert html_to_text(html) == 'Hello\nLogo'
+
+
+def test_chunked_input_gives_the_same_text():
+    html = marketing_email(20)
+    chunks = (html[i:i + 97] for i in range(0, len(html), 97))
+    assert ''.join(iter_text(chunks)).strip() == html_to_text(html)
+
+
+def test_max_chars_truncates():
+    assert html_to_text('<p>' + 'word ' * 100 + '</p>', max_chars=20) == 'word word word word '[:20]
@@ -0,0 +1,63 @@
+from conftest import alert
+
+from trigger_utils.alerts import (
+    AlertCoalescer,
+    load_incident,
+    merge_alerts,
+    render_incident,
+    restrict_incident,
+)
+from trigger_utils.payload import dump_payload
+
+
+def test_merge_collapses_repeats_by_fingerprint():
+    documents = [
+        alert('m1', received_at='2025-01-01T00:00:00Z'),
+        alert('m2', received_at='2025-01-01T00:01:00Z'),
+        alert('m3', exception='TimeoutError', level='warning', received_at='2025-01-01T00:02:00Z'),
+    ]
+    incident = merge_alerts(documents)
+    details = incident['incident']
+    assert (details['group'], details['alertEmails'], details['distinctAlerts']) == ('shop', 3, 2)
+    assert (details['firstReceivedAt'], details['lastReceivedAt']) == ('2025-01-01T00:00:00Z', '2025-01-01T00:02:00Z')
+    repeated, warning = incident['alerts']
+    assert repeated['occurrences'] == 2 and repeated['messageIds'] == ['m1', 'm2']
+    assert repeated['lastReceivedAt'] == '2025-01-01T00:01:00Z'
+    assert repeated['needsCrew'] and not warning['needsCrew'] and details['needsCrew']
+
+
+def test_warning_storm_skips_the_crew():
+    incident = merge_alerts([alert(f'm{n}', level='warning', server=f'web-{n % 3}') for n in range(9)])
+    assert not incident['incident']['needsCrew']
+    summary = render_incident(incident)
+    assert summary.startswith('## 🧯 Incident shop: 9 alert emails, 3 distinct alerts')
+    assert summary.count('**🔁 Occurrences**: 3') == 3
+
+
+def test_restrict_updates_counts_and_needs_crew():
+    incident = merge_alerts([alert('m1'), alert('m2'), alert('m3', exception='TimeoutError', level='warning')])
+    restricted = restrict_incident(incident, incident['alerts'][1:])
+    assert restricted['incident']['alertEmails'] == 1 and restricted['incident']['distinctAlerts'] == 1
+    assert not restricted['incident']['needsCrew']
+    assert incident['incident']['needsCrew']
+
+
+def test_load_incident_round_trip():
+    incident = merge_alerts([alert('m1')])
+    assert load_incident(dump_payload(incident)) == incident
+    assert load_incident(dump_payload({'result': {}})) is None
+
+
+def test_coalescer_releases_by_window_and_size(clock):
+    coalescer = AlertCoalescer(window=60, max_batch=3, clock=clock)
+    assert coalescer.add(alert('m1')) == []
+    assert coalescer.add(alert('m2', project='billing')) == []
+    clock.advance(30)
+    assert coalescer.add(alert('m3')) == []
+    batches = coalescer.add(alert('m4'))
+    assert [[document['id'] for document in batch] for batch in batches] == [['m1', 'm3', 'm4']]
+    assert coalescer.due() == []
+    clock.advance(30)
+    assert [[document['id'] for document in batch] for batch in coalescer.due()] == [['m2']]
+    coalescer.add(alert('m5'))
+    assert [[document['id'] for document in batch] for batch in coalescer.drain()] == [['m5']]
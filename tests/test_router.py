@@ -0,0 +1,93 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from trigger_utils.crews import integration_of
+from trigger_utils.idempotency import SeenSet
+from trigger_utils.router import ANY, classify, compile_signatures, dispatch
+
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+EXPECTED = {
+    'gmail/new-email-payload-1.json': 'GmailAlertTrigger',
+    'google_calendar/event-canceled.json': 'GoogleCalendarEventTrigger',
+    'google_calendar/event-ended.json': 'GoogleCalendarMeetingTrigger',
+    'google_calendar/event-started.json': 'GoogleCalendarWorkingLocationTrigger',
+    'google_drive/deleted-file.json': 'GoogleDriveFileDeletionTrigger',
+    'google_drive/new-file.json': 'GoogleDriveFileTrigger',
+    'hubspot/record-created-company.json': 'HubSpotCompanyTrigger',
+    'hubspot/record-created-contact.json': 'HubSpotContactTrigger',
+    'hubspot/record-created-deals.json': 'HubSpotRecordTrigger',
+    'microsoft-teams/chat-created.json': 'MicrosoftTeamsChatCreatedTrigger',
+    'outlook/event-removed.json': 'OutlookEventRemovalTrigger',
+    'outlook/new-message.json': 'OutlookMessageTrigger',
+}
+
+
+@pytest.mark.parametrize('path, crew', sorted(EXPECTED.items()))
+def test_classifies_samples(path, crew):
+    assert classify((REPO_ROOT / path).read_text(encoding='utf-8')) == crew
+
+
+@pytest.mark.parametrize('path', sorted(str(path.relative_to(REPO_ROOT)) for path in REPO_ROOT.glob('*/*.json')))
+def test_every_sample_routes_to_its_integration(path):
+    crew = classify(json.loads((REPO_ROOT / path).read_text(encoding='utf-8')))
+    assert crew is not None and integration_of(crew) == path.split('/', 1)[0]
+
+
+def test_earliest_signature_wins():
+    index = compile_signatures((('kind', 'x', 'First'), ('name', ANY, 'Second'), ('kind', ANY, 'Third')))
+    assert classify({'result': {'kind': 'x', 'name': 'n'}}, index) == 'First'
+    assert classify({'result': {'kind': 'y', 'name': 'n'}}, index) == 'Second'
+    assert classify({'result': {'kind': 'y'}}, index) == 'Third'
+
+
+def test_nested_fields_and_unknown_payloads():
+    assert classify({'result': {'properties': {'dealname': 'Big deal', 'email': 'a@b.c'}}}) == 'HubSpotRecordTrigger'
+    assert classify({'result': {'properties': {'email': 'a@b.c'}}}) == 'HubSpotContactTrigger'
+    assert classify({'result': {'unknown': 1}}) is None
+    assert classify('not json') is None
+    assert classify({'result': 'text'}) is None
+
+
+def test_gmail_messages_without_alert_headers_are_threads():
+    payload = {'result': {'id': 'm1', 'payload': {'headers': [{'name': 'Subject', 'value': 'Hello'}]}}}
+    assert classify(payload) == 'GmailNewThreadTrigger'
+
+
+class Shortcut:
+    runs = 0
+
+    def triage(self, inputs):
+        Shortcut.runs += 1
+        return 'handled'
+
+
+class Failing:
+    def triage(self, inputs):
+        raise RuntimeError('crew failed')
+
+
+def test_dispatch_runs_the_matching_crew_once_per_event():
+    Shortcut.runs = 0
+    seen = SeenSet()
+    payload = (REPO_ROOT / 'outlook/new-message.json').read_text(encoding='utf-8')
+    crews = {'OutlookMessageTrigger': Shortcut}
+    assert dispatch(payload, crews, seen=seen) == 'handled'
+    assert dispatch(payload, crews, seen=seen) is None
+    assert Shortcut.runs == 1
+
+
+def test_dispatch_releases_the_event_when_the_crew_fails():
+    seen = SeenSet()
+    payload = (REPO_ROOT / 'outlook/new-message.json').read_text(encoding='utf-8')
+    with pytest.raises(RuntimeError):
+        dispatch(payload, {'OutlookMessageTrigger': Failing}, seen=seen)
+    assert dispatch(payload, {'OutlookMessageTrigger': Shortcut}, seen=seen) == 'handled'
+
+
+def test_dispatch_rejects_unknown_payloads():
+    with pytest.raises(ValueError):
+        dispatch({'result': {'unknown': 1}}, {})
@@ -0,0 +1,90 @@
+import asyncio
+from pathlib import Path
+
+from trigger_utils.scheduling import (
+    DEFAULT_PRIORITY,
+    AgingQueue,
+    PriorityGate,
+    alert_priority,
+    contact_priority,
+    outlook_priority,
+    priority_of,
+)
+
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+
+def sample(path):
+    return (REPO_ROOT / path).read_text(encoding='utf-8')
+
+
+def test_priority_functions_read_the_samples():
+    assert alert_priority(sample('gmail/new-email-payload-1.json')) >= 70
+    assert 0 <= contact_priority(sample('hubspot/record-created-contact.json')) <= 100
+    assert outlook_priority({'result': {'importance': 'High'}}) == 70
+    assert outlook_priority({'result': 'text'}) is None
+
+
+def test_priority_of_falls_back_to_the_default():
+    def broken(payload):
+        raise KeyError('boom')
+
+    assert priority_of('Unknown', {}) == DEFAULT_PRIORITY
+    assert priority_of('Broken', {}, {'Broken': broken}) == DEFAULT_PRIORITY
+    assert priority_of('OutlookMessageTrigger', {'result': {}}) == DEFAULT_PRIORITY
+
+
+def test_queue_orders_by_priority_then_arrival(clock):
+    queue = AgingQueue(aging=0.0, clock=clock)
+    for item, priority in (('low', 10), ('high', 90), ('first', 50), ('second', 50)):
+        queue.push(item, priority)
+    assert [queue.pop() for _ in range(len(queue))] == ['high', 'first', 'second', 'low']
+
+
+def test_waiting_items_age_past_newer_higher_priorities(clock):
+    queue = AgingQueue(aging=1.0, clock=clock)
+    queue.push('old', 10)
+    clock.advance(50)
+    queue.push('new', 55)
+    assert queue.pop() == 'old'
+    queue.push('newest', 90)
+    assert queue.pop() == 'newest'
+
+
+def test_gate_hands_free_slots_to_the_highest_priority(clock):
+    async def scenario():
+        gate = PriorityGate(1, aging=0.0, clock=clock)
+        order = []
+        await gate.acquire()
+
+        async def run(name, priority):
+            async with gate.slot(priority):
+                order.append(name)
+
+        tasks = [asyncio.create_task(run(name, priority)) for name, priority in (('low', 10), ('high', 90))]
+        await asyncio.sleep(0)
+        assert gate.waiting == 2
+        gate.release()
+        await asyncio.gather(*tasks)
+        return order, gate
+
+    order, gate = asyncio.run(scenario())
+    assert order == ['high', 'low']
+    assert gate.waiting == 0 and gate._active == 0
+
+
+def test_cancelled_waiter_does_not_leak_a_slot(clock):
+    async def scenario():
+        gate = PriorityGate(1, clock=clock)
+        await gate.acquire()
+        waiter = asyncio.create_task(gate.acquire(50))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        await asyncio.sleep(0)
+        gate.release()
+        await asyncio.wait_for(gate.acquire(), 1)
+        return gate
+
+    gate = asyncio.run(scenario())
+    assert gate._active == 1
@@ -0,0 +1,56 @@
+import gzip
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from trigger_utils.sinks import FileSink, JsonlSink, OutputSink, SqliteSink
+
+
+def test_a_sink_without_write_cannot_be_created():
+    class Incomplete(OutputSink):
+        pass
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+def test_file_sink_writes_one_file_per_output(tmp_path):
+    sink = FileSink(str(tmp_path))
+    record = sink.emit('HubSpotContactTrigger', 'contact_summary.md', '# Summary\n', run_id='run-1', task='summary')
+    path = tmp_path / 'HubSpotContactTrigger' / 'contact_summary-run-1.md'
+    assert path.read_text(encoding='utf-8') == '# Summary\n'
+    assert record['output_file'] == 'contact_summary.md'
+    assert [child.name for child in path.parent.iterdir()] == [path.name]
+
+
+def test_jsonl_sink_batches_and_compresses(tmp_path):
+    path = tmp_path / 'outputs.jsonl.gz'
+    sink = JsonlSink(str(path), batch_size=2, compress=True)
+    for n in range(3):
+        sink.emit('Crew', 'out.md', f'text {n}')
+    assert len(gzip.open(path, 'rt').readlines()) == 2
+    sink.close()
+    assert [json.loads(line)['text'] for line in gzip.open(path, 'rt')] == ['text 0', 'text 1', 'text 2']
+
+
+def test_sqlite_sink_returns_latest_outputs():
+    sink = SqliteSink(':memory:')
+    sink.emit('Crew', 'a.md', 'first', run_id='r1')
+    sink.emit('Crew', 'b.md', 'second', run_id='r2')
+    sink.emit('Other', 'c.md', 'other', run_id='r3')
+    assert sorted(row['text'] for row in sink.latest('Crew')) == ['first', 'second']
+    assert [row['run_id'] for row in sink.latest('Crew', limit=1)] in (['r1'], ['r2'])
+    sink.close()
+
+
+def test_attach_redirects_task_output_files():
+    sink = SqliteSink(':memory:')
+    task = SimpleNamespace(name='summary', output_file='summary.md', output=None)
+    crew = SimpleNamespace(tasks=[task], after_kickoff_callbacks=None)
+    sink.attach('Crew', crew)
+    assert task.output_file is None and sink.targets(crew) == [(task, 'summary.md')]
+    task.output = SimpleNamespace(raw='done')
+    assert crew.after_kickoff_callbacks[-1]('result') == 'result'
+    assert [(row['task'], row['output_file'], row['text']) for row in sink.latest('Crew')] == [
+        ('summary', 'summary.md', 'done')]
@@ -0,0 +1,68 @@
+import copy
+import json
+from pathlib import Path
+
+import pytest
+
+from trigger_utils.hubspot import load_record, prepare_record
+from trigger_utils.snapshots import RecordSnapshots, change_document, skip_note
+
+
+SAMPLE = Path(__file__).resolve().parent.parent / 'hubspot' / 'record-created-contact.json'
+
+
+@pytest.fixture
+def contact():
+    return load_record(SAMPLE.read_text(encoding='utf-8'))
+
+
+def updated(record, when, **properties):
+    record = copy.deepcopy(record)
+    record['updatedAt'] = when
+    record['properties'].update(properties)
+    return record
+
+
+def test_first_seen_record_has_no_change_set(contact):
+    assert RecordSnapshots().changes(contact) is None
+
+
+def test_tracking_only_update_is_ignored(contact):
+    snapshots = RecordSnapshots()
+    snapshots.remember(contact)
+    changes = snapshots.changes(updated(contact, '2025-01-01T00:00:00Z', hs_lastmodifieddate='2025-01-01',
+                                        hs_analytics_num_visits='99'))
+    assert changes['significant'] == {}
+    assert changes['ignored'] == ['hs_analytics_num_visits', 'hs_lastmodifieddate']
+    assert 'only tracking fields changed' in skip_note(contact, changes)
+
+
+def test_out_of_order_update_is_stale_and_not_remembered(contact):
+    snapshots = RecordSnapshots()
+    snapshots.remember(contact)
+    older = updated(contact, '2000-01-01T00:00:00Z', jobtitle='Intern')
+    assert snapshots.changes(older)['stale']
+    snapshots.remember(older)
+    assert snapshots.changes(contact)['significant'] == {}
+
+
+def test_change_set_rewrite_keeps_facts_and_context(contact):
+    snapshots = RecordSnapshots()
+    snapshots.remember(contact)
+    update = updated(contact, '2025-01-01T00:00:00Z', jobtitle='CTO', hs_lastmodifieddate='2025-01-01')
+    changes = snapshots.changes(update)
+
+    def transform(document):
+        document = change_document(document, changes)
+        document['company'] = {'name': 'TechCorp'}
+        return document
+
+    plain = json.loads(prepare_record(json.dumps({'result': update}), facts=True))
+    document = json.loads(prepare_record(json.dumps({'result': update}), transform=transform, facts=True))
+    assert document['changes'] == {'jobtitle': {'before': contact['properties']['jobtitle'], 'after': 'CTO'}}
+    assert document['previousUpdatedAt'] == contact['updatedAt']
+    assert document['facts'].pop('asOf') and plain['facts'].pop('asOf')
+    assert document['facts'] == plain['facts'] and document['facts']['leadScoreBand']
+    assert document['company'] == {'name': 'TechCorp'}
+    assert set(document['result']['properties']) <= {'firstname', 'lastname', 'email', 'company', 'jobtitle',
+                                                     'lifecyclestage'}
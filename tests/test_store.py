@@ -0,0 +1,69 @@
+from trigger_utils.store import StateStore
+
+
+def test_round_trip_and_delete():
+    store = StateStore()
+    store.put('a', {'n': 1, 'text': 'é'})
+    assert store.get('a') == {'n': 1, 'text': 'é'}
+    store.put('a', [1, 2])
+    assert store.get('a') == [1, 2] and len(store) == 1
+    store.delete('a')
+    assert store.get('a', 'missing') == 'missing' and len(store) == 0
+
+
+def test_ttl_expires_entries(clock):
+    store = StateStore(ttl=60, clock=clock)
+    store.put('a', 1)
+    clock.advance(30)
+    store.put('b', 2)
+    clock.advance(31)
+    assert store.get('a') is None
+    assert store.get('b') == 2
+    assert store.keys() == ['b']
+
+
+def test_expired_rows_are_swept_on_write(clock):
+    store = StateStore(ttl=60, clock=clock, sweep_interval=0)
+    for n in range(10):
+        store.put(f'key-{n}', n)
+    clock.advance(61)
+    store.put('fresh', 1)
+    assert len(store) == 1
+
+
+def test_lru_evicts_least_recently_used(clock):
+    store = StateStore(max_entries=3, evict_batch=1, clock=clock)
+    for key in 'abc':
+        store.put(key, key)
+        clock.advance(1)
+    assert store.get('a') == 'a'
+    clock.advance(1)
+    store.put('d', 'd')
+    assert store.get('b') is None
+    assert sorted(store.keys()) == ['a', 'c', 'd']
+    assert len(store) == 3
+
+
+def test_evicts_in_batches(clock):
+    store = StateStore(max_entries=100, evict_batch=10, clock=clock)
+    for n in range(101):
+        store.put(f'key-{n}', n)
+        clock.advance(1)
+    assert len(store) == 91
+    assert store.get('key-0') is None and store.get('key-9') is None and store.get('key-10') == 10
+
+
+def test_persists_buffered_reads(tmp_path, clock):
+    path = str(tmp_path / 'state.sqlite3')
+    store = StateStore(path, max_entries=2, evict_batch=1, clock=clock)
+    store.put('a', 1)
+    clock.advance(1)
+    store.put('b', 2)
+    clock.advance(1)
+    store.get('a')
+    store.close()
+    reopened = StateStore(path, max_entries=2, evict_batch=1, clock=clock)
+    assert len(reopened) == 2
+    clock.advance(1)
+    reopened.put('c', 3)
+    assert reopened.keys() == ['a', 'c']
@@ -0,0 +1 @@
+"""Shared, dependency-free helpers used by the trigger crew examples"""
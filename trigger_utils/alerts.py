@@ -0,0 +1,236 @@
+import hashlib
+import re
+import time
+
+from trigger_utils.batching import Coalescer
+from trigger_utils.gmail import load_message
+from trigger_utils.payload import load_payload
+from trigger_utils.store import StateStore
+
+
+_TAG = re.compile(r'^\s*\*\s*([\w.-]+)\s*=\s*(.*?)\s*$')
+_EXCEPTION = re.compile(r'^\s*([A-Z]\w*(?:Error|Exception|Warning|Failure))\b', re.MULTILINE)
+_SUBJECT_EXCEPTION = re.compile(r'\((\w+)\)\s*$')
+_VOLATILE = re.compile(r'\d+')
+_URL = re.compile(r'https?://\S+')
+
+SEVERITY_RANK = {
+    'debug': 0, 'info': 1, 'notice': 1, 'warning': 2, 'warn': 2,
+    'error': 3, 'high': 3, 'critical': 4, 'fatal': 4,
+}
+
+
+def parse_alert(raw, projection=None):
+    """Returns the decoded document of a Gmail alert trigger payload, or None"""
+    return load_message(raw, projection)
+
+
+def parse_tags(body: str) -> dict:
+    """Parses the '* key = value' lines of an alert's Tags block"""
+    tags = {}
+    for line in body.splitlines():
+        match = _TAG.match(line)
+        if match:
+            tags[match.group(1).lower()] = match.group(2)
+    return tags
+
+
+def alert_level(document: dict, tags: dict = None):
+    """Returns the lower-cased severity from X-Alert-Level, falling back to the level tag"""
+    level = document['headers'].get('X-Alert-Level')
+    if level is None:
+        level = (tags if tags is not None else parse_tags(document.get('body', ''))).get('level')
+    return level.strip().lower() if isinstance(level, str) else None
+
+
+def needs_crew(document: dict, min_level: str = 'error', environments=('production', 'prod')) -> bool:
+    """Whether an alert deserves the LLM crew: severe enough and in a watched environment
+
+    Alerts whose level or environment cannot be determined always go to the crew.
+    """
+    tags = parse_tags(document.get('body', ''))
+    rank = SEVERITY_RANK.get(alert_level(document, tags))
+    environment = tags.get('environment', '').lower()
+    if rank is None or not environment:
+        return True
+    return rank >= SEVERITY_RANK[min_level] and environment in environments
+
+
+def render_summary(document: dict) -> str:
+    """Template summary for alerts handled without the crew"""
+    headers = document['headers']
+    tags = parse_tags(document.get('body', ''))
+    links = _URL.findall(document.get('body', ''))
+    tag_lines = ''.join(f'  - {name} = {value}\n' for name, value in tags.items())
+    return (
+        f"- **🚨 ALERT TYPE**: {exception_type(document)} on {tags.get('service') or alert_project(headers)}\n"
+        f"- **📧 Message ID**: {document.get('id')}\n"
+        f"- **🔧 Affected System**: {tags.get('server_name') or tags.get('service') or alert_project(headers)}\n"
+        f"- **📊 Severity Level**: {(alert_level(document, tags) or 'unknown').capitalize()} "
+        f"({tags.get('environment', 'unknown environment')}, handled without escalation)\n"
+        f"- **⏰ Alert Time**: {headers.get('Date') or document.get('receivedAt')}\n"
+        f"- **🎯 Project**: {alert_project(headers)}\n"
+        f"- **📋 Error Details**: {headers.get('Subject', '')}\n"
+        f"- **🏷️ Tags**:\n{tag_lines}"
+        f"- **🔗 Alert Link**: {links[0] if links else 'n/a'}\n"
+        f"- **⚡ Action**: Review during business hours; no immediate incident response required\n"
+    )
+
+
+def alert_project(headers: dict):
+    """Returns the monitored project from X-<Service>-Project style headers"""
+    for name, value in headers.items():
+        if name.lower().startswith('x-') and name.lower().endswith('-project'):
+            return value
+    return None
+
+
+def exception_type(document: dict) -> str:
+    """Extracts the exception class from the body, falling back to the subject"""
+    match = _EXCEPTION.search(document.get('body', ''))
+    if match:
+        return match.group(1)
+    subject = document['headers'].get('Subject', '')
+    match = _SUBJECT_EXCEPTION.search(subject)
+    return match.group(1) if match else _VOLATILE.sub('#', subject)
+
+
+def fingerprint(document: dict) -> str:
+    """Identifies repeats of the same alert: project, exception type and server_name tag"""
+    tags = parse_tags(document.get('body', ''))
+    parts = (alert_project(document['headers']) or '', exception_type(document), tags.get('server_name', ''))
+    return hashlib.sha256('\x1f'.join(parts).encode('utf-8')).hexdigest()[:32]
+
+
+class AlertDedupCache:
+    """Counts occurrences of each alert fingerprint within a sliding TTL window
+
+    A fingerprint is forgotten once no repeat has arrived for ``ttl`` seconds, so
+    the next occurrence after a quiet period is treated as a new incident. Each
+    entry keeps the alert's own ``summary``, so repeat notes are appended to the
+    summary of the alert that repeated rather than to whichever was written last.
+    """
+
+    def __init__(self, path: str = ':memory:', ttl: float = 30 * 60, max_entries: int = 10_000, store=None):
+        if store is None:
+            store = StateStore(path, table='alert_fingerprints', ttl=ttl, max_entries=max_entries)
+        self.store = store
+
+    def seen(self, document: dict):
+        """The entry of an alert already summarized within the window, or None"""
+        return self.store.get(fingerprint(document))
+
+    def record(self, document: dict, occurrences: int = 1, summary: str = None) -> dict:
+        """Registers occurrences and returns the entry with an updated ``count``
+
+        Coalesced incident alerts (see merge_alerts) count every email they merged.
+        ``summary`` is stored as the alert's summary when given.
+        """
+        key = fingerprint(document)
+        entry = self.store.get(key)
+        if entry is None:
+            entry = {'fingerprint': key, 'count': 0, 'first_message_id': document.get('id'),
+                     'first_seen': document.get('receivedAt')}
+        entry['count'] += occurrences
+        entry['last_message_id'] = (document.get('messageIds') or [document.get('id')])[-1]
+        entry['last_seen'] = document.get('lastReceivedAt') or document.get('receivedAt')
+        if summary is not None:
+            entry['summary'] = summary
+        self.store.put(key, entry)
+        return entry
+
+    def annotate(self, document: dict, note: str) -> dict:
+        """Appends a note to the alert's stored summary and returns the entry, or None for unseen alerts"""
+        key = fingerprint(document)
+        entry = self.store.get(key)
+        if entry is None:
+            return None
+        entry['summary'] = (entry.get('summary') or '') + note
+        self.store.put(key, entry)
+        return entry
+
+
+def occurrence_note(entry: dict, subject: str) -> str:
+    """Markdown line appended to an existing summary for a repeated alert"""
+    return (f"- **🔁 Repeat occurrence #{entry['count']}** at {entry['last_seen']} "
+            f"(message {entry['last_message_id']}): {subject}\n")
+
+
+def incident_key(document: dict) -> str:
+    """Groups related alerts: same monitored project, or same sender when there is none"""
+    return alert_project(document['headers']) or document['headers'].get('From', '')
+
+
+def merge_alerts(documents, min_level: str = 'error', environments=('production', 'prod')) -> dict:
+    """Merges a batch of alert documents into one incident, collapsing repeats by fingerprint
+
+    Each distinct alert carries ``needsCrew`` (see needs_crew) and the incident
+    needs the crew when any of its alerts does.
+    """
+    alerts = {}
+    for document in documents:
+        key = fingerprint(document)
+        if key not in alerts:
+            alerts[key] = dict(document, fingerprint=key, occurrences=0, messageIds=[], lastReceivedAt=None,
+                               needsCrew=needs_crew(document, min_level, environments))
+        alert = alerts[key]
+        alert['occurrences'] += 1
+        alert['messageIds'].append(document.get('id'))
+        alert['lastReceivedAt'] = document.get('receivedAt')
+    received = [document.get('receivedAt') for document in documents if document.get('receivedAt')]
+    return {
+        'incident': {
+            'group': incident_key(documents[0]),
+            'alertEmails': len(documents),
+            'distinctAlerts': len(alerts),
+            'firstReceivedAt': min(received, default=None),
+            'lastReceivedAt': max(received, default=None),
+            'needsCrew': any(alert['needsCrew'] for alert in alerts.values()),
+        },
+        'alerts': list(alerts.values()),
+    }
+
+
+def load_incident(raw):
+    """The coalesced incident of a merge_alerts payload, or None for other payloads"""
+    payload = load_payload(raw)
+    if not isinstance(payload, dict) or not isinstance(payload.get('incident'), dict):
+        return None
+    return payload if isinstance(payload.get('alerts'), list) else None
+
+
+def restrict_incident(incident: dict, alerts: list) -> dict:
+    """The incident reduced to some of its alerts, with its counts updated"""
+    return {
+        **incident,
+        'incident': {
+            **incident['incident'],
+            'alertEmails': sum(alert.get('occurrences', 1) for alert in alerts),
+            'distinctAlerts': len(alerts),
+            'needsCrew': any(alert.get('needsCrew', True) for alert in alerts),
+        },
+        'alerts': alerts,
+    }
+
+
+def render_incident(incident: dict) -> str:
+    """Template summary for a coalesced incident whose alerts all skip the crew"""
+    details = incident['incident']
+    header = (f"## 🧯 Incident {details.get('group')}: {details.get('alertEmails')} alert emails, "
+              f"{details.get('distinctAlerts')} distinct alerts ({details.get('firstReceivedAt')} to "
+              f"{details.get('lastReceivedAt')}), handled without escalation\n\n")
+    return header + '\n'.join(
+        render_summary(alert) + f"- **🔁 Occurrences**: {alert.get('occurrences', 1)}\n" for alert in incident['alerts']
+    )
+
+
+class AlertCoalescer(Coalescer):
+    """Buffers related alerts and releases them as one batch per incident
+
+    A batch is released once ``window`` seconds have passed since its first alert
+    (see ``due``) or as soon as it holds ``max_batch`` alert emails (from ``add``).
+    Callers kick off the crew once per released batch.
+    """
+
+    def __init__(self, window: float = 60, max_batch: int = 50, key=incident_key, clock=time.monotonic):
+        super().__init__(window, max_batch, key, clock)
@@ -0,0 +1,47 @@
+import threading
+import time
+
+
+class Coalescer:
+    """Buffers related events and releases them as one batch per ``key(document)``
+
+    A batch is released once ``window`` seconds have passed since its first event
+    (see ``due``) or as soon as it holds ``max_batch`` events (from ``add``).
+    Callers kick off the crew once per released batch.
+    """
+
+    def __init__(self, window: float, max_batch: int, key, clock=time.monotonic):
+        self.window = window
+        self.max_batch = max_batch
+        self.key = key
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._open = {}
+
+    def add(self, document: dict) -> list:
+        """Buffers a document, returning any batches that are now ready"""
+        now = self.clock()
+        key = self.key(document)
+        with self._lock:
+            _, batch = self._open.setdefault(key, (now, []))
+            batch.append(document)
+            ready = self._release(now)
+            if len(batch) >= self.max_batch and key in self._open:
+                ready.append(self._open.pop(key)[1])
+        return ready
+
+    def due(self) -> list:
+        """Returns the batches whose coalescing window has elapsed"""
+        with self._lock:
+            return self._release(self.clock())
+
+    def drain(self) -> list:
+        """Releases every open batch, e.g. on shutdown"""
+        with self._lock:
+            batches = [batch for _, batch in self._open.values()]
+            self._open.clear()
+        return batches
+
+    def _release(self, now: float) -> list:
+        expired = [key for key, (opened_at, _) in self._open.items() if now - opened_at >= self.window]
+        return [self._open.pop(key)[1] for key in expired]
@@ -0,0 +1,261 @@
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+
+from crewai import BaseLLM
+
+from trigger_utils.alerts import AlertDedupCache
+from trigger_utils.companies import CompanyStore
+from trigger_utils.crews import CREWS, REPO_ROOT, load_crew_class
+from trigger_utils.google_calendar import EventLifecycle
+from trigger_utils.payload import PAYLOAD_KEY, dump_payload, estimate_tokens
+from trigger_utils.pipeline import DealIndex
+from trigger_utils.pool import CrewPool
+from trigger_utils.router import classify
+from trigger_utils.scheduling import PRIORITIES, PriorityGate, priority_of
+from trigger_utils.sinks import FileSink
+from trigger_utils.snapshots import RecordSnapshots
+from trigger_utils.threads import ThreadStore
+
+
+# Class-level state of the crews (dedup caches, snapshots, indexes) that fresh_state swaps out
+STATE_TYPES = (AlertDedupCache, CompanyStore, DealIndex, EventLifecycle, RecordSnapshots, ThreadStore)
+
+# Crews without a bundled sample get a minimal payload shaped like their task description
+SYNTHETIC = {
+    'OneDriveFileTrigger': {'result': {
+        'id': '01ABCDEF', 'name': 'Quarterly Report.xlsx', 'size': 48213,
+        'createdDateTime': '2025-08-21T12:32:39Z', 'lastModifiedDateTime': '2025-08-21T12:40:02Z',
+        'webUrl': 'https://onedrive.example.com/quarterly-report.xlsx',
+        'parentReference': {'driveId': 'b!drive', 'path': '/drive/root:/Finance'},
+        'file': {'mimeType': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'},
+        'createdBy': {'user': {'displayName': 'Sample User'}},
+    }},
+}
+
+
+class FakeLLM(BaseLLM):
+    """Deterministic stand-in LLM: fixed-size answers, injectable latency, token accounting
+
+    The answer is derived from a hash of the prompt so replays are reproducible.
+    """
+
+    def __init__(self, label: str, usage: dict, latency: float = 0.0, jitter: float = 0.0,
+                 completion_tokens: int = 300, seed: int = 0):
+        super().__init__(model=f'fake/{label}')
+        self.label = label
+        self.usage = usage
+        self.latency = latency
+        self.jitter = jitter
+        self.completion_tokens = completion_tokens
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def call(self, messages, tools=None, callbacks=None, available_functions=None, **kwargs):
+        if isinstance(messages, str):
+            messages = [{'role': 'user', 'content': messages}]
+        prompt = ''.join(str(message.get('content', '')) for message in messages)
+        digest = hashlib.sha256(prompt.encode('utf-8')).hexdigest()
+        body = ' '.join(digest[i % 56:i % 56 + 8] for i in range(self.completion_tokens // 2))
+        answer = f'Thought: I now can give a great answer\nFinal Answer: {body}'
+        with self._lock:
+            delay = max(0.0, self._random.gauss(self.latency, self.jitter)) if self.jitter else self.latency
+            stats = self.usage[self.label]
+            stats['calls'] += 1
+            stats['prompt_tokens'] += estimate_tokens(prompt)
+            stats['completion_tokens'] += estimate_tokens(answer)
+        if delay:
+            time.sleep(delay)
+        return answer
+
+    def supports_function_calling(self) -> bool:
+        return False
+
+    def supports_stop_words(self) -> bool:
+        return False
+
+    def get_context_window_size(self) -> int:
+        return 128_000
+
+
+def load_samples(root: Path = REPO_ROOT) -> list:
+    """Bundled sample payloads plus synthetic ones, as (crew name, payload dict) pairs"""
+    samples = []
+    for path in sorted(root.glob('*/*.json')):
+        payload = json.loads(path.read_text(encoding='utf-8'))
+        samples.append((classify(payload), payload))
+    samples.extend(SYNTHETIC.items())
+    return [(name, payload) for name, payload in samples if name is not None]
+
+
+def variant(payload: dict, n: int) -> dict:
+    """Copy of a sample with unique ids, so id-keyed caches see a new event"""
+    copy = json.loads(json.dumps(payload))
+    result = copy.get('result', {})
+    for key in ('id', 'threadId', 'fileId'):
+        if isinstance(result.get(key), str):
+            result[key] = f'{result[key]}-v{n}'
+    return copy
+
+
+@contextmanager
+def fresh_state(names):
+    """Gives the crews empty in-memory stores for the duration, restoring the originals afterwards
+
+    Stores shared between crews (e.g. the calendar lifecycle) stay shared, so a
+    replay sees the same cross-crew behaviour as production, without the state
+    of earlier replays.
+    """
+    fresh, replaced = {}, []
+    for name in names:
+        crew_class = load_crew_class(name)
+        for owner in crew_class.__mro__:
+            for attribute, value in list(vars(owner).items()):
+                if isinstance(value, STATE_TYPES):
+                    fresh.setdefault(id(value), type(value)())
+                    replaced.append((owner, attribute, value))
+                    setattr(owner, attribute, fresh[id(value)])
+    try:
+        yield
+    finally:
+        for owner, attribute, value in reversed(replaced):
+            setattr(owner, attribute, value)
+
+
+def percentile(values, fraction: float) -> float:
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+async def replay(events: int = 200, rate: float = 20.0, concurrency: int = 16, latency: float = 0.05,
+                 jitter: float = 0.0, completion_tokens: int = 300, names=None, seed: int = 0,
+                 priorities=None, aging: float = 1.0) -> dict:
+    """Replays sample variants with open-loop arrivals at ``rate`` events/sec against every crew
+
+    End-to-end latency is measured from each event's scheduled arrival, so
+    queueing delay under load is included. Runs wait for a free slot in arrival
+    order, or by priority when ``priorities`` is given (see TriggerRunner).
+
+    Every replay starts from empty crew stores (see fresh_state) and writes its
+    outputs to a temporary directory. Events answered by triage (duplicate
+    alerts, tracking-only updates) are counted as shortcuts, and ``crew_latency_ms``
+    covers only the events that ran the crew.
+    """
+    usage = defaultdict(lambda: {'calls': 0, 'prompt_tokens': 0, 'completion_tokens': 0})
+
+    def fake_llms(name, crew):
+        for task in crew.tasks:
+            task.agent.llm = FakeLLM(f'{name}.{task.name or task.agent.role}', usage, latency, jitter,
+                                     completion_tokens, seed)
+
+    samples = [sample for sample in load_samples() if names is None or sample[0] in names]
+    with tempfile.TemporaryDirectory(prefix='trigger-bench-') as directory, \
+            fresh_state(sorted({name for name, _ in samples})):
+        sink = FileSink(directory)
+        pool = CrewPool(prepare=fake_llms, max_idle=concurrency, sink=sink)
+        try:
+            return await _replay(pool, samples, events, rate, concurrency, priorities, aging, usage)
+        finally:
+            sink.close()
+
+
+async def _replay(pool, samples, events, rate, concurrency, priorities, aging, usage) -> dict:
+    gate = PriorityGate(concurrency, aging if priorities else 0.0)
+    latencies = defaultdict(list)
+    crew_latencies = defaultdict(list)
+    shortcuts = defaultdict(int)
+    loop = asyncio.get_running_loop()
+    # Kickoffs get their own threads so the executor is never the bottleneck
+    executor = ThreadPoolExecutor(concurrency, thread_name_prefix='bench-crew')
+    started = loop.time()
+
+    async def one(n: int, name: str, payload: dict):
+        await asyncio.sleep(max(0.0, started + n / rate - loop.time()))
+        arrived = started + n / rate
+        priority = priority_of(name, payload, priorities) if priorities else 0
+        async with gate.slot(priority, arrived):
+            result = await pool.run_async(name, {PAYLOAD_KEY: dump_payload(variant(payload, n))}, executor)
+        latencies[name].append(loop.time() - arrived)
+        if isinstance(result, str):
+            shortcuts[name] += 1
+        else:
+            crew_latencies[name].append(loop.time() - arrived)
+
+    try:
+        await asyncio.gather(*(one(n, *samples[n % len(samples)]) for n in range(events)))
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+    elapsed = loop.time() - started
+    every = [value for values in latencies.values() for value in values]
+    kicked_off = [value for values in crew_latencies.values() for value in values]
+    return {
+        'events': events,
+        'seconds': elapsed,
+        'events_per_second': events / elapsed if elapsed else 0.0,
+        'latency_ms': {label: 1000 * percentile(every, fraction)
+                       for label, fraction in (('p50', .5), ('p95', .95), ('p99', .99))},
+        'crew_latency_ms': {label: 1000 * percentile(kicked_off, fraction)
+                            for label, fraction in (('p50', .5), ('p95', .95), ('p99', .99))},
+        'shortcut_rate': sum(shortcuts.values()) / events if events else 0.0,
+        'crews': {
+            name: {
+                'events': len(values),
+                'shortcuts': shortcuts[name],
+                'p50_ms': 1000 * percentile(values, .5),
+                'p95_ms': 1000 * percentile(values, .95),
+                'p99_ms': 1000 * percentile(values, .99),
+                'crew_p95_ms': 1000 * percentile(crew_latencies[name], .95),
+            }
+            for name, values in sorted(latencies.items())
+        },
+        'tasks': dict(sorted(usage.items())),
+        'crews_built': pool.built,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Offline replay benchmark for the trigger crews (no real LLM)')
+    parser.add_argument('--events', type=int, default=200)
+    parser.add_argument('--rate', type=float, default=20.0, help='arrivals per second')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--latency', type=float, default=0.05, help='seconds per fake LLM call')
+    parser.add_argument('--jitter', type=float, default=0.0, help='stddev of the fake LLM latency')
+    parser.add_argument('--completion-tokens', type=int, default=300)
+    parser.add_argument('--crew', action='append', choices=sorted(CREWS), help='limit to these crews')
+    parser.add_argument('--priority', action='store_true', help='hand free slots out by trigger priority')
+    parser.add_argument('--aging', type=float, default=1.0, help='priority points gained per second of waiting')
+    parser.add_argument('--json', action='store_true', help='print the raw report as JSON')
+    args = parser.parse_args(argv)
+    report = asyncio.run(replay(args.events, args.rate, args.concurrency, args.latency, args.jitter,
+                                args.completion_tokens, args.crew, priorities=PRIORITIES if args.priority else None,
+                                aging=args.aging))
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    print(f"{report['events']} events in {report['seconds']:.2f}s = {report['events_per_second']:.1f} events/s"
+          f"  p50 {report['latency_ms']['p50']:.0f} ms  p95 {report['latency_ms']['p95']:.0f} ms"
+          f"  p99 {report['latency_ms']['p99']:.0f} ms")
+    print(f"  crew runs only: p50 {report['crew_latency_ms']['p50']:.0f} ms  p95 {report['crew_latency_ms']['p95']:.0f} ms"
+          f"  p99 {report['crew_latency_ms']['p99']:.0f} ms  ({report['shortcut_rate']:.0%} answered by triage)")
+    for name, row in report['crews'].items():
+        print(f"  {name:<38} n={row['events']:<4} shortcut={row['shortcuts']:<4}"
+              f" p50 {row['p50_ms']:7.0f}  p95 {row['p95_ms']:7.0f}  p99 {row['p99_ms']:7.0f} ms")
+    for label, stats in report['tasks'].items():
+        calls = stats['calls'] or 1
+        print(f"  {label:<70} calls={stats['calls']:<5} prompt/call={stats['prompt_tokens'] // calls:<6}"
+              f" completion/call={stats['completion_tokens'] // calls}")
+
+
+if __name__ == "__main__":
+    main()
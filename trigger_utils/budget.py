@@ -0,0 +1,178 @@
+import logging
+import re
+from fnmatch import fnmatchcase
+
+from trigger_utils.payload import dump_payload, estimate_tokens, load_payload
+
+
+logger = logging.getLogger(__name__)
+
+TRUNCATION_MARK = ' …[truncated {} chars]'
+_MARK = re.compile(r' …\[truncated (\d+) chars\]$')
+
+
+class BudgetRules:
+    """Priority order for shrinking a payload, as 'a/b/*' patterns over JSON key paths
+
+    ``drop`` groups are removed one at a time until the payload fits, then the
+    ``truncate`` fields are shortened in order (strings are cut, lists lose
+    trailing items). As a last resort the largest remaining strings are cut and
+    then single scalar fields are dropped, one at a time. Paths matching ``keep``, and containers
+    holding them, are never dropped or cut by the last-resort steps.
+    """
+
+    def __init__(self, drop=(), truncate=(), keep=()):
+        self.drop = tuple(drop)
+        self.truncate = tuple(truncate)
+        self.keep = tuple(keep)
+
+    def kept(self, path: str) -> bool:
+        return any(fnmatchcase(path, pattern) for pattern in self.keep)
+
+
+GMAIL_RULES = BudgetRules(
+    drop=('labelIds', 'snippet', 'attachments', 'headers/List-*', 'headers/Reply-To', 'headers/References',
+          'alerts/*/labelIds', 'alerts/*/snippet', 'newMessages/*/snippet'),
+    truncate=('alerts/*/body', 'newMessages/*/body', 'body', 'previousSummary'),
+    keep=('id', 'threadId', '*headers/Subject', '*headers/From', '*headers/Date', 'incident*'),
+)
+
+HUBSPOT_RULES = BudgetRules(
+    drop=('result/properties/hs_analytics_*', 'result/properties/*_contact', 'result/properties/hs_object_source*',
+          'result/properties/hs_social_*', 'result/properties/hs_email_optout*', 'result/properties/ip_*',
+          'result/properties/hs_v2_*', 'result/properties/hs_*'),
+    truncate=('result/properties/linkedinbio', 'result/properties/web_technologies', 'result/properties/description'),
+    keep=('result/id', 'result/properties/dealname', 'result/properties/dealstage', 'result/properties/amount',
+          'result/properties/closedate', 'result/properties/name', 'result/properties/domain',
+          'result/properties/firstname', 'result/properties/lastname', 'result/properties/email',
+          'result/properties/company', 'result/properties/jobtitle', 'result/properties/lifecyclestage',
+          'result/properties/lead_score_*', 'result/properties/industry', 'result/properties/annualrevenue', 'facts/*',
+          'pipeline/*', 'company/*'),
+)
+
+CALENDAR_RULES = BudgetRules(
+    drop=('result/etag', 'result/htmlLink', 'result/iCalUID', 'result/reminders', 'result/conferenceData/parameters',
+          'result/conferenceData/conferenceSolution/iconUri', 'result/conferenceData/notes'),
+    truncate=('result/description', 'result/attendees'),
+    keep=('result/id', 'result/summary', 'result/start*', 'result/end*', 'result/status', 'result/eventType',
+          'facts/*', 'lifecycle/transition'),
+)
+
+OUTLOOK_RULES = BudgetRules(
+    drop=('result/@odata.etag', 'result/webLink', 'result/parentFolderId', 'result/conversationIndex',
+          'result/changeKey', 'result/internetMessageId'),
+    truncate=('result/bodyPreview', 'result/body/content'),
+    keep=('result/id', 'result/subject', 'result/from*', 'result/sender*', 'result/toRecipients*'),
+)
+
+DEFAULT_RULES = BudgetRules(keep=('result/id',))
+
+
+def _leaves(node, prefix=''):
+    """Yields (path, parent, key) for every leaf value and every non-empty container"""
+    items = node.items() if isinstance(node, dict) else enumerate(node)
+    for key, value in list(items):
+        path = f'{prefix}{key}'
+        yield path, node, key
+        if isinstance(value, (dict, list)) and value:
+            yield from _leaves(value, path + '/')
+
+
+def _tokens(document) -> int:
+    return estimate_tokens(dump_payload(document))
+
+
+def _cut(text: str, excess_tokens: int) -> str:
+    """Shortens text by about ``excess_tokens``; a string cut before keeps one mark with the total count"""
+    match = _MARK.search(text)
+    earlier = int(match.group(1)) if match else 0
+    text = text[:match.start()] if match else text
+    remove = excess_tokens * 4 + len(TRUNCATION_MARK) + 8
+    keep = max(0, len(text) - remove)
+    return text[:keep] + TRUNCATION_MARK.format(earlier + len(text) - keep)
+
+
+def _cut_chars(text: str) -> int:
+    """Characters removed from a string by _cut, according to its mark"""
+    match = _MARK.search(text)
+    return int(match.group(1)) if match else 0
+
+
+def fit_document(document, max_tokens: int, rules: BudgetRules = DEFAULT_RULES) -> dict:
+    """Shrinks a JSON document in place until it fits ``max_tokens`` and reports what was removed"""
+    report = {'tokens_before': _tokens(document), 'dropped': [], 'truncated': {}}
+    tokens = report['tokens_before']
+    for pattern in rules.drop:
+        if tokens <= max_tokens:
+            break
+        matches = [(path, parent, key) for path, parent, key in _leaves(document)
+                   if fnmatchcase(path, pattern) and not rules.kept(path)]
+        for path, parent, key in reversed(matches):
+            if isinstance(parent, dict) and key in parent:
+                del parent[key]
+                report['dropped'].append(path)
+        tokens = _tokens(document) if matches else tokens
+    for pattern in rules.truncate:
+        for path, parent, key in list(_leaves(document)):
+            if tokens <= max_tokens:
+                break
+            if not fnmatchcase(path, pattern):
+                continue
+            value = parent[key]
+            if isinstance(value, str):
+                parent[key] = _cut(value, tokens - max_tokens)
+                report['truncated'][path] = _cut_chars(parent[key])
+                tokens = _tokens(document)
+            elif isinstance(value, list):
+                removed = 0
+                while tokens > max_tokens and len(value) > 1:
+                    excess = tokens - max_tokens
+                    while excess > 0 and len(value) > 1:
+                        excess -= estimate_tokens(dump_payload(value.pop())) + 1
+                        removed += 1
+                    tokens = _tokens(document)
+                report['truncated'][path] = f'{removed} items'
+    while tokens > max_tokens:
+        strings = [(len(parent[key]), path, parent, key) for path, parent, key in _leaves(document)
+                   if isinstance(parent[key], str) and not rules.kept(path) and len(parent[key]) > 64]
+        if not strings:
+            break
+        size, path, parent, key = max(strings, key=lambda item: item[0])
+        parent[key] = _cut(parent[key], min(tokens - max_tokens, size // 8 + 1))
+        report['truncated'][path] = _cut_chars(parent[key])
+        tokens = _tokens(document)
+    while tokens > max_tokens:
+        # Scalars only: dropping a container such as result/properties would take every field with it
+        fields = [(_tokens(parent[key]), path, parent, key) for path, parent, key in _leaves(document)
+                  if isinstance(parent, dict) and not (isinstance(parent[key], (dict, list)) and parent[key])
+                  and not rules.kept(path)]
+        if not fields:
+            break
+        covering = [field for field in fields if field[0] >= tokens - max_tokens]
+        size, path, parent, key = (min(covering, key=lambda item: item[0]) if covering
+                                   else max(fields, key=lambda item: item[0]))
+        del parent[key]
+        report['dropped'].append(path)
+        tokens = _tokens(document)
+    report['tokens_after'] = tokens
+    report['within_budget'] = tokens <= max_tokens
+    return report
+
+
+def enforce_budget(raw, max_tokens, rules: BudgetRules = DEFAULT_RULES):
+    """Returns the payload trimmed to ``max_tokens`` (None disables the budget) and logs what was removed"""
+    if max_tokens is None or raw is None:
+        return raw
+    if isinstance(raw, str) and estimate_tokens(raw) <= max_tokens:
+        return raw
+    document = load_payload(raw)
+    if document is None:
+        text = str(raw)
+        return text if estimate_tokens(text) <= max_tokens else _cut(text, estimate_tokens(text) - max_tokens)
+    report = fit_document(document, max_tokens, rules)
+    if report['tokens_before'] <= max_tokens:
+        return dump_payload(document)
+    logger.info('Payload trimmed from ~%d to ~%d tokens (budget %d): dropped %d fields, truncated %s',
+                report['tokens_before'], report['tokens_after'], max_tokens,
+                len(report['dropped']), sorted(report['truncated']))
+    return dump_payload(document)
@@ -0,0 +1,115 @@
+import hashlib
+import inspect
+import json
+import os
+import threading
+
+from trigger_utils.payload import load_payload
+from trigger_utils.sinks import new_run_id
+from trigger_utils.store import StateStore
+
+
+def canonical_inputs(inputs: dict) -> str:
+    """Serializes kickoff inputs so key order and whitespace in the payload JSON don't matter"""
+    canonical = {}
+    for name, value in inputs.items():
+        document = load_payload(value) if isinstance(value, str) else None
+        canonical[name] = document if document is not None else value
+    return json.dumps(canonical, sort_keys=True, separators=(',', ':'), ensure_ascii=False, default=str)
+
+
+def prompt_version(trigger) -> str:
+    """The crew's ``prompt_version`` attribute, or a hash of its source file so prompt edits invalidate entries"""
+    version = getattr(trigger, 'prompt_version', None)
+    if version is not None:
+        return str(version)
+    try:
+        with open(inspect.getsourcefile(type(trigger)), 'rb') as source:
+            return hashlib.sha256(source.read()).hexdigest()[:12]
+    except (OSError, TypeError):
+        return 'unversioned'
+
+
+class ResultCache:
+    """Replays the final output of a crew for re-delivered payloads without any LLM call
+
+    Entries are keyed on the canonical inputs, the crew class and its prompt
+    version, and hold the final output plus the text of every task
+    ``output_file`` so a hit rewrites the same files the original run produced.
+    """
+
+    def __init__(self, path: str = 'trigger_results.sqlite3', ttl: float = 24 * 3600, max_entries: int = 10_000,
+                 store=None):
+        if store is None:
+            store = StateStore(path, table='trigger_results', ttl=ttl, max_entries=max_entries)
+        self.store = store
+        self._versions = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, trigger, inputs: dict) -> str:
+        trigger_class = type(trigger)
+        version = self._versions.get(trigger_class)
+        if version is None:
+            version = self._versions[trigger_class] = prompt_version(trigger)
+        digest = hashlib.sha256(canonical_inputs(inputs).encode('utf-8')).hexdigest()
+        return f'{trigger_class.__name__}:{version}:{digest}'
+
+    def replay(self, key: str, sink=None):
+        """Returns the stored final output after rewriting its output files, or None on a miss
+
+        With an OutputSink the stored outputs are emitted to it as a new run
+        instead of being written to their original paths.
+        """
+        entry = self.store.get(key)
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        if sink is not None:
+            crew_name = key.split(':', 1)[0]
+            run_id = new_run_id()
+            for path, text in entry['files'].items():
+                sink.emit(crew_name, path, text, run_id)
+            return entry['raw']
+        for path, text in entry['files'].items():
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(path, 'w', encoding='utf-8') as output:
+                output.write(text)
+        return entry['raw']
+
+    def remember(self, key: str, crew, result, sink=None) -> None:
+        if sink is not None:
+            targets = sink.targets(crew)
+        else:
+            targets = [(task, task.output_file) for task in getattr(crew, 'tasks', ())
+                       if getattr(task, 'output_file', None)]
+        files = {}
+        for task, path in targets:
+            output = getattr(task, 'output', None)
+            if output is not None:
+                files[path] = output.raw
+        self.store.put(key, {'raw': getattr(result, 'raw', str(result)), 'files': files})
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {'hits': self.hits, 'misses': self.misses, 'entries': len(self.store),
+                    'hit_ratio': self.hits / lookups if lookups else 0.0}
+
+    def prometheus(self) -> str:
+        """Hit/miss counters in the Prometheus text exposition format"""
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        return '\n'.join([
+            '# HELP trigger_result_cache_hits_total Re-delivered payloads answered from the result cache',
+            '# TYPE trigger_result_cache_hits_total counter',
+            f'trigger_result_cache_hits_total {hits}',
+            '# HELP trigger_result_cache_misses_total Result cache lookups that ran the crew',
+            '# TYPE trigger_result_cache_misses_total counter',
+            f'trigger_result_cache_misses_total {misses}',
+        ]) + '\n'
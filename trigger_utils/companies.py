@@ -0,0 +1,88 @@
+import threading
+from collections import OrderedDict
+
+from trigger_utils.hubspot import coerce, object_type
+from trigger_utils.store import StateStore
+
+
+# Company properties copied into the profile attached to contacts
+PROFILE_PROPERTIES = (
+    'name', 'domain', 'industry', 'numberofemployees', 'annualrevenue', 'market_segment', 'lifecyclestage',
+    'country', 'city', 'founded_year', 'is_public',
+)
+
+
+def company_profile(record: dict) -> dict:
+    """Compact, typed profile of a HubSpot company record"""
+    properties = record.get('properties') or {}
+    profile = {'id': str(record.get('id'))}
+    for name in PROFILE_PROPERTIES:
+        value = properties.get(name)
+        if value not in (None, ''):
+            profile[name] = coerce(value) if name in ('numberofemployees', 'annualrevenue', 'founded_year') else value
+    if record.get('updatedAt'):
+        profile['updatedAt'] = record['updatedAt']
+    return profile
+
+
+class CompanyStore:
+    """Company profiles fed from company trigger events, read when a contact needs its company
+
+    Profiles persist in a StateStore table; the ``cache_size`` most recently used
+    ones are also kept in an in-process LRU so enriching a burst of contacts of
+    the same company never touches SQLite.
+    """
+
+    def __init__(self, path: str = ':memory:', ttl: float = 180 * 24 * 3600, max_entries: int = 100_000,
+                 cache_size: int = 1024, store=None):
+        if store is None:
+            store = StateStore(path, table='hubspot_companies', ttl=ttl, max_entries=max_entries)
+        self.store = store
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _cache_put(self, company_id: str, profile) -> None:
+        self._cache[company_id] = profile
+        self._cache.move_to_end(company_id)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def remember(self, record: dict) -> bool:
+        """Stores the profile of a company record; returns False for other records and stale updates"""
+        if object_type(record.get('properties') or {}) != 'company' or record.get('id') is None:
+            return False
+        profile = company_profile(record)
+        current = self.get(profile['id'])
+        if current and current.get('updatedAt') and (profile.get('updatedAt') or '') < current['updatedAt']:
+            return False
+        self.store.put(profile['id'], profile)
+        with self._lock:
+            self._cache_put(profile['id'], profile)
+        return True
+
+    def get(self, company_id):
+        if company_id in (None, ''):
+            return None
+        company_id = str(company_id)
+        with self._lock:
+            if company_id in self._cache:
+                self.hits += 1
+                self._cache.move_to_end(company_id)
+                return self._cache[company_id]
+            self.misses += 1
+        profile = self.store.get(company_id)
+        if profile is not None:
+            with self._lock:
+                self._cache_put(company_id, profile)
+        return profile
+
+    def for_contact(self, record: dict):
+        """Profile of the company a contact record is associated with, or None when unknown"""
+        return self.get((record.get('properties') or {}).get('associatedcompanyid'))
+
+
+# Shared by the company, contact and record crews of one process
+COMPANIES = CompanyStore()
@@ -0,0 +1,43 @@
+import importlib.util
+import re
+from pathlib import Path
+
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+# Crew class name -> crew script, relative to the repository root
+CREWS = {
+    'GmailAlertTrigger': 'gmail/gmail-alert-crew.py',
+    'GmailNewThreadTrigger': 'gmail/new-email-crew.py',
+    'GoogleCalendarEventTrigger': 'google_calendar/calendar-event-crew.py',
+    'GoogleCalendarMeetingTrigger': 'google_calendar/calendar-meeting-crew.py',
+    'GoogleCalendarWorkingLocationTrigger': 'google_calendar/calendar-working-location-crew.py',
+    'GoogleDriveFileTrigger': 'google_drive/drive-file-crew.py',
+    'GoogleDriveFileDeletionTrigger': 'google_drive/drive-file-deletion-crew.py',
+    'HubSpotCompanyTrigger': 'hubspot/hubspot-company-crew.py',
+    'HubSpotContactTrigger': 'hubspot/hubspot-contact-crew.py',
+    'HubSpotRecordTrigger': 'hubspot/hubspot-record-crew.py',
+    'MicrosoftTeamsChatCreatedTrigger': 'microsoft-teams/teams-chat-created-crew.py',
+    'OneDriveFileTrigger': 'onedrive/onedrive-file-crew.py',
+    'OutlookEventRemovalTrigger': 'outlook/outlook-event-removal-crew.py',
+    'OutlookMessageTrigger': 'outlook/outlook-message-crew.py',
+}
+
+_loaded = {}
+
+
+def integration_of(name: str) -> str:
+    """Integration a crew belongs to, i.e. its directory (gmail, hubspot, outlook, ...)"""
+    return CREWS[name].split('/', 1)[0]
+
+
+def load_crew_class(name: str):
+    """Imports a crew script by path (the file names are not valid module names) and returns its class"""
+    if name not in _loaded:
+        path = REPO_ROOT / CREWS[name]
+        module_name = re.sub(r'\W', '_', path.stem)
+        spec = importlib.util.spec_from_file_location(module_name, path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        _loaded[name] = getattr(module, name)
+    return _loaded[name]
@@ -0,0 +1,206 @@
+import base64
+import binascii
+import json
+import logging
+import re
+import sys
+from datetime import datetime, timezone
+
+from trigger_utils.html_text import html_to_text
+from trigger_utils.payload import dump_payload, load_payload, size_report
+
+
+logger = logging.getLogger(__name__)
+
+_CHARSET = re.compile(r'charset="?([\w.-]+)"?', re.IGNORECASE)
+
+# Transport, authentication and MIME plumbing headers that carry no meaning for analysis
+TRANSPORT_HEADERS = (
+    r'^Received$',
+    r'^X-Received$',
+    r'^Received-SPF$',
+    r'^Return-Path$',
+    r'^ARC-',
+    r'^DKIM-Signature$',
+    r'^Authentication-Results$',
+    r'^X-Google-',
+    r'^X-Gm-',
+    r'^Content-Type$',
+    r'^Content-Transfer-Encoding$',
+    r'^MIME-Version$',
+)
+
+
+class HeaderProjection:
+    """Keeps allowlisted headers (all when allow is None) minus any matching a denylist pattern"""
+
+    def __init__(self, allow=None, deny=TRANSPORT_HEADERS):
+        self.allow = None if allow is None else {name.lower() for name in allow}
+        self.deny = re.compile('|'.join(f'(?:{pattern})' for pattern in deny), re.IGNORECASE) if deny else None
+
+    def keeps(self, name: str) -> bool:
+        if self.allow is not None and name.lower() not in self.allow:
+            return False
+        return not (self.deny and self.deny.search(name))
+
+    def apply(self, headers: dict) -> dict:
+        return {name: value for name, value in headers.items() if self.keeps(name)}
+
+
+# Alert services add their own X-* headers, so alerts keep everything that is not transport noise
+ALERT_HEADERS = HeaderProjection()
+
+MESSAGE_HEADERS = HeaderProjection(
+    allow=('From', 'To', 'Cc', 'Reply-To', 'Subject', 'Date', 'Message-ID', 'In-Reply-To', 'References', 'List-ID'),
+)
+
+
+def flatten_headers(headers) -> dict:
+    """Turns Gmail's name/value header array into a dict, keeping repeated headers as lists"""
+    flat = {}
+    for header in headers or []:
+        name, value = header.get('name'), header.get('value', '')
+        if not name:
+            continue
+        if name not in flat:
+            flat[name] = value
+        elif isinstance(flat[name], list):
+            flat[name].append(value)
+        else:
+            flat[name] = [flat[name], value]
+    return flat
+
+
+def decode_body(data: str, charset: str = 'utf-8') -> str:
+    """Decodes a base64url body.data blob, returning the input unchanged when it is not valid"""
+    try:
+        raw = base64.urlsafe_b64decode(data + '=' * (-len(data) % 4))
+        text = raw.decode(charset)
+    except (binascii.Error, LookupError, UnicodeDecodeError, ValueError):
+        return data
+    return text.replace('\r\n', '\n')
+
+
+def iter_parts(part):
+    """Yields every leaf MIME part of a Gmail payload, depth first"""
+    children = part.get('parts')
+    if not children:
+        yield part
+        return
+    for child in children:
+        yield from iter_parts(child)
+
+
+def _part_charset(part) -> str:
+    content_type = flatten_headers(part.get('headers')).get('Content-Type', '')
+    if isinstance(content_type, list):
+        content_type = content_type[0]
+    match = _CHARSET.search(content_type)
+    return match.group(1) if match else 'utf-8'
+
+
+def decode_parts(payload) -> dict:
+    """Decodes the text parts of a message into a mimeType -> text mapping"""
+    bodies = {}
+    for part in iter_parts(payload or {}):
+        mime_type = part.get('mimeType', '')
+        data = (part.get('body') or {}).get('data')
+        if not data or not mime_type.startswith('text/') or part.get('filename'):
+            continue
+        text = decode_body(data, _part_charset(part))
+        bodies[mime_type] = bodies[mime_type] + '\n' + text if mime_type in bodies else text
+    return bodies
+
+
+def attachments(payload) -> list:
+    """Lists attachment filenames and sizes without their content"""
+    return [
+        {'filename': part['filename'], 'mimeType': part.get('mimeType'), 'size': (part.get('body') or {}).get('size')}
+        for part in iter_parts(payload or {})
+        if part.get('filename')
+    ]
+
+
+def _internal_date(value):
+    try:
+        return datetime.fromtimestamp(int(value) / 1000, tz=timezone.utc).isoformat()
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_message(message: dict, projection: HeaderProjection = None) -> dict:
+    """Builds a compact, already-decoded document from a Gmail API message resource"""
+    payload = message.get('payload') or {}
+    headers = flatten_headers(payload.get('headers'))
+    if projection is not None:
+        headers = projection.apply(headers)
+    bodies = decode_parts(payload)
+    mime_type = 'text/plain' if 'text/plain' in bodies else next(iter(bodies), None)
+    body = bodies.get(mime_type, '')
+    if mime_type == 'text/html':
+        body = html_to_text(body)
+    document = {
+        'id': message.get('id'),
+        'threadId': message.get('threadId'),
+        'labelIds': message.get('labelIds', []),
+        'receivedAt': _internal_date(message.get('internalDate')),
+        'snippet': message.get('snippet', ''),
+        'headers': headers,
+        'bodyMimeType': mime_type,
+        'body': body,
+    }
+    files = attachments(payload)
+    if files:
+        document['attachments'] = files
+    return document
+
+
+def load_message(raw, projection: HeaderProjection = None):
+    """Returns the parsed document of a raw Gmail trigger payload, or None for anything else"""
+    message = (load_payload(raw) or {}).get('result')
+    if not isinstance(message, dict) or 'payload' not in message:
+        return None
+    return parse_message(message, projection)
+
+
+def prepare_message(raw, projection: HeaderProjection = None, transform=None):
+    """Replaces a raw Gmail trigger payload with its parsed document; non-Gmail input is returned unchanged
+
+    ``transform`` may rewrite the parsed document before serialization (e.g. to
+    swap in a thread delta).
+    """
+    payload = load_payload(raw)
+    message = (payload or {}).get('result')
+    if not isinstance(message, dict) or 'payload' not in message:
+        return raw
+    parsed = parse_message(message, projection)
+    document = dump_payload(transform(parsed) if transform else parsed)
+    report = size_report(raw if isinstance(raw, str) else dump_payload(payload), document)
+    logger.info('Gmail message %s: %d -> %d bytes, ~%d tokens saved',
+                message.get('id'), report['bytes_before'], report['bytes_after'], report['tokens_saved'])
+    return document
+
+
+def measure(paths, projections=(('alert', ALERT_HEADERS), ('message', MESSAGE_HEADERS))):
+    """Reports bytes/tokens of each sample as raw JSON, decoded only, and decoded plus each projection"""
+    rows = []
+    for path in paths:
+        with open(path, encoding='utf-8') as handle:
+            raw = handle.read()
+        message = json.loads(raw)['result']
+        row = {'sample': path, 'decoded': size_report(raw, dump_payload(parse_message(message)))}
+        for name, projection in projections:
+            row[name] = size_report(raw, dump_payload(parse_message(message, projection)))
+        rows.append(row)
+    return rows
+
+
+if __name__ == "__main__":
+    # python -m trigger_utils.gmail gmail/*.json
+    for row in measure(sys.argv[1:]):
+        print(row['sample'])
+        for stage in ('decoded', 'alert', 'message'):
+            report = row[stage]
+            print(f"  {stage:<8} {report['bytes_before']:>6} -> {report['bytes_after']:>6} bytes"
+                  f"  ~{report['tokens_before']:>5} -> {report['tokens_after']:>5} tokens"
+                  f"  ({report['tokens_saved']} saved)")
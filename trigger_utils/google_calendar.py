@@ -0,0 +1,274 @@
+import json
+import sys
+from collections import Counter
+from datetime import date, datetime, timezone
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from trigger_utils.payload import dump_payload, load_payload
+from trigger_utils.store import StateStore
+
+
+RESPONSE_STATUSES = ('accepted', 'tentative', 'declined', 'needsAction')
+
+# Fields whose change makes an event worth a new analysis; anything else (etag,
+# updated, sequence, attendee responses, phase changes) only earns a delta note.
+MATERIAL_FIELDS = ('summary', 'description', 'location', 'start', 'end', 'status', 'eventType', 'recurrence',
+                   'workingLocationProperties')
+
+# Transitions that kick off the crew by default
+RUN_TRANSITIONS = ('created', 'updated', 'canceled')
+
+# Entry point fields passed on to the crew; add-on specific fields are left out
+ENTRY_POINT_FIELDS = ('entryPointType', 'uri', 'label', 'meetingCode', 'accessCode', 'passcode', 'pin', 'regionCode')
+
+
+def load_event(raw):
+    """The ``result`` event of a Google Calendar trigger payload, or None for other payloads"""
+    event = (load_payload(raw) or {}).get('result')
+    if not isinstance(event, dict) or not isinstance(event.get('start'), dict):
+        return None
+    return event
+
+
+def _zone(name):
+    try:
+        return ZoneInfo(name) if name else None
+    except (ZoneInfoNotFoundError, ValueError):
+        return None
+
+
+def event_time(moment: dict):
+    """(aware datetime, all-day flag) of an event start/end; all-day dates are midnight in their timezone"""
+    if not isinstance(moment, dict):
+        return None, False
+    zone = _zone(moment.get('timeZone'))
+    if moment.get('dateTime'):
+        try:
+            parsed = datetime.fromisoformat(moment['dateTime'].replace('Z', '+00:00'))
+        except ValueError:
+            return None, False
+        return (parsed if parsed.tzinfo else parsed.replace(tzinfo=zone or timezone.utc)), False
+    if moment.get('date'):
+        try:
+            day = date.fromisoformat(moment['date'])
+        except ValueError:
+            return None, True
+        return datetime(day.year, day.month, day.day, tzinfo=zone or timezone.utc), True
+    return None, False
+
+
+def _iso(moment: datetime, zone=None) -> str:
+    return (moment.astimezone(zone) if zone else moment).isoformat(timespec='minutes')
+
+
+def attendee_counts(attendees) -> dict:
+    """Attendee total and response breakdown; meeting rooms (``resource``) are counted apart"""
+    people = [attendee for attendee in attendees or () if isinstance(attendee, dict) and not attendee.get('resource')]
+    statuses = Counter(attendee.get('responseStatus') or 'needsAction' for attendee in people)
+    counts = {'total': len(people), **{status: statuses.get(status, 0) for status in RESPONSE_STATUSES}}
+    counts['optional'] = sum(1 for attendee in people if attendee.get('optional'))
+    counts['rooms'] = len(attendees or ()) - len(people)
+    counts['responseRate'] = round((len(people) - counts['needsAction']) / len(people), 3) if people else None
+    counts['acceptanceRate'] = round(counts['accepted'] / len(people), 3) if people else None
+    return counts
+
+
+def conference_facts(conference) -> dict:
+    """Platform and entry points of ``conferenceData``, without its add-on parameters"""
+    if not isinstance(conference, dict):
+        return None
+    entry_points = [
+        {name: point[name] for name in ENTRY_POINT_FIELDS if point.get(name)}
+        for point in conference.get('entryPoints') or () if isinstance(point, dict)
+    ]
+    return {
+        'platform': (conference.get('conferenceSolution') or {}).get('name'),
+        'entryPointTypes': sorted({point['entryPointType'] for point in entry_points if 'entryPointType' in point}),
+        'entryPoints': entry_points,
+    }
+
+
+def event_facts(event: dict, now: datetime = None) -> dict:
+    """Deterministic facts of a Google Calendar event, computed as of ``now`` (default: current UTC time)
+
+    Start and end are given in UTC and in the event's own timezone, durations
+    come from the aware datetimes (so offsets and DST are handled), attendees are
+    counted per response status and conference entry points are flattened.
+    Facts whose inputs are missing are left out.
+    """
+    now = now or datetime.now(timezone.utc)
+    zone = _zone((event.get('start') or {}).get('timeZone'))
+    start, all_day = event_time(event.get('start'))
+    end, _ = event_time(event.get('end'))
+    organizer = event.get('organizer') or {}
+    facts = {
+        'asOf': now.isoformat(timespec='seconds'),
+        'status': event.get('status'),
+        'eventType': event.get('eventType'),
+        'allDay': all_day,
+        'timeZone': zone.key if zone else None,
+        'recurring': bool(event.get('recurringEventId') or event.get('recurrence')),
+        'organizer': organizer.get('displayName') or organizer.get('email'),
+    }
+    if start is not None:
+        facts['startUtc'] = _iso(start, timezone.utc)
+        facts['startLocal'] = _iso(start, zone)
+        facts['startsInHours'] = round((start - now).total_seconds() / 3600, 1)
+    if end is not None:
+        facts['endUtc'] = _iso(end, timezone.utc)
+        facts['endLocal'] = _iso(end, zone)
+    if start is not None and end is not None:
+        minutes = (end - start).total_seconds() / 60
+        facts['durationMinutes'] = int(minutes) if minutes.is_integer() else round(minutes, 1)
+        if all_day:
+            facts['durationDays'] = (end.date() - start.date()).days
+        facts['phase'] = 'upcoming' if now < start else 'in progress' if now < end else 'ended'
+    if event.get('attendees'):
+        facts['attendees'] = attendee_counts(event['attendees'])
+    conference = conference_facts(event.get('conferenceData'))
+    if conference:
+        facts['conference'] = conference
+    return {name: value for name, value in facts.items() if value is not None}
+
+
+def prepare_event(raw, transform=None):
+    """Adds ``event_facts`` to a Google Calendar trigger payload; other input is returned unchanged
+
+    ``conferenceData`` is replaced by the flattened ``facts.conference``.
+    ``transform`` may rewrite the payload document before serialization.
+    """
+    payload = load_payload(raw)
+    event = load_event(payload)
+    if event is None:
+        return raw
+    document = {
+        **payload,
+        'result': {name: value for name, value in event.items() if name != 'conferenceData'},
+        'facts': event_facts(event),
+    }
+    return dump_payload(transform(document) if transform else document)
+
+
+def _material(event: dict) -> dict:
+    material = {name: event[name] for name in MATERIAL_FIELDS if event.get(name) not in (None, '', [], {})}
+    attendees = sorted(attendee['email'] for attendee in event.get('attendees') or ()
+                       if isinstance(attendee, dict) and attendee.get('email'))
+    if attendees:
+        material['attendees'] = attendees
+    conference = conference_facts(event.get('conferenceData'))
+    if conference and conference['entryPoints']:
+        material['conference'] = [point.get('uri') for point in conference['entryPoints']]
+    return material
+
+
+def _responses(event: dict) -> dict:
+    return {attendee['email']: attendee.get('responseStatus') or 'needsAction' for attendee in event.get('attendees') or ()
+            if isinstance(attendee, dict) and attendee.get('email')}
+
+
+def _phase(event: dict, now: datetime) -> str:
+    start, _ = event_time(event.get('start'))
+    end, _ = event_time(event.get('end'))
+    if start is None or now < start:
+        return 'upcoming'
+    return 'in progress' if end is None or now < end else 'ended'
+
+
+class EventLifecycle:
+    """Last known state of each Google Calendar event, keyed on ``result.id``
+
+    Google sends new-event, event-updated, event-started, event-ended and
+    event-canceled for the same event, and the payload does not say which one
+    it is. ``transition(event)`` compares the event with its stored state and
+    names what happened:
+
+    - created: first time the event is seen
+    - updated: a material field (title, time, location, description, attendee
+      list, conference links, status) changed; ``changes`` holds before/after
+    - canceled: the status became cancelled
+    - started / ended: only the phase moved on, given the current time
+    - responses: only attendee responses changed
+    - unchanged: a repeat delivery, or an update older than the stored one (``stale``)
+
+    Only ``run_transitions`` deserve a crew run; ``remember(event)`` stores the
+    new state once the event has been handled.
+    """
+
+    def __init__(self, path: str = ':memory:', ttl: float = 90 * 24 * 3600, max_entries: int = 100_000,
+                 run_transitions=RUN_TRANSITIONS, store=None):
+        if store is None:
+            store = StateStore(path, table='calendar_events', ttl=ttl, max_entries=max_entries)
+        self.store = store
+        self.run_transitions = tuple(run_transitions)
+
+    def transition(self, event: dict, now: datetime = None) -> dict:
+        now = now or datetime.now(timezone.utc)
+        state = self.store.get(str(event.get('id')))
+        phase = _phase(event, now)
+        if state is None:
+            name = 'canceled' if event.get('status') == 'cancelled' else 'created'
+            return {'transition': name, 'run': name in self.run_transitions, 'phase': phase}
+        transition = {'since': state.get('updated'), 'phase': phase, 'stale': False}
+        if state.get('updated') and event.get('updated') and event['updated'] < state['updated']:
+            transition.update(transition='unchanged', run=False, stale=True)
+            return transition
+        material = _material(event)
+        changes = {name: {'before': state['material'].get(name), 'after': material.get(name)}
+                   for name in state['material'].keys() | material.keys()
+                   if state['material'].get(name) != material.get(name)}
+        responses = _responses(event)
+        responded = {email: {'before': state['responses'].get(email), 'after': status}
+                     for email, status in responses.items() if state['responses'].get(email) != status}
+        if 'status' in changes and event.get('status') == 'cancelled':
+            name = 'canceled'
+        elif changes:
+            name = 'updated'
+        elif phase != state.get('phase'):
+            name = 'started' if phase == 'in progress' else 'ended' if phase == 'ended' else 'unchanged'
+        elif responded:
+            name = 'responses'
+        else:
+            name = 'unchanged'
+        transition.update(transition=name, run=name in self.run_transitions, changes=changes, responses=responded)
+        return transition
+
+    def remember(self, event: dict, now: datetime = None) -> None:
+        if event.get('id') is None:
+            return
+        state = self.store.get(str(event['id']))
+        if state and state.get('updated') and (event.get('updated') or '') < state['updated']:
+            return
+        self.store.put(str(event['id']), {
+            'updated': event.get('updated'),
+            'phase': _phase(event, now or datetime.now(timezone.utc)),
+            'material': _material(event),
+            'responses': _responses(event),
+        })
+
+
+def delta_note(event: dict, transition: dict) -> str:
+    """Result returned instead of a crew run for a transition that needs no new analysis"""
+    title = f"Calendar event \"{event.get('summary') or '(no title)'}\" ({event.get('id')})"
+    if transition.get('stale'):
+        return f"{title}: out-of-order update from {event.get('updated')}, skipped\n"
+    name = transition['transition']
+    note = name if name in ('started', 'ended', 'canceled') else 'no material change'
+    responses = transition.get('responses') or {}
+    if responses:
+        note += '; responses: ' + ', '.join(f"{email} {change['before'] or 'new'} -> {change['after']}"
+                                             for email, change in sorted(responses.items())[:5])
+        note += ' …' if len(responses) > 5 else ''
+    return f"{title}: {note} since the last analysis, skipped\n"
+
+
+# Shared by the calendar crews of one process, so every crew sees each event's history
+EVENTS = EventLifecycle()
+
+
+if __name__ == "__main__":
+    # python -m trigger_utils.google_calendar google_calendar/*.json
+    for path in sys.argv[1:]:
+        with open(path, encoding='utf-8') as handle:
+            event = load_event(handle.read())
+        print(path)
+        print(json.dumps(event_facts(event) if event else None, indent=2))
@@ -0,0 +1,188 @@
+import re
+import sys
+import time
+import tracemalloc
+from html.parser import HTMLParser
+
+
+# Elements whose content is never visible text
+SKIPPED = frozenset({'script', 'style', 'head', 'title', 'noscript', 'template', 'svg', 'object'})
+# Elements that start a new line in the rendered text
+BLOCKS = frozenset({
+    'p', 'div', 'br', 'tr', 'li', 'ul', 'ol', 'table', 'section', 'article', 'header', 'footer',
+    'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'blockquote', 'pre', 'hr',
+})
+VOID = frozenset({'br', 'hr', 'img', 'meta', 'link', 'input', 'area', 'base', 'col', 'source', 'wbr'})
+# Start tags that implicitly close the innermost open elements of these kinds (HTML's optional end tags)
+IMPLIED_END = {
+    'p': frozenset({'p'}),
+    'li': frozenset({'li', 'p'}),
+    'dt': frozenset({'dt', 'dd', 'p'}),
+    'dd': frozenset({'dt', 'dd', 'p'}),
+    'td': frozenset({'td', 'th', 'p'}),
+    'th': frozenset({'td', 'th', 'p'}),
+    'tr': frozenset({'tr', 'td', 'th', 'p'}),
+    'option': frozenset({'option'}),
+}
+
+_SPACES = re.compile(r'[ \t\r\f\v ​‌͏]+')
+_HIDDEN = re.compile(r'display\s*:\s*none|visibility\s*:\s*hidden', re.IGNORECASE)
+
+
+def _is_tracking_pixel(attrs: dict) -> bool:
+    if attrs.get('width') in ('0', '1') or attrs.get('height') in ('0', '1'):
+        return True
+    return bool(_HIDDEN.search(attrs.get('style') or ''))
+
+
+class _TextExtractor(HTMLParser):
+    """Incremental HTML parser that queues visible text; only unparsed input is buffered"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.pending = []
+        self._skip_depth = 0
+        # Open non-void elements; hidden content lasts until the element at _hidden_at is closed
+        self._open = []
+        self._hidden_at = None
+        self._at_line_start = True
+        self._blank_lines = 0
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag in SKIPPED:
+            self._skip_depth += 1
+            return
+        if tag in IMPLIED_END:
+            while self._open and self._open[-1] in IMPLIED_END[tag]:
+                self._close(len(self._open) - 1)
+        if tag not in VOID:
+            if self._hidden_at is None and _HIDDEN.search(attrs.get('style') or ''):
+                self._hidden_at = len(self._open)
+            self._open.append(tag)
+        if self._hidden_at is not None:
+            return
+        if tag == 'img':
+            if not _is_tracking_pixel(attrs) and attrs.get('alt'):
+                self._text(attrs['alt'])
+        elif tag in BLOCKS:
+            self._newline()
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag not in VOID:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        if tag in SKIPPED:
+            self._skip_depth = max(0, self._skip_depth - 1)
+            return
+        hidden = self._hidden_at is not None
+        if tag in self._open:
+            # Closing an element also closes every element left open inside it
+            self._close(len(self._open) - 1 - self._open[::-1].index(tag))
+        if not hidden and tag in BLOCKS:
+            self._newline()
+
+    def _close(self, depth: int) -> None:
+        del self._open[depth:]
+        if self._hidden_at is not None and depth <= self._hidden_at:
+            self._hidden_at = None
+
+    def handle_data(self, data):
+        if not self._skip_depth and self._hidden_at is None:
+            self._text(data)
+
+    def _text(self, data):
+        text = _SPACES.sub(' ', data.replace('\n', ' '))
+        if self._at_line_start:
+            text = text.lstrip()
+        if text:
+            self.pending.append(text)
+            self._at_line_start = False
+            self._blank_lines = 0
+
+    def _newline(self):
+        if self._blank_lines < 2:
+            self.pending.append('\n')
+            self._blank_lines += 1
+        self._at_line_start = True
+
+    def take(self):
+        pending, self.pending = self.pending, []
+        return pending
+
+
+def iter_text(chunks):
+    """Yields visible text pieces from an iterable of HTML chunks
+
+    Time is linear in the input and memory is bounded by the largest unparsed
+    fragment, so arbitrarily large bodies can be streamed through.
+    """
+    parser = _TextExtractor()
+    for chunk in chunks:
+        parser.feed(chunk)
+        yield from parser.take()
+    parser.close()
+    yield from parser.take()
+
+
+def html_to_text(html, max_chars: int = None) -> str:
+    """Converts an HTML string (or iterable of chunks) to plain text, optionally truncated"""
+    chunks = (html,) if isinstance(html, str) else html
+    pieces, size = [], 0
+    for piece in iter_text(chunks):
+        pieces.append(piece)
+        size += len(piece)
+        if max_chars is not None and size >= max_chars:
+            break
+    text = ''.join(pieces).strip()
+    return text if max_chars is None else text[:max_chars]
+
+
+def marketing_email(blocks: int) -> str:
+    """Synthetic marketing-style email: inline CSS, tables, tracking pixels and a long footer"""
+    section = (
+        '<table role="presentation" style="width:100%;border-collapse:collapse;font-family:Arial">'
+        '<tr><td style="padding:24px;background:#f4f4f4"><h2 style="color:#333">Offer {i}</h2>'
+        '<p style="font-size:14px;line-height:20px">Save 20% on plan {i} &amp; get free onboarding.</p>'
+        '<a href="https://example.com/offer/{i}?utm_source=email" style="color:#06c">Shop now</a>'
+        '<img src="https://t.example.com/o/{i}.gif" width="1" height="1" alt="">'
+        '<div style="display:none">preheader filler {i}</div></td></tr></table>\n'
+    )
+    head = '<html><head><style>' + 'td{padding:0}' * 200 + '</style><script>var t=1;</script></head><body>'
+    return head + ''.join(section.format(i=i) for i in range(blocks)) + '</body></html>'
+
+
+def benchmark(sizes=(1_000, 10_000, 50_000), chunk_size: int = 64 * 1024):
+    """Measures time and peak parser memory for increasingly large marketing emails
+
+    Timing and memory are taken in separate passes because tracemalloc slows the
+    parser down several-fold.
+    """
+    rows = []
+    for blocks in sizes:
+        html = marketing_email(blocks)
+
+        def chunks():
+            return (html[i:i + chunk_size] for i in range(0, len(html), chunk_size))
+
+        started = time.perf_counter()
+        text_chars = sum(len(piece) for piece in iter_text(chunks()))
+        elapsed = time.perf_counter() - started
+        tracemalloc.start()
+        for _ in iter_text(chunks()):
+            pass
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        rows.append({'html_bytes': len(html), 'text_chars': text_chars, 'seconds': elapsed, 'peak_bytes': peak})
+    return rows
+
+
+if __name__ == "__main__":
+    # python -m trigger_utils.html_text [blocks ...]
+    sizes = tuple(int(arg) for arg in sys.argv[1:]) or (1_000, 10_000, 50_000)
+    for row in benchmark(sizes):
+        print(f"{row['html_bytes']:>12,} bytes html -> {row['text_chars']:>10,} chars text"
+              f"  {row['seconds']:8.3f}s  {row['html_bytes'] / row['seconds'] / 1e6:6.1f} MB/s"
+              f"  peak {row['peak_bytes'] / 1024:8.1f} KiB")
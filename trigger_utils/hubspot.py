@@ -0,0 +1,283 @@
+import json
+import logging
+import re
+import sys
+from datetime import datetime, timezone
+from fnmatch import fnmatchcase
+
+from trigger_utils.payload import dump_payload, load_payload, size_report
+
+
+logger = logging.getLogger(__name__)
+
+
+class PropertyProjection:
+    """Keeps the HubSpot properties matching any of the given names or 'hs_num_*' patterns"""
+
+    def __init__(self, keep):
+        self.keep = tuple(keep)
+        self._names = {name for name in self.keep if not any(char in name for char in '*?[')}
+        self._patterns = tuple(name for name in self.keep if name not in self._names)
+
+    def keeps(self, name: str) -> bool:
+        return name in self._names or any(fnmatchcase(name, pattern) for pattern in self._patterns)
+
+    def apply(self, properties: dict) -> dict:
+        return {name: value for name, value in properties.items() if self.keeps(name) and value not in (None, '')}
+
+
+# Fields the contact, company and deal analysis tasks ask about; everything else
+# (hs_analytics_*, *_contact mirrors, hs_object_source*, hs_v2_* ...) is tracking data.
+CONTACT_PROPERTIES = PropertyProjection((
+    'firstname', 'lastname', 'email', 'work_email', 'phone', 'company', 'jobtitle', 'website',
+    'city', 'state', 'country', 'industry', 'company_size', 'annualrevenue', 'associatedcompanyid',
+    'lifecyclestage', 'createdate', 'lastmodifieddate', 'lead_score_*', 'demo_request_score',
+    'hs_email_open', 'hs_email_click', 'hs_email_delivered', 'hs_email_last_open_date', 'hs_email_last_click_date',
+    'hs_analytics_num_page_views', 'hs_analytics_num_visits', 'hs_calculated_form_submissions',
+    'num_conversion_events', 'first_conversion_event_name', 'first_conversion_date',
+    'recent_conversion_event_name', 'recent_conversion_date',
+    'how_technical_are_you_and_your_team_', 'used_crewai', 'ai_adoption_stage',
+))
+
+COMPANY_PROPERTIES = PropertyProjection((
+    'name', 'domain', 'website', 'industry', 'description', 'annualrevenue', 'numberofemployees',
+    'city', 'state', 'country', 'founded_year', 'is_public', 'lifecyclestage', 'market_segment',
+    'company_segment', 'web_technologies', 'createdate', 'hs_lastmodifieddate', 'hs_num_*',
+    'num_associated_contacts', 'num_associated_deals', 'hs_total_deal_value', 'crewai_enterprise_plan_name',
+))
+
+DEAL_PROPERTIES = PropertyProjection((
+    'dealname', 'dealstage', 'pipeline', 'amount', 'deal_currency_code', 'closedate', 'createdate',
+    'hs_lastmodifieddate', 'hs_deal_stage_probability', 'hs_forecast_amount', 'hs_arr', 'hs_mrr', 'hs_acv',
+    'hs_tcv', 'crewai_arr', 'deal_total_score', 'hs_deal_score', 'days_to_close', 'deal_age',
+    'hs_is_closed', 'hs_is_closed_won', 'hubspot_owner_id', 'num_associated_contacts',
+    'executive_sponsor_confirmed',
+))
+
+RECORD_PROPERTIES = {'contact': CONTACT_PROPERTIES, 'company': COMPANY_PROPERTIES, 'deal': DEAL_PROPERTIES}
+
+
+def object_type(properties: dict):
+    """Infers contact, company or deal from the properties HubSpot sends (None when unclear)"""
+    if 'dealname' in properties or 'dealstage' in properties:
+        return 'deal'
+    if 'firstname' in properties or 'lastname' in properties or 'email' in properties:
+        return 'contact'
+    if 'domain' in properties or 'name' in properties:
+        return 'company'
+    return None
+
+
+_NUMBER = re.compile(r'-?\d+(?:\.\d+)?')
+_TIMESTAMP = re.compile(r'\d{4}-\d{2}-\d{2}(?:T\d{2}:\d{2}(?::\d{2}(?:\.\d+)?)?(?:Z|[+-]\d{2}:?\d{2})?)?')
+
+# Lower bounds of the lead score bands, highest first
+LEAD_SCORE_BANDS = ((70, 'hot'), (40, 'warm'), (0, 'cold'))
+
+
+def coerce(value):
+    """Parses one HubSpot property string into int, float, bool or an aware datetime; other values pass through"""
+    if not isinstance(value, str):
+        return value
+    text = value.strip()
+    if text in ('true', 'false'):
+        return text == 'true'
+    if _NUMBER.fullmatch(text):
+        number = float(text)
+        return int(number) if number.is_integer() else number
+    if _TIMESTAMP.fullmatch(text):
+        try:
+            parsed = datetime.fromisoformat(text.replace('Z', '+00:00'))
+        except ValueError:
+            return value
+        return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+    return value
+
+
+def typed_properties(properties: dict) -> dict:
+    """All properties coerced once, so derived metrics never re-parse strings"""
+    return {name: coerce(value) for name, value in properties.items() if value not in (None, '')}
+
+
+def _ratio(numerator, denominator):
+    if isinstance(numerator, (int, float)) and isinstance(denominator, (int, float)) and denominator:
+        return round(numerator / denominator, 3)
+    return None
+
+
+def _days(later, earlier):
+    if isinstance(later, datetime) and isinstance(earlier, datetime):
+        return round((later - earlier).total_seconds() / 86400, 1)
+    return None
+
+
+def _number(value):
+    return value if isinstance(value, (int, float)) and not isinstance(value, bool) else None
+
+
+def lead_score_band(score):
+    return next((band for floor, band in LEAD_SCORE_BANDS if score >= floor), None) if score is not None else None
+
+
+def record_facts(record: dict, now: datetime = None) -> dict:
+    """Deterministic metrics derived from a HubSpot record, computed as of ``now`` (default: current UTC time)
+
+    Contacts get email open/click/delivery ratios, lead score and band, and
+    record age; deals get amount, ARR, stage probability, weighted amount, deal
+    age and close-date distance; companies get revenue per employee and age.
+    Metrics whose inputs are missing are left out.
+    """
+    now = now or datetime.now(timezone.utc)
+    properties = typed_properties(record.get('properties') or {})
+    kind = object_type(properties)
+    facts = {'objectType': kind, 'asOf': now.isoformat(timespec='seconds')}
+    if kind == 'contact':
+        scores = [value for name, value in properties.items()
+                  if name.startswith('lead_score') and not name.endswith('_threshold') and _number(value) is not None]
+        lead_score = max(scores) if scores else None
+        facts.update({
+            'emailOpenRatio': _ratio(properties.get('hs_email_open'), properties.get('hs_email_delivered')),
+            'emailClickRatio': _ratio(properties.get('hs_email_click'), properties.get('hs_email_delivered')),
+            'emailClickToOpen': _ratio(properties.get('hs_email_click'), properties.get('hs_email_open')),
+            'leadScore': lead_score,
+            'leadScoreBand': lead_score_band(lead_score),
+            'daysSinceCreated': _days(now, properties.get('createdate')),
+            'daysSinceLastEmailOpen': _days(now, properties.get('hs_email_last_open_date')),
+        })
+    elif kind == 'deal':
+        amount = _number(properties.get('amount'))
+        probability = _number(properties.get('hs_deal_stage_probability'))
+        days_to_close = _days(properties.get('closedate'), now)
+        facts.update({
+            'amount': amount,
+            'currency': properties.get('deal_currency_code'),
+            'arr': _number(properties.get('crewai_arr')) or _number(properties.get('hs_arr')),
+            'stageProbability': probability,
+            'weightedAmount': round(amount * probability, 2) if amount is not None and probability is not None else None,
+            'dealAgeDays': _days(now, properties.get('createdate')),
+            'daysUntilClose': days_to_close,
+            'closeDatePassed': days_to_close < 0 if days_to_close is not None else None,
+            'isClosed': properties.get('hs_is_closed'),
+            'isClosedWon': properties.get('hs_is_closed_won'),
+        })
+    elif kind == 'company':
+        founded = _number(properties.get('founded_year'))
+        facts.update({
+            'revenuePerEmployee': _ratio(properties.get('annualrevenue'), properties.get('numberofemployees')),
+            'companyAgeYears': now.year - founded if founded else None,
+        })
+    return {name: value for name, value in facts.items() if value is not None}
+
+
+def project_record(record: dict, projection: PropertyProjection = None) -> dict:
+    """Returns a copy of a HubSpot record whose properties are reduced to the projection
+
+    Without a projection the one for the record's inferred object type is used;
+    records of unknown type are returned unchanged.
+    """
+    properties = record.get('properties')
+    if not isinstance(properties, dict):
+        return record
+    projection = projection or RECORD_PROPERTIES.get(object_type(properties))
+    if projection is None:
+        return record
+    return {**record, 'properties': projection.apply(properties)}
+
+
+def load_record(raw):
+    """The ``result`` record of a HubSpot trigger payload, or None for other payloads"""
+    record = (load_payload(raw) or {}).get('result')
+    if not isinstance(record, dict) or not isinstance(record.get('properties'), dict):
+        return None
+    return record
+
+
+def record_document(record: dict, projection: PropertyProjection = None, facts: bool = False) -> dict:
+    """The payload document sent to the crew for one record: its projection and, with ``facts``, its metrics"""
+    document = {'result': project_record(record, projection)}
+    if facts:
+        document['facts'] = record_facts(record)
+    return document
+
+
+def prepare_record(raw, projection: PropertyProjection = None, transform=None, facts: bool = False):
+    """Replaces a raw HubSpot trigger payload with its projected record; other input is returned unchanged
+
+    With ``facts`` the payload also carries ``record_facts`` of the full record.
+    ``transform`` may rewrite the projected payload before serialization.
+    """
+    record = load_record(raw)
+    if record is None:
+        return raw
+    document = record_document(record, projection, facts)
+    prepared = dump_payload(transform(document) if transform else document)
+    report = size_report(raw if isinstance(raw, str) else dump_payload(raw), prepared)
+    logger.info('HubSpot record %s: %d -> %d bytes, ~%d tokens saved',
+                record.get('id'), report['bytes_before'], report['bytes_after'], report['tokens_saved'])
+    return prepared
+
+
+def record_batch_key(record: dict):
+    """Groups records of one object type into the same batch, e.g. Coalescer(5, 25, key=record_batch_key)"""
+    return object_type(record.get('properties') or {})
+
+
+def batch_payload(records) -> str:
+    """Trigger payload carrying several records of one object type for a single kickoff"""
+    return dump_payload({'batch': list(records)})
+
+
+def load_batch(raw):
+    """The records of a ``batch_payload``, or None for other payloads"""
+    document = load_payload(raw)
+    records = document.get('batch') if isinstance(document, dict) else None
+    if not isinstance(records, list):
+        return None
+    return [record for record in records if isinstance(record, dict) and isinstance(record.get('properties'), dict)]
+
+
+def prepare_batch(raw, projection: PropertyProjection = None, transform=None, facts: bool = False):
+    """Replaces a ``batch_payload`` with one projected document per record; other input is returned unchanged
+
+    ``transform(record, document)`` may rewrite each record's document before
+    serialization. The result also carries the batch object type and size.
+    """
+    records = load_batch(raw)
+    if records is None:
+        return raw
+    documents = []
+    for record in records:
+        document = record_document(record, projection, facts)
+        documents.append(transform(record, document) if transform else document)
+    kinds = {record_batch_key(record) for record in records}
+    prepared = dump_payload({
+        'batch': {'objectType': kinds.pop() if len(kinds) == 1 else 'mixed', 'size': len(documents)},
+        'records': documents,
+    })
+    report = size_report(raw if isinstance(raw, str) else dump_payload(raw), prepared)
+    logger.info('HubSpot batch of %d records: %d -> %d bytes, ~%d tokens saved',
+                len(documents), report['bytes_before'], report['bytes_after'], report['tokens_saved'])
+    return prepared
+
+
+def measure(paths):
+    """Reports bytes/tokens of each sample as raw JSON and after projection"""
+    rows = []
+    for path in paths:
+        with open(path, encoding='utf-8') as handle:
+            raw = handle.read()
+        record = json.loads(raw)['result']
+        projected = dump_payload({'result': project_record(record)})
+        rows.append({'sample': path, 'type': object_type(record['properties']),
+                     'properties': (len(record['properties']), len(json.loads(projected)['result']['properties'])),
+                     'report': size_report(raw, projected)})
+    return rows
+
+
+if __name__ == "__main__":
+    # python -m trigger_utils.hubspot hubspot/*.json
+    for row in measure(sys.argv[1:]):
+        report = row['report']
+        print(f"{row['sample']:<40} {row['type']:<8} {row['properties'][0]:>4} -> {row['properties'][1]:>3} properties"
+              f"  {report['bytes_before']:>6} -> {report['bytes_after']:>5} bytes"
+              f"  ~{report['tokens_before']:>5} -> {report['tokens_after']:>4} tokens ({report['tokens_saved']} saved)")
@@ -0,0 +1,120 @@
+import hashlib
+import math
+import threading
+
+from trigger_utils.payload import load_payload
+from trigger_utils.store import StateStore
+
+
+# Crew -> fields of ``result`` that identify one delivery of one provider event.
+# The first field is required; the others version it, so a real update still runs.
+IDEMPOTENCY_FIELDS = {
+    'GmailAlertTrigger': ('id',),
+    'GmailNewThreadTrigger': ('id',),
+    'GoogleCalendarEventTrigger': ('id', 'updated', 'status'),
+    'GoogleCalendarMeetingTrigger': ('id', 'updated', 'status'),
+    'GoogleCalendarWorkingLocationTrigger': ('id', 'updated', 'status'),
+    'GoogleDriveFileTrigger': ('id', 'modifiedTime'),
+    'GoogleDriveFileDeletionTrigger': ('fileId', 'time'),
+    'HubSpotCompanyTrigger': ('id', 'updatedAt'),
+    'HubSpotContactTrigger': ('id', 'updatedAt'),
+    'HubSpotRecordTrigger': ('id', 'updatedAt'),
+    'MicrosoftTeamsChatCreatedTrigger': ('id', 'lastUpdatedDateTime'),
+    'OneDriveFileTrigger': ('id', 'lastModifiedDateTime'),
+    'OutlookEventRemovalTrigger': ('id', '@odata.etag'),
+    'OutlookMessageTrigger': ('id', 'changeKey'),
+}
+
+
+def idempotency_key(name: str, payload, fields: dict = None):
+    """Provider key of a payload for crew ``name``, e.g. 'HubSpotContactTrigger:123|2024-12-22T...'
+
+    Returns None when the crew has no extractor or the payload lacks the id, in
+    which case the event is never treated as a duplicate.
+    """
+    names = (fields or IDEMPOTENCY_FIELDS).get(name)
+    document = load_payload(payload) if isinstance(payload, str) else payload
+    if not names or not isinstance(document, dict):
+        return None
+    result = document.get('result', document)
+    if not isinstance(result, dict) or result.get(names[0]) in (None, ''):
+        return None
+    return f"{name}:{'|'.join(str(result.get(field, '')) for field in names)}"
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings; answers 'definitely new' without touching disk"""
+
+    def __init__(self, capacity: int = 100_000, error_rate: float = 0.001):
+        self.capacity = capacity
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key: str):
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+        first, second = int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little') | 1
+        return [(first + i * second) % self.size for i in range(self.hashes)]
+
+    def add(self, key: str) -> None:
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+
+class SeenSet:
+    """Bounded, persisted set of processed idempotency keys
+
+    ``claim(key)`` marks an event as in progress and returns False for an event
+    that was already claimed; call ``release(key)`` when its run fails so the
+    provider's redelivery is processed. With ``bloom=True`` (the default) an
+    in-memory Bloom filter answers most first-time keys without a SQLite lookup;
+    it is rebuilt from the store after ``max_entries`` further additions, so
+    evicted keys stop costing lookups.
+    """
+
+    def __init__(self, path: str = ':memory:', ttl: float = 7 * 24 * 3600, max_entries: int = 100_000,
+                 bloom: bool = True, store=None):
+        if store is None:
+            store = StateStore(path, table='seen_events', ttl=ttl, max_entries=max_entries)
+        self.store = store
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self.bloom = None
+        if bloom:
+            self._rebuild()
+        self.duplicates = 0
+
+    def _rebuild(self) -> None:
+        self.bloom = BloomFilter(2 * self.max_entries)
+        for key in self.store.keys():
+            self.bloom.add(key)
+
+    def __contains__(self, key: str) -> bool:
+        if self.bloom is not None and key not in self.bloom:
+            return False
+        return self.store.get(key) is not None
+
+    def claim(self, key) -> bool:
+        """Records ``key`` and returns True, or returns False if it was seen before (None always passes)"""
+        if key is None:
+            return True
+        with self._lock:
+            if key in self:
+                self.duplicates += 1
+                return False
+            self.store.put(key, 1)
+            if self.bloom is not None:
+                if self.bloom.count >= self.bloom.capacity:
+                    self._rebuild()
+                else:
+                    self.bloom.add(key)
+        return True
+
+    def release(self, key) -> None:
+        if key is not None:
+            self.store.delete(key)
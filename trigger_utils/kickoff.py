@@ -0,0 +1,57 @@
+import asyncio
+from functools import partial
+
+
+def _shortcut(trigger, inputs: dict):
+    triage = getattr(trigger, 'triage', None)
+    return triage(inputs) if triage is not None else None
+
+
+def run_trigger(trigger, inputs: dict, crew=None, cache=None):
+    """Kicks off a trigger crew unless its triage step already produced the output
+
+    Crew classes may define ``triage(inputs)`` returning a ready-made result (for
+    example a duplicate notice) to skip the LLM run entirely, or None to proceed.
+    Pass an already built ``crew`` of the same trigger to avoid rebuilding it, and
+    a ResultCache to replay the output of payloads that were already processed
+    (to the trigger's ``output_sink`` when it has one).
+    """
+    key = cache.key(trigger, inputs) if cache is not None else None
+    sink = getattr(trigger, 'output_sink', None)
+    if key is not None:
+        cached = cache.replay(key, sink)
+        if cached is not None:
+            return cached
+    shortcut = _shortcut(trigger, inputs)
+    if shortcut is not None:
+        return shortcut
+    crew = crew or trigger.crew()
+    result = crew.kickoff(inputs=inputs)
+    if key is not None:
+        cache.remember(key, crew, result, sink)
+    return result
+
+
+async def run_trigger_async(trigger, inputs: dict, crew=None, cache=None, executor=None):
+    """Async counterpart of run_trigger using Crew.kickoff_async
+
+    With an ``executor`` the blocking kickoff runs on it instead of the loop's
+    default executor.
+    """
+    key = cache.key(trigger, inputs) if cache is not None else None
+    sink = getattr(trigger, 'output_sink', None)
+    if key is not None:
+        cached = cache.replay(key, sink)
+        if cached is not None:
+            return cached
+    shortcut = _shortcut(trigger, inputs)
+    if shortcut is not None:
+        return shortcut
+    crew = crew or trigger.crew()
+    if executor is not None:
+        result = await asyncio.get_running_loop().run_in_executor(executor, partial(crew.kickoff, inputs=inputs))
+    else:
+        result = await crew.kickoff_async(inputs=inputs)
+    if key is not None:
+        cache.remember(key, crew, result, sink)
+    return result
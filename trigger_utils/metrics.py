@@ -0,0 +1,194 @@
+import json
+import threading
+import time
+from collections import defaultdict
+
+from crewai import BaseLLM
+
+from trigger_utils.payload import PAYLOAD_KEY, estimate_tokens
+
+
+class MeteredLLM(BaseLLM):
+    """Wraps an agent's LLM to time every round trip and estimate its prompt/completion tokens"""
+
+    def __init__(self, inner, on_call):
+        super().__init__(model=getattr(inner, 'model', str(inner)))
+        self.inner = inner
+        self.on_call = on_call
+
+    @property
+    def stop(self):
+        return getattr(self.inner, 'stop', None)
+
+    @stop.setter
+    def stop(self, value):
+        if hasattr(self, 'inner'):
+            self.inner.stop = value
+
+    def call(self, messages, *args, **kwargs):
+        started = time.perf_counter()
+        response = self.inner.call(messages, *args, **kwargs)
+        prompt = messages if isinstance(messages, str) else ''.join(
+            str(message.get('content', '')) for message in messages
+        )
+        self.on_call(estimate_tokens(prompt), estimate_tokens(str(response)), time.perf_counter() - started)
+        return response
+
+    def supports_function_calling(self) -> bool:
+        return self.inner.supports_function_calling()
+
+    def supports_stop_words(self) -> bool:
+        return self.inner.supports_stop_words()
+
+    def get_context_window_size(self) -> int:
+        return self.inner.get_context_window_size()
+
+    def __getattr__(self, name):
+        if name == 'inner':
+            raise AttributeError(name)
+        return getattr(self.inner, name)
+
+
+class _Run:
+    def __init__(self, crew_name: str, task_names: list, payload_bytes: int):
+        self.crew_name = crew_name
+        self.started_at = time.time()
+        self.started = self.mark = time.perf_counter()
+        self.payload_bytes = payload_bytes
+        self.current = 0
+        self.tasks = [
+            {'task': name, 'seconds': 0.0, 'prompt_tokens': 0, 'completion_tokens': 0,
+             'llm_calls': 0, 'llm_seconds': 0.0}
+            for name in task_names
+        ]
+
+
+class CrewMetrics:
+    """Records per-kickoff and per-task wall time, LLM round trips, tokens and payload size
+
+    Attach it to any @CrewBase crew after it is built, without touching its tasks:
+
+        metrics = CrewMetrics(jsonl_path='crew_metrics.jsonl')
+        pool = CrewPool(prepare=metrics.instrument)   # or metrics.instrument(name, crew)
+
+    Per-task token counts are estimates (~4 characters per token) taken around
+    each LLM call; the kickoff record also carries the crew's own usage totals
+    when the LLM reports them. A built crew must only run one kickoff at a time,
+    which CrewPool guarantees.
+    """
+
+    def __init__(self, jsonl_path: str = None):
+        self.jsonl_path = jsonl_path
+        self._lock = threading.Lock()
+        self._runs = {}
+        self.kickoffs = defaultdict(lambda: {'count': 0, 'seconds': 0.0, 'payload_bytes': 0})
+        self.tasks = defaultdict(lambda: {'count': 0, 'seconds': 0.0, 'prompt_tokens': 0,
+                                          'completion_tokens': 0, 'llm_calls': 0})
+
+    def instrument(self, name: str, crew) -> None:
+        key = id(crew)
+        task_names = [task.name or f'task_{index}' for index, task in enumerate(crew.tasks)]
+        for agent in {id(task.agent): task.agent for task in crew.tasks if task.agent}.values():
+            if not isinstance(agent.llm, MeteredLLM):
+                agent.llm = MeteredLLM(agent.llm, lambda *usage, key=key: self._llm_call(key, *usage))
+
+        def start(inputs):
+            payload = (inputs or {}).get(PAYLOAD_KEY) or ''
+            with self._lock:
+                self._runs[key] = _Run(name, task_names, len(str(payload).encode('utf-8')))
+            return inputs
+
+        def finish(result):
+            self._finish(key, result)
+            return result
+
+        previous_callback = crew.task_callback
+
+        def task_done(output):
+            self._task_done(key)
+            if previous_callback is not None:
+                previous_callback(output)
+
+        # Run first so the payload is measured before other hooks rewrite it
+        crew.before_kickoff_callbacks = [start] + list(crew.before_kickoff_callbacks or [])
+        crew.after_kickoff_callbacks = list(crew.after_kickoff_callbacks or []) + [finish]
+        crew.task_callback = task_done
+
+    def _llm_call(self, key, prompt_tokens: int, completion_tokens: int, seconds: float) -> None:
+        with self._lock:
+            run = self._runs.get(key)
+            if run is None:
+                return
+            task = run.tasks[min(run.current, len(run.tasks) - 1)]
+            task['prompt_tokens'] += prompt_tokens
+            task['completion_tokens'] += completion_tokens
+            task['llm_calls'] += 1
+            task['llm_seconds'] += seconds
+
+    def _task_done(self, key) -> None:
+        now = time.perf_counter()
+        with self._lock:
+            run = self._runs.get(key)
+            if run is None or run.current >= len(run.tasks):
+                return
+            run.tasks[run.current]['seconds'] = now - run.mark
+            run.mark = now
+            run.current += 1
+
+    def _finish(self, key, result) -> None:
+        with self._lock:
+            run = self._runs.pop(key, None)
+        if run is None:
+            return
+        usage = getattr(result, 'token_usage', None)
+        record = {
+            'crew': run.crew_name,
+            'started_at': run.started_at,
+            'seconds': time.perf_counter() - run.started,
+            'payload_bytes': run.payload_bytes,
+            'usage': usage.model_dump() if hasattr(usage, 'model_dump') else None,
+            'tasks': run.tasks,
+        }
+        with self._lock:
+            kickoff = self.kickoffs[run.crew_name]
+            kickoff['count'] += 1
+            kickoff['seconds'] += record['seconds']
+            kickoff['payload_bytes'] += run.payload_bytes
+            for task in run.tasks:
+                totals = self.tasks[(run.crew_name, task['task'])]
+                totals['count'] += 1
+                for field in ('seconds', 'prompt_tokens', 'completion_tokens', 'llm_calls'):
+                    totals[field] += task[field]
+            if self.jsonl_path:
+                with open(self.jsonl_path, 'a', encoding='utf-8') as handle:
+                    handle.write(json.dumps(record) + '\n')
+
+    def prometheus(self) -> str:
+        """Current totals in the Prometheus text exposition format"""
+        lines = []
+
+        def family(metric, kind, help_text, samples):
+            lines.append(f'# HELP {metric} {help_text}')
+            lines.append(f'# TYPE {metric} {kind}')
+            lines.extend(f'{metric}{{{labels}}} {value}' for labels, value in samples)
+
+        with self._lock:
+            kickoffs = sorted(self.kickoffs.items())
+            tasks = sorted(self.tasks.items())
+        crew_label = [(f'crew="{crew}"', totals) for crew, totals in kickoffs]
+        task_label = [(f'crew="{crew}",task="{task}"', totals) for (crew, task), totals in tasks]
+        family('trigger_kickoffs_total', 'counter', 'Crew kickoffs completed',
+               [(labels, t['count']) for labels, t in crew_label])
+        family('trigger_kickoff_seconds_total', 'counter', 'Wall time spent in crew kickoffs',
+               [(labels, t['seconds']) for labels, t in crew_label])
+        family('trigger_payload_bytes_total', 'counter', 'Trigger payload bytes received by kickoffs',
+               [(labels, t['payload_bytes']) for labels, t in crew_label])
+        family('trigger_task_seconds_total', 'counter', 'Wall time spent per task',
+               [(labels, t['seconds']) for labels, t in task_label])
+        family('trigger_task_prompt_tokens_total', 'counter', 'Estimated prompt tokens per task',
+               [(labels, t['prompt_tokens']) for labels, t in task_label])
+        family('trigger_task_completion_tokens_total', 'counter', 'Estimated completion tokens per task',
+               [(labels, t['completion_tokens']) for labels, t in task_label])
+        family('trigger_task_llm_calls_total', 'counter', 'LLM round trips per task',
+               [(labels, t['llm_calls']) for labels, t in task_label])
+        return '\n'.join(lines) + '\n'
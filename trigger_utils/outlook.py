@@ -0,0 +1,17 @@
+from trigger_utils.html_text import html_to_text
+from trigger_utils.payload import dump_payload, load_payload
+
+
+def prepare_message(raw):
+    """Converts an Outlook message's HTML body to plain text; other input is returned unchanged
+
+    Falls back to ``bodyPreview`` when the HTML has no visible text.
+    """
+    payload = load_payload(raw)
+    message = (payload or {}).get('result')
+    body = (message or {}).get('body') if isinstance(message, dict) else None
+    if not isinstance(body, dict) or str(body.get('contentType', '')).lower() != 'html':
+        return raw
+    text = html_to_text(body.get('content') or '') or message.get('bodyPreview', '')
+    message['body'] = {'contentType': 'text', 'content': text}
+    return dump_payload(payload)
@@ -0,0 +1,40 @@
+import json
+
+
+PAYLOAD_KEY = 'crewai_trigger_payload'
+
+
+def load_payload(raw):
+    """Returns the trigger payload as a dict, or None when it is not a JSON object"""
+    if isinstance(raw, dict):
+        return raw
+    if isinstance(raw, (bytes, str)):
+        try:
+            value = json.loads(raw)
+        except ValueError:
+            return None
+        return value if isinstance(value, dict) else None
+    return None
+
+
+def dump_payload(document) -> str:
+    """Serializes a pre-processed document for the kickoff inputs"""
+    return json.dumps(document, ensure_ascii=False)
+
+
+def estimate_tokens(text) -> int:
+    """Rough prompt token estimate (~4 characters per token) used for size reports"""
+    return (len(text) + 3) // 4
+
+
+def size_report(before, after) -> dict:
+    """Compares two serialized payloads in bytes and estimated tokens"""
+    before_bytes, after_bytes = len(before.encode('utf-8')), len(after.encode('utf-8'))
+    return {
+        'bytes_before': before_bytes,
+        'bytes_after': after_bytes,
+        'bytes_saved': before_bytes - after_bytes,
+        'tokens_before': estimate_tokens(before),
+        'tokens_after': estimate_tokens(after),
+        'tokens_saved': estimate_tokens(before) - estimate_tokens(after),
+    }
@@ -0,0 +1,244 @@
+import heapq
+import math
+import pickle
+import random
+import sys
+import threading
+import time
+from array import array
+from datetime import datetime, timezone
+
+from trigger_utils.hubspot import coerce, object_type
+
+OPEN, WON, LOST, REMOVED = 0, 1, 2, -1
+STATES = {OPEN: 'open', WON: 'won', LOST: 'lost'}
+
+
+def _epoch(value) -> float:
+    parsed = coerce(value) if isinstance(value, str) else value
+    return parsed.timestamp() if isinstance(parsed, datetime) else math.nan
+
+
+def _amount(value) -> float:
+    parsed = coerce(value) if isinstance(value, str) else value
+    return float(parsed) if isinstance(parsed, (int, float)) and not isinstance(parsed, bool) else math.nan
+
+
+def _state(properties: dict) -> int:
+    if str(properties.get('hs_is_closed_won')).lower() == 'true' or properties.get('dealstage') == 'closedwon':
+        return WON
+    if str(properties.get('hs_is_closed')).lower() == 'true' or properties.get('dealstage') == 'closedlost':
+        return LOST
+    return OPEN
+
+
+class DealIndex:
+    """Columnar in-memory index of HubSpot deals, updated from every deal trigger
+
+    Each deal is one row across typed arrays (stage and owner as interned codes,
+    amount, ARR, close date and update time as doubles, state as a byte), so a
+    few hundred thousand deals take tens of megabytes. Rows are indexed by stage
+    and by owner, and per stage and per owner open totals are kept
+    incrementally, so pipeline context for a deal is a dict lookup and filtered
+    queries only scan the matching stage or owner.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._rows = {}
+        self.ids = []
+        self.stage = array('H')
+        self.owner = array('I')
+        self.amount = array('d')
+        self.arr = array('d')
+        self.close = array('d')
+        self.updated = array('d')
+        self.state = array('b')
+        self.stages, self._stage_codes = [], {}
+        self.owners, self._owner_codes = [], {}
+        self._by_stage = {}
+        self._by_owner = {}
+        self._totals = {}
+
+    def __len__(self) -> int:
+        return sum(1 for state in self.state if state != REMOVED)
+
+    @staticmethod
+    def _code(values: list, codes: dict, value) -> int:
+        value = '' if value is None else str(value)
+        if value not in codes:
+            codes[value] = len(values)
+            values.append(value)
+        return codes[value]
+
+    def _contribute(self, row: int, sign: int) -> None:
+        if self.state[row] != OPEN:
+            return
+        amount = self.amount[row] if not math.isnan(self.amount[row]) else 0.0
+        arr = self.arr[row] if not math.isnan(self.arr[row]) else 0.0
+        for key in (('stage', self.stage[row]), ('owner', self.owner[row])):
+            totals = self._totals.setdefault(key, [0, 0.0, 0.0])
+            totals[0] += sign
+            totals[1] += sign * amount
+            totals[2] += sign * arr
+
+    def upsert(self, record: dict) -> bool:
+        """Adds or updates a deal from a HubSpot record; returns False for non-deals and stale updates"""
+        properties = record.get('properties') or {}
+        if object_type(properties) != 'deal' or record.get('id') is None:
+            return False
+        deal_id = int(record['id']) if str(record['id']).isdigit() else str(record['id'])
+        updated = _epoch(record.get('updatedAt') or properties.get('hs_lastmodifieddate'))
+        arr = _amount(properties.get('crewai_arr'))
+        values = (
+            self._code(self.stages, self._stage_codes, properties.get('dealstage')),
+            self._code(self.owners, self._owner_codes, properties.get('hubspot_owner_id')),
+            _amount(properties.get('amount')),
+            arr if not math.isnan(arr) else _amount(properties.get('hs_arr')),
+            _epoch(properties.get('closedate')),
+            updated,
+            REMOVED if record.get('archived') else _state(properties),
+        )
+        with self._lock:
+            row = self._rows.get(deal_id)
+            if row is None:
+                row = self._rows[deal_id] = len(self.ids)
+                self.ids.append(deal_id)
+                for column, value in zip(self._columns(), values):
+                    column.append(value)
+            else:
+                if updated < self.updated[row]:
+                    return False
+                self._contribute(row, -1)
+                self._by_stage[self.stage[row]].discard(row)
+                self._by_owner[self.owner[row]].discard(row)
+                for column, value in zip(self._columns(), values):
+                    column[row] = value
+            if self.state[row] != REMOVED:
+                self._by_stage.setdefault(self.stage[row], set()).add(row)
+                self._by_owner.setdefault(self.owner[row], set()).add(row)
+            self._contribute(row, 1)
+        return True
+
+    def _columns(self):
+        return self.stage, self.owner, self.amount, self.arr, self.close, self.updated, self.state
+
+    def _deal(self, row: int) -> dict:
+        return {
+            'id': self.ids[row],
+            'stage': self.stages[self.stage[row]],
+            'owner': self.owners[self.owner[row]] or None,
+            'amount': None if math.isnan(self.amount[row]) else self.amount[row],
+            'arr': None if math.isnan(self.arr[row]) else self.arr[row],
+            'closeDate': None if math.isnan(self.close[row]) else
+            datetime.fromtimestamp(self.close[row], timezone.utc).isoformat(timespec='seconds'),
+            'state': STATES[self.state[row]],
+        }
+
+    def query(self, stage: str = None, owner: str = None, min_amount: float = None, max_amount: float = None,
+              closing_before: str = None, closing_after: str = None, state: str = 'open', limit: int = 100) -> dict:
+        """Deals matching every given filter, e.g. query(stage='negotiation', min_amount=10_000)
+
+        Returns the match count, total amount and the ``limit`` largest deals.
+        """
+        wanted_state = {name: code for code, name in STATES.items()}.get(state) if state else None
+        before = _epoch(closing_before) if closing_before else math.inf
+        after = _epoch(closing_after) if closing_after else -math.inf
+        low = -math.inf if min_amount is None else min_amount
+        high = math.inf if max_amount is None else max_amount
+        with self._lock:
+            owner_code = self._owner_codes.get(str(owner), -1) if owner is not None else None
+            candidates = []
+            if stage is not None:
+                candidates.append(self._by_stage.get(self._stage_codes.get(stage), set()))
+            if owner_code is not None:
+                candidates.append(self._by_owner.get(owner_code, set()))
+            if candidates:
+                rows = min(candidates, key=len)
+            else:
+                rows = (row for row, row_state in enumerate(self.state) if row_state != REMOVED)
+            stage_code = self._stage_codes.get(stage, -1) if stage is not None else None
+            amount, close, states, owners, stages = self.amount, self.close, self.state, self.owner, self.stage
+            matches = [
+                row for row in rows
+                if (wanted_state is None or states[row] == wanted_state)
+                and (stage_code is None or stages[row] == stage_code)
+                and (owner_code is None or owners[row] == owner_code)
+                and (min_amount is None and max_amount is None or low <= amount[row] <= high)
+                and (closing_before is None and closing_after is None or after <= close[row] <= before)
+            ]
+            total = sum(amount[row] for row in matches if not math.isnan(amount[row]))
+            top = heapq.nlargest(limit, matches, key=lambda row: amount[row] if not math.isnan(amount[row]) else -1)
+            return {'count': len(matches), 'amount': round(total, 2), 'deals': [self._deal(row) for row in top]}
+
+    def totals(self, by: str = 'stage') -> dict:
+        """Open deal count, amount and ARR per stage or per owner"""
+        names = self.stages if by == 'stage' else self.owners
+        with self._lock:
+            return {names[code] or None: {'count': count, 'amount': round(amount, 2), 'arr': round(arr, 2)}
+                    for (kind, code), (count, amount, arr) in self._totals.items() if kind == by and count}
+
+    def context(self, record: dict) -> dict:
+        """Pipeline context for one deal: open totals of its stage and of its owner"""
+        properties = record.get('properties') or {}
+        with self._lock:
+            stage = self._totals.get(('stage', self._stage_codes.get(properties.get('dealstage') or '')), [0, 0.0, 0.0])
+            owner = self._totals.get(('owner', self._owner_codes.get(str(properties.get('hubspot_owner_id')))),
+                                     [0, 0.0, 0.0])
+            open_deals = sum(count for (kind, _), (count, _, _) in self._totals.items() if kind == 'stage')
+        return {
+            'openDeals': open_deals,
+            'stage': {'name': properties.get('dealstage'), 'openDeals': stage[0], 'openAmount': round(stage[1], 2)},
+            'owner': {'id': properties.get('hubspot_owner_id'), 'openDeals': owner[0], 'openAmount': round(owner[1], 2),
+                      'openArr': round(owner[2], 2)},
+        }
+
+    def save(self, path: str) -> None:
+        with self._lock, open(path, 'wb') as handle:
+            pickle.dump({name: value for name, value in vars(self).items() if name != '_lock'}, handle)
+
+    @classmethod
+    def load(cls, path: str) -> 'DealIndex':
+        """Reads an index written by ``save``; only load files this process family wrote (pickle)"""
+        index = cls()
+        with open(path, 'rb') as handle:
+            vars(index).update(pickle.load(handle))
+        return index
+
+
+def benchmark(deals: int = 300_000, seed: int = 0) -> dict:
+    """Loads synthetic deals and times updates, filtered queries and context lookups"""
+    rng = random.Random(seed)
+    stages = ('appointmentscheduled', 'qualification', 'presentationscheduled', 'decisionmakerboughtin',
+              'contractsent', 'negotiation', 'closedwon', 'closedlost')
+    index = DealIndex()
+    started = time.perf_counter()
+    for n in range(deals):
+        amount = rng.randrange(500, 250_000)
+        index.upsert({'id': str(n), 'updatedAt': '2024-12-01T00:00:00Z', 'properties': {
+            'dealname': f'Deal {n}', 'dealstage': rng.choice(stages), 'amount': str(amount),
+            'crewai_arr': str(amount * 12), 'hubspot_owner_id': str(rng.randrange(200)),
+            'closedate': f'2025-{rng.randrange(1, 13):02d}-{rng.randrange(1, 29):02d}T12:00:00Z',
+        }})
+    load_seconds = time.perf_counter() - started
+    timings = {}
+    for name, call in (
+        ('query negotiation > 10k', lambda: index.query(stage='negotiation', min_amount=10_000)),
+        ('query owner 7 closing in Q1', lambda: index.query(owner='7', closing_after='2025-01-01T00:00:00Z',
+                                                            closing_before='2025-04-01T00:00:00Z')),
+        ('totals by stage', lambda: index.totals('stage')),
+        ('context for one deal', lambda: index.context({'properties': {'dealstage': 'negotiation',
+                                                                       'hubspot_owner_id': '7'}})),
+    ):
+        started = time.perf_counter()
+        result = call()
+        timings[name] = ((time.perf_counter() - started) * 1000, result.get('count', len(result)))
+    return {'deals': deals, 'load_us_per_deal': load_seconds / deals * 1e6, 'timings_ms': timings}
+
+
+if __name__ == "__main__":
+    # python -m trigger_utils.pipeline [deals]
+    report = benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 300_000)
+    print(f"{report['deals']:,} deals loaded at {report['load_us_per_deal']:.1f} us/deal")
+    for name, (milliseconds, size) in report['timings_ms'].items():
+        print(f"  {name:<30} {milliseconds:8.2f} ms  ({size} results)")
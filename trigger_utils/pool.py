@@ -0,0 +1,105 @@
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+from trigger_utils.crews import CREWS, load_crew_class
+from trigger_utils.kickoff import run_trigger, run_trigger_async
+
+
+class CrewPool:
+    """Keeps built crews warm so events don't pay Agent/Task construction and validation
+
+    Each checkout hands out a (trigger, crew) pair exclusively to one run, which
+    keeps per-run state such as task outputs isolated; it returns to the pool
+    afterwards. At most ``max_idle`` idle pairs are kept per crew class.
+    ``prepare(name, crew)`` runs once on every newly built crew, e.g. to swap LLMs.
+    With a ResultCache, re-delivered payloads are answered without a checkout.
+    With an OutputSink, every built crew writes its outputs to the sink instead
+    of fixed output files, so concurrent runs of one crew never clobber each other.
+    """
+
+    def __init__(self, crew_classes: dict = None, max_idle: int = 8, prepare=None, cache=None, sink=None):
+        self.crew_classes = crew_classes
+        self.max_idle = max_idle
+        self.prepare = prepare
+        self.cache = cache
+        self.sink = sink
+        self._idle = {}
+        self._lock = threading.Lock()
+        self.built = 0
+
+    def _crew_class(self, name: str):
+        return self.crew_classes[name] if self.crew_classes is not None else load_crew_class(name)
+
+    def _build(self, name: str):
+        trigger = self._crew_class(name)()
+        crew = trigger.crew()
+        if self.sink is not None:
+            trigger.output_sink = self.sink
+            self.sink.attach(name, crew)
+        if self.prepare is not None:
+            self.prepare(name, crew)
+        with self._lock:
+            self.built += 1
+        return trigger, crew
+
+    def warm(self, names=None, per_crew: int = 1) -> None:
+        """Builds crews ahead of the first event, e.g. at worker start-up"""
+        for name in names or (self.crew_classes or CREWS):
+            for _ in range(per_crew):
+                self._release(name, self._build(name))
+
+    @contextmanager
+    def checkout(self, name: str):
+        with self._lock:
+            idle = self._idle.get(name)
+            pair = idle.pop() if idle else None
+        if pair is None:
+            pair = self._build(name)
+        try:
+            yield pair
+        finally:
+            self._release(name, pair)
+
+    def _release(self, name: str, pair) -> None:
+        with self._lock:
+            idle = self._idle.setdefault(name, [])
+            if len(idle) < self.max_idle:
+                idle.append(pair)
+
+    def run(self, name: str, inputs: dict):
+        """Runs one event on a pooled crew, including the trigger's triage step"""
+        with self.checkout(name) as (trigger, crew):
+            return run_trigger(trigger, inputs, crew, self.cache)
+
+    async def run_async(self, name: str, inputs: dict, executor=None):
+        with self.checkout(name) as (trigger, crew):
+            return await run_trigger_async(trigger, inputs, crew, self.cache, executor)
+
+
+def benchmark(events: int = 200, names=None):
+    """Compares building a crew per event with checking out a pooled one (no kickoff)"""
+    rows = []
+    pool = CrewPool()
+    for name in names or CREWS:
+        crew_class = load_crew_class(name)
+        started = time.perf_counter()
+        for _ in range(events):
+            crew_class().crew()
+        per_event = (time.perf_counter() - started) / events
+        pool.warm([name])
+        started = time.perf_counter()
+        for _ in range(events):
+            with pool.checkout(name):
+                pass
+        pooled = (time.perf_counter() - started) / events
+        rows.append({'crew': name, 'build_ms': per_event * 1000, 'pooled_ms': pooled * 1000})
+    return rows
+
+
+if __name__ == "__main__":
+    # python -m trigger_utils.pool [events]
+    for row in benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 200):
+        speedup = row['build_ms'] / row['pooled_ms'] if row['pooled_ms'] else float('inf')
+        print(f"{row['crew']:<38} build {row['build_ms']:9.3f} ms  pooled {row['pooled_ms']:9.4f} ms  x{speedup:,.0f}")
@@ -0,0 +1,129 @@
+import logging
+import sys
+
+from trigger_utils.idempotency import idempotency_key
+from trigger_utils.kickoff import run_trigger
+from trigger_utils.payload import PAYLOAD_KEY, dump_payload, load_payload
+
+
+logger = logging.getLogger(__name__)
+
+ANY = object()
+
+# (field of result, expected value or ANY, crew); when several match, the earliest entry wins.
+# 'parent/child' fields look one level into a nested object (e.g. HubSpot properties).
+SIGNATURES = (
+    ('kind', 'drive#change', 'GoogleDriveFileDeletionTrigger'),
+    ('kind', 'drive#file', 'GoogleDriveFileTrigger'),
+    ('eventType', 'workingLocation', 'GoogleCalendarWorkingLocationTrigger'),
+    ('conferenceData', ANY, 'GoogleCalendarMeetingTrigger'),
+    ('attendees', ANY, 'GoogleCalendarMeetingTrigger'),
+    ('kind', 'calendar#event', 'GoogleCalendarEventTrigger'),
+    ('@odata.type', '#Microsoft.Graph.Event', 'OutlookEventRemovalTrigger'),
+    ('chatType', ANY, 'MicrosoftTeamsChatCreatedTrigger'),
+    ('bodyPreview', ANY, 'OutlookMessageTrigger'),
+    ('parentReference', ANY, 'OneDriveFileTrigger'),
+    ('payload', ANY, 'GmailNewThreadTrigger'),
+    ('properties/dealname', ANY, 'HubSpotRecordTrigger'),
+    ('properties/firstname', ANY, 'HubSpotContactTrigger'),
+    ('properties/email', ANY, 'HubSpotContactTrigger'),
+    ('properties/domain', ANY, 'HubSpotCompanyTrigger'),
+    ('properties/name', ANY, 'HubSpotCompanyTrigger'),
+)
+
+
+def compile_signatures(signatures=SIGNATURES) -> dict:
+    """Builds {field: {value or ANY: (priority, crew)}} so classification is a few dict lookups"""
+    index = {}
+    for priority, (field, value, crew) in enumerate(signatures):
+        index.setdefault(field, {}).setdefault(value, (priority, crew))
+    return index
+
+
+INDEX = compile_signatures()
+
+
+def _is_alert(result: dict) -> bool:
+    for header in (result.get('payload') or {}).get('headers') or []:
+        name = header.get('name', '').lower()
+        if name.startswith('x-alert') or (name.startswith('x-') and name.endswith('-project')):
+            return True
+    return False
+
+
+# Refinements for payload shapes that only differ in content, not in structure
+REFINEMENTS = {
+    'GmailNewThreadTrigger': lambda result: 'GmailAlertTrigger' if _is_alert(result) else 'GmailNewThreadTrigger',
+}
+
+
+def _field(result: dict, field: str):
+    if '/' not in field:
+        return result.get(field, ANY) if field in result else None
+    parent, child = field.split('/', 1)
+    nested = result.get(parent)
+    return nested.get(child, ANY) if isinstance(nested, dict) and child in nested else None
+
+
+def classify(payload, index=INDEX):
+    """Returns the crew class name for a trigger payload, or None when no signature matches"""
+    result = (load_payload(payload) or {}).get('result')
+    if not isinstance(result, dict):
+        return None
+    best = None
+    for field, table in index.items():
+        value = _field(result, field)
+        if value is None:
+            continue
+        hit = table.get(value) if isinstance(value, str) else None
+        hit = hit or table.get(ANY)
+        if hit and (best is None or hit < best):
+            best = hit
+    if best is None:
+        return None
+    crew = best[1]
+    refine = REFINEMENTS.get(crew)
+    return refine(result) if refine else crew
+
+
+def dispatch(payload, crews=None, pool=None, cache=None, seen=None):
+    """Runs the crew matching the payload shape
+
+    ``crews`` maps names to classes (defaults to the repo's scripts); with a
+    CrewPool the run reuses a warm crew instead of building one. ``cache`` is a
+    ResultCache used when running without a pool (a pool has its own). With a
+    SeenSet, events whose provider key was already processed return None.
+    """
+    name = classify(payload)
+    if name is None:
+        raise ValueError('No trigger crew matches this payload')
+    key = idempotency_key(name, payload) if seen is not None else None
+    if seen is not None and not seen.claim(key):
+        logger.info('Skipping already processed event %s', key)
+        return None
+    inputs = {PAYLOAD_KEY: payload if isinstance(payload, str) else dump_payload(payload)}
+    try:
+        if pool is not None:
+            return pool.run(name, inputs)
+        if crews is None:
+            from trigger_utils.crews import load_crew_class
+            crew_class = load_crew_class(name)
+        else:
+            crew_class = crews[name]
+        return run_trigger(crew_class(), inputs, cache=cache)
+    except Exception:
+        if seen is not None:
+            seen.release(key)
+        raise
+
+
+if __name__ == "__main__":
+    # python -m trigger_utils.router [--dry-run] payload.json ...
+    args = sys.argv[1:]
+    dry_run = '--dry-run' in args
+    for path in (arg for arg in args if arg != '--dry-run'):
+        with open(path, encoding='utf-8') as handle:
+            raw = handle.read()
+        print(f'{path}: {classify(raw)}')
+        if not dry_run:
+            print(dispatch(raw))
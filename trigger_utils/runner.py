@@ -0,0 +1,130 @@
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from trigger_utils.crews import integration_of
+from trigger_utils.idempotency import idempotency_key
+from trigger_utils.payload import PAYLOAD_KEY, dump_payload
+from trigger_utils.pool import CrewPool
+from trigger_utils.router import classify
+from trigger_utils.scheduling import PRIORITIES, PriorityGate, priority_of
+
+
+logger = logging.getLogger(__name__)
+
+
+class TriggerRunner:
+    """Consumes trigger payloads from an in-process queue and runs crews concurrently
+
+    Each integration (gmail, hubspot, ...) has its own concurrency limit and all
+    runs share a global cap, so a slow HubSpot analysis only ever occupies
+    HubSpot slots. Runs wait for their integration slot before taking a global
+    one, so queued events of a saturated integration don't block the others.
+    Kickoffs run on the runner's own pool of ``max_concurrency`` threads, shut
+    down when the runner exits; the loop's default executor is left alone. With a
+    SeenSet, events whose provider key was already processed are dropped before
+    they wait for a slot.
+
+    Free slots go to the waiting event with the highest priority rather than the
+    oldest one. ``priorities`` maps crew names to priority functions (see
+    trigger_utils.scheduling), and waiting events gain ``aging`` points per second
+    so low-priority events are never starved.
+
+        async with TriggerRunner(limits={'hubspot': 2}) as runner:
+            await runner.submit(payload)
+    """
+
+    def __init__(self, pool: CrewPool = None, limits: dict = None, default_limit: int = 4,
+                 max_concurrency: int = 16, max_pending: int = 1000, on_result=None,
+                 seen=None, priorities=PRIORITIES, aging: float = 1.0):
+        self.pool = pool or CrewPool()
+        self.limits = limits or {}
+        self.default_limit = default_limit
+        self.max_concurrency = max_concurrency
+        self.max_pending = max_pending
+        self.on_result = on_result
+        self.seen = seen
+        self.priorities = priorities
+        self.aging = aging
+        self.stats = {'submitted': 0, 'completed': 0, 'failed': 0, 'unrouted': 0, 'duplicates': 0}
+        self._gates = {}
+
+    async def __aenter__(self):
+        self._queue = asyncio.Queue(self.max_pending)
+        self._global = PriorityGate(self.max_concurrency, self.aging)
+        self._pending = asyncio.Semaphore(self.max_pending)
+        self._tasks = set()
+        self._executor = ThreadPoolExecutor(self.max_concurrency, thread_name_prefix='trigger-crew')
+        self._dispatcher = asyncio.create_task(self._dispatch())
+        return self
+
+    async def __aexit__(self, *exc_info):
+        try:
+            await self.join()
+        finally:
+            self._dispatcher.cancel()
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+    async def submit(self, payload) -> None:
+        """Queues a payload, waiting when max_pending events are already queued"""
+        self.stats['submitted'] += 1
+        await self._queue.put((payload, self._global.clock()))
+
+    async def join(self) -> None:
+        """Waits until every submitted payload has been processed"""
+        await self._queue.join()
+        while self._tasks:
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
+
+    def _gate(self, integration: str) -> PriorityGate:
+        if integration not in self._gates:
+            self._gates[integration] = PriorityGate(self.limits.get(integration, self.default_limit), self.aging)
+        return self._gates[integration]
+
+    async def _dispatch(self) -> None:
+        while True:
+            payload, submitted_at = await self._queue.get()
+            await self._pending.acquire()
+            task = asyncio.create_task(self._process(payload, submitted_at))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+            self._queue.task_done()
+
+    async def _process(self, payload, submitted_at: float) -> None:
+        key = None
+        try:
+            name = classify(payload)
+            if name is None:
+                self.stats['unrouted'] += 1
+                logger.warning('No trigger crew matches payload, dropping it')
+                return
+            if self.seen is not None:
+                key = idempotency_key(name, payload)
+                if not self.seen.claim(key):
+                    self.stats['duplicates'] += 1
+                    return
+            inputs = {PAYLOAD_KEY: payload if isinstance(payload, str) else dump_payload(payload)}
+            priority = priority_of(name, payload, self.priorities)
+            async with self._gate(integration_of(name)).slot(priority, submitted_at):
+                async with self._global.slot(priority, submitted_at):
+                    result = await self.pool.run_async(name, inputs, self._executor)
+            self.stats['completed'] += 1
+            if self.on_result is not None:
+                outcome = self.on_result(name, result)
+                if asyncio.iscoroutine(outcome):
+                    await outcome
+        except Exception:
+            self.stats['failed'] += 1
+            if self.seen is not None:
+                self.seen.release(key)
+            logger.exception('Trigger crew run failed')
+        finally:
+            self._pending.release()
+
+
+async def run_all(payloads, **options) -> dict:
+    """Runs a batch of payloads through a TriggerRunner and returns its stats"""
+    async with TriggerRunner(**options) as runner:
+        for payload in payloads:
+            await runner.submit(payload)
+    return runner.stats
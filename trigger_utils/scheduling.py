@@ -0,0 +1,152 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from contextlib import asynccontextmanager
+
+from trigger_utils.alerts import SEVERITY_RANK, alert_level, parse_alert
+from trigger_utils.hubspot import load_record, record_facts
+from trigger_utils.payload import load_payload
+
+
+logger = logging.getLogger(__name__)
+
+# Priorities run from 0 (background) to 100 (page someone); crews without a
+# priority function, and payloads it cannot read, get DEFAULT_PRIORITY.
+DEFAULT_PRIORITY = 20
+
+# Alert priority per SEVERITY_RANK; alerts of unknown level rank just below errors
+ALERT_PRIORITIES = {4: 100, 3: 85, 2: 50, 1: 30, 0: 15}
+UNKNOWN_ALERT_PRIORITY = 70
+
+# Added to half the lead score of a contact
+LIFECYCLE_PRIORITIES = {
+    'opportunity': 40, 'salesqualifiedlead': 35, 'marketingqualifiedlead': 25, 'customer': 20,
+    'evangelist': 10, 'lead': 10, 'subscriber': 0, 'other': 0,
+}
+
+OUTLOOK_PRIORITIES = {'high': 70, 'normal': DEFAULT_PRIORITY, 'low': 5}
+
+
+def alert_priority(payload):
+    """Gmail alerts by severity (X-Alert-Level header or level tag)"""
+    document = parse_alert(payload)
+    if document is None:
+        return None
+    return ALERT_PRIORITIES.get(SEVERITY_RANK.get(alert_level(document)), UNKNOWN_ALERT_PRIORITY)
+
+
+def contact_priority(payload):
+    """HubSpot contacts by lead score (highest lead_score_* property) and lifecycle stage"""
+    record = load_record(payload)
+    if record is None:
+        return None
+    score = record_facts(record).get('leadScore') or 0
+    stage = str(record['properties'].get('lifecyclestage') or '').lower()
+    return min(100, score / 2 + LIFECYCLE_PRIORITIES.get(stage, 0))
+
+
+def outlook_priority(payload):
+    """Outlook messages by their importance flag"""
+    message = (load_payload(payload) or {}).get('result')
+    if not isinstance(message, dict):
+        return None
+    return OUTLOOK_PRIORITIES.get(str(message.get('importance') or '').lower())
+
+
+# Crew class name -> priority function of the raw payload; return None to fall back to the default
+PRIORITIES = {
+    'GmailAlertTrigger': alert_priority,
+    'HubSpotContactTrigger': contact_priority,
+    'OutlookMessageTrigger': outlook_priority,
+}
+
+
+def priority_of(name: str, payload, priorities=PRIORITIES, default: float = DEFAULT_PRIORITY) -> float:
+    """Priority of a classified payload; a failing priority function never drops the event"""
+    function = (priorities or {}).get(name)
+    if function is None:
+        return default
+    try:
+        priority = function(payload)
+    except Exception:
+        logger.warning('Priority function for %s failed, using the default priority', name, exc_info=True)
+        return default
+    return default if priority is None else priority
+
+
+class AgingQueue:
+    """Max-priority queue whose waiting items gain ``aging`` priority points per second
+
+    An item's effective priority is ``priority + aging * (now - since)``. As every
+    waiting item ages at the same rate, the order only depends on
+    ``priority - aging * since``, so the heap key is fixed at push time and push
+    and pop stay O(log n). Equal keys leave in insertion order.
+    """
+
+    def __init__(self, aging: float = 1.0, clock=time.monotonic):
+        self.aging = aging
+        self.clock = clock
+        self._heap = []
+        self._order = itertools.count()
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def push(self, item, priority: float, since: float = None) -> None:
+        since = self.clock() if since is None else since
+        heapq.heappush(self._heap, (self.aging * since - priority, next(self._order), item))
+
+    def pop(self):
+        return heapq.heappop(self._heap)[2]
+
+
+class PriorityGate:
+    """asyncio concurrency limit that hands free slots to the highest (aged) priority waiter
+
+    A drop-in for an asyncio.Semaphore when waiters are not equal: with all
+    priorities equal it behaves like a FIFO semaphore.
+
+        async with gate.slot(priority, since=submitted_at):
+            ...
+    """
+
+    def __init__(self, capacity: int, aging: float = 1.0, clock=time.monotonic):
+        self.capacity = capacity
+        self.clock = clock
+        self._active = 0
+        self._waiters = AgingQueue(aging, clock)
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self, priority: float = DEFAULT_PRIORITY, since: float = None) -> None:
+        if self._active < self.capacity and not self._waiters:
+            self._active += 1
+            return
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.push(future, priority, since)
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self.release()
+            raise
+
+    def release(self) -> None:
+        while self._waiters:
+            future = self._waiters.pop()
+            if not future.done():
+                future.set_result(None)
+                return
+        self._active -= 1
+
+    @asynccontextmanager
+    async def slot(self, priority: float = DEFAULT_PRIORITY, since: float = None):
+        await self.acquire(priority, since)
+        try:
+            yield
+        finally:
+            self.release()
@@ -0,0 +1,171 @@
+import gzip
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+
+
+def new_run_id() -> str:
+    """Sortable, collision-free id for one crew run, e.g. '20250821T123239-1f2e3d4c'"""
+    return f"{time.strftime('%Y%m%dT%H%M%S', time.gmtime())}-{uuid.uuid4().hex[:8]}"
+
+
+class OutputSink(ABC):
+    """Receives crew outputs instead of each task's fixed ``output_file``
+
+    ``attach(name, crew)`` fits CrewPool's ``prepare`` hook: it clears the tasks'
+    output files so concurrent runs no longer overwrite the same path, and after
+    every kickoff emits each task's output tagged with a unique run id. Records
+    keep the original file name in ``output_file``. Subclasses implement ``write``;
+    a sink without it cannot be created.
+    """
+
+    def __init__(self):
+        self._targets = {}
+
+    @abstractmethod
+    def write(self, record: dict) -> None:
+        """Stores one output record"""
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.flush()
+
+    def emit(self, crew: str, output_file: str, text: str, run_id: str = None, task: str = None) -> dict:
+        record = {
+            'run_id': run_id or new_run_id(),
+            'crew': crew,
+            'task': task,
+            'output_file': output_file,
+            'written_at': time.time(),
+            'text': text,
+        }
+        self.write(record)
+        return record
+
+    def targets(self, crew) -> list:
+        """(task, original output_file) pairs of an attached crew"""
+        return self._targets.get(id(crew), [])
+
+    def attach(self, name: str, crew) -> None:
+        targets = [(task, task.output_file) for task in crew.tasks if getattr(task, 'output_file', None)]
+        for task, _ in targets:
+            task.output_file = None
+        self._targets[id(crew)] = targets
+
+        def emit_outputs(result):
+            run_id = new_run_id()
+            for task, output_file in targets:
+                output = getattr(task, 'output', None)
+                if output is not None:
+                    self.emit(name, output_file, output.raw, run_id, getattr(task, 'name', None))
+            return result
+
+        crew.after_kickoff_callbacks = list(crew.after_kickoff_callbacks or []) + [emit_outputs]
+
+
+class FileSink(OutputSink):
+    """Writes every output to its own file, e.g. outputs/HubSpotContactTrigger/contact_summary-<run id>.md
+
+    Files are written to a temporary name and renamed, so readers never see a
+    partial summary.
+    """
+
+    def __init__(self, directory: str = 'outputs', layout: str = '{crew}/{stem}-{run_id}{suffix}'):
+        super().__init__()
+        self.directory = directory
+        self.layout = layout
+
+    def path_for(self, record: dict) -> str:
+        stem, suffix = os.path.splitext(os.path.basename(record['output_file']))
+        return os.path.join(self.directory, self.layout.format(stem=stem, suffix=suffix, **record))
+
+    def write(self, record: dict) -> None:
+        path = self.path_for(record)
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        partial = f'{path}.{uuid.uuid4().hex[:8]}.tmp'
+        with open(partial, 'w', encoding='utf-8') as output:
+            output.write(record['text'])
+        os.replace(partial, path)
+
+
+class JsonlSink(OutputSink):
+    """Appends one JSON line per output to a single file
+
+    With ``batch_size`` > 1 records are buffered and written together; with
+    ``compress=True`` each batch is appended as its own gzip member, which
+    ``gzip.open(path, 'rt')`` reads back as one continuous stream. Call
+    ``flush()`` or ``close()`` before reading a batched sink.
+    """
+
+    def __init__(self, path: str = 'trigger_outputs.jsonl', batch_size: int = 1, compress: bool = False):
+        super().__init__()
+        self.path = path
+        self.batch_size = batch_size
+        self.compress = compress
+        self._buffer = []
+        self._lock = threading.Lock()
+
+    def write(self, record: dict) -> None:
+        with self._lock:
+            self._buffer.append(json.dumps(record, ensure_ascii=False) + '\n')
+            if len(self._buffer) >= self.batch_size:
+                self._flush_locked()
+
+    def flush(self) -> None:
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self) -> None:
+        if not self._buffer:
+            return
+        data = ''.join(self._buffer).encode('utf-8')
+        self._buffer = []
+        with open(self.path, 'ab') as output:
+            output.write(gzip.compress(data) if self.compress else data)
+
+
+class SqliteSink(OutputSink):
+    """Inserts every output as a row of an append-only SQLite table"""
+
+    def __init__(self, path: str = 'trigger_outputs.sqlite3', table: str = 'outputs'):
+        super().__init__()
+        self.table = table
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        if path != ':memory:':
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.execute('PRAGMA synchronous=NORMAL')
+        self._db.execute(
+            f'CREATE TABLE IF NOT EXISTS {table} (run_id TEXT NOT NULL, crew TEXT NOT NULL, task TEXT, '
+            'output_file TEXT, written_at REAL NOT NULL, text TEXT NOT NULL)'
+        )
+        self._db.execute(f'CREATE INDEX IF NOT EXISTS {table}_crew ON {table} (crew, written_at)')
+        self._db.commit()
+
+    def write(self, record: dict) -> None:
+        with self._lock:
+            self._db.execute(
+                f'INSERT INTO {self.table} (run_id, crew, task, output_file, written_at, text) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (record['run_id'], record['crew'], record['task'], record['output_file'],
+                 record['written_at'], record['text']),
+            )
+            self._db.commit()
+
+    def latest(self, crew: str, limit: int = 10) -> list:
+        with self._lock:
+            rows = self._db.execute(
+                f'SELECT run_id, task, output_file, written_at, text FROM {self.table} '
+                'WHERE crew = ? ORDER BY written_at DESC LIMIT ?', (crew, limit)
+            ).fetchall()
+        return [dict(zip(('run_id', 'task', 'output_file', 'written_at', 'text'), row)) for row in rows]
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,111 @@
+from fnmatch import fnmatchcase
+
+from trigger_utils.hubspot import object_type
+from trigger_utils.store import StateStore
+
+
+# Properties HubSpot rewrites on its own (tracking timestamps, counters of page
+# views, audit fields); a change limited to these never needs a new analysis.
+IGNORABLE_PROPERTIES = (
+    'hs_lastmodifieddate', 'lastmodifieddate', 'hs_analytics_*', 'hs_*_timestamp', 'hs_time_in_*',
+    'hs_v2_*', 'hs_object_source*', 'hs_updated_by_user_id', 'hs_last_sales_activity_*', 'hs_notes_last_activity',
+    'notes_last_*', 'hs_email_last_send_date', 'hs_email_sends_since_last_engagement', 'hs_latest_source*',
+    'hs_ip_timezone', 'ip_*', 'hs_social_*', 'hs_marketable_*', 'hs_is_unworked', 'hs_count_is_*',
+    'hs_sequences_*', 'hs_prospecting_agent_*', 'hs_currently_enrolled_in_prospecting_agent',
+)
+
+# Identity fields sent with every change set so the crew knows which record changed
+CONTEXT_PROPERTIES = {
+    'contact': ('firstname', 'lastname', 'email', 'company', 'jobtitle', 'lifecyclestage'),
+    'company': ('name', 'domain', 'industry', 'lifecyclestage'),
+    'deal': ('dealname', 'dealstage', 'amount', 'closedate', 'pipeline'),
+}
+
+
+def diff_properties(before: dict, after: dict) -> dict:
+    """{name: {'before': old, 'after': new}} for every property that was added, removed or changed"""
+    changes = {}
+    for name in before.keys() | after.keys():
+        old, new = before.get(name), after.get(name)
+        if old != new:
+            changes[name] = {'before': old, 'after': new}
+    return changes
+
+
+class RecordSnapshots:
+    """Last seen properties of each HubSpot record, keyed on object type and id
+
+    ``changes(record)`` compares an incoming record with its snapshot and splits
+    the property diff into significant and ignorable changes; ``remember(record)``
+    replaces the snapshot once the event has been handled.
+    """
+
+    def __init__(self, path: str = ':memory:', ttl: float = 90 * 24 * 3600, max_entries: int = 200_000,
+                 ignorable=IGNORABLE_PROPERTIES, store=None):
+        if store is None:
+            store = StateStore(path, table='hubspot_snapshots', ttl=ttl, max_entries=max_entries)
+        self.store = store
+        self.ignorable = tuple(ignorable)
+
+    @staticmethod
+    def key(record: dict) -> str:
+        return f"{object_type(record.get('properties') or {})}:{record.get('id')}"
+
+    def is_ignorable(self, name: str) -> bool:
+        return any(fnmatchcase(name, pattern) for pattern in self.ignorable)
+
+    def changes(self, record: dict):
+        """Returns None for a record seen for the first time, else its change set
+
+        The change set holds ``significant`` and ``ignored`` property diffs and
+        ``stale`` when the event is older than the stored snapshot (an
+        out-of-order delivery).
+        """
+        snapshot = self.store.get(self.key(record))
+        if snapshot is None:
+            return None
+        diff = diff_properties(snapshot['properties'], record.get('properties') or {})
+        significant = {name: change for name, change in diff.items() if not self.is_ignorable(name)}
+        stale = bool(snapshot.get('updatedAt') and record.get('updatedAt')
+                     and record['updatedAt'] < snapshot['updatedAt'])
+        return {
+            'since': snapshot.get('updatedAt'),
+            'significant': significant,
+            'ignored': sorted(name for name in diff if name not in significant),
+            'stale': stale,
+        }
+
+    def remember(self, record: dict) -> None:
+        if record.get('id') is None:
+            return
+        key = self.key(record)
+        snapshot = self.store.get(key)
+        if snapshot and snapshot.get('updatedAt') and (record.get('updatedAt') or '') < snapshot['updatedAt']:
+            return
+        self.store.put(key, {'updatedAt': record.get('updatedAt'), 'properties': record.get('properties') or {}})
+
+
+def skip_note(record: dict, changes: dict) -> str:
+    """Result returned instead of a crew run when an update carries nothing to analyze"""
+    kind = object_type(record.get('properties') or {}) or 'record'
+    if changes['stale']:
+        return f"HubSpot {kind} {record.get('id')}: out-of-order update from {record.get('updatedAt')}, skipped\n"
+    fields = ', '.join(changes['ignored'][:5]) + (' …' if len(changes['ignored']) > 5 else '')
+    return f"HubSpot {kind} {record.get('id')}: only tracking fields changed ({fields or 'none'}), skipped\n"
+
+
+def change_document(document: dict, changes: dict) -> dict:
+    """Rewrites a (projected) HubSpot payload to the changed properties plus identity context"""
+    record = document['result']
+    properties = record.get('properties') or {}
+    context = CONTEXT_PROPERTIES.get(object_type(properties), ())
+    return {
+        **document,
+        'result': {
+            **record,
+            'properties': {name: properties[name] for name in context if name in properties},
+        },
+        'changes': changes['significant'],
+        'previousUpdatedAt': changes['since'],
+    }
+
@@ -0,0 +1,160 @@
+import json
+import sqlite3
+import sys
+import threading
+import time
+
+
+class StateStore:
+    """Small JSON key/value store on SQLite with optional TTL and LRU bounds
+
+    The default ':memory:' path keeps state for the current process only; pass a
+    file path to persist it across runs.
+
+    Writes stay cheap at any table size: the row count is kept in memory and
+    least recently used rows are evicted in batches of ``evict_batch`` once it
+    exceeds ``max_entries``, expired rows are swept through an index at most
+    every ``sweep_interval`` seconds (reads never return them), and read access
+    times are buffered and written together with the next write.
+    """
+
+    def __init__(self, path: str = ':memory:', table: str = 'state', ttl: float = None,
+                 max_entries: int = None, clock=time.time, evict_batch: int = None, sweep_interval: float = None,
+                 touch_batch: int = 256):
+        self.table = table
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.clock = clock
+        self.evict_batch = evict_batch or (max(1, max_entries // 100) if max_entries else 1)
+        self.sweep_interval = sweep_interval if sweep_interval is not None else (min(ttl / 10, 60.0) if ttl else None)
+        self.touch_batch = touch_batch
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        if path != ':memory:':
+            # WAL without a sync per commit keeps lookups well under a millisecond on disk
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.execute('PRAGMA synchronous=NORMAL')
+        self._db.execute(
+            f'CREATE TABLE IF NOT EXISTS {table} '
+            '(key TEXT PRIMARY KEY, value TEXT NOT NULL, written_at REAL NOT NULL, accessed_at REAL NOT NULL)'
+        )
+        self._db.execute(f'CREATE INDEX IF NOT EXISTS {table}_accessed ON {table} (accessed_at)')
+        self._db.execute(f'CREATE INDEX IF NOT EXISTS {table}_written ON {table} (written_at)')
+        self._db.commit()
+        self._count = self._db.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+        self._touched = {}
+        self._swept_at = float('-inf')
+
+    def _expired(self, written_at: float, now: float) -> bool:
+        return self.ttl is not None and now - written_at > self.ttl
+
+    def get(self, key: str, default=None):
+        now = self.clock()
+        with self._lock:
+            row = self._db.execute(f'SELECT value, written_at FROM {self.table} WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                return default
+            if self._expired(row[1], now):
+                self._count -= self._db.execute(f'DELETE FROM {self.table} WHERE key = ?', (key,)).rowcount
+                self._touched.pop(key, None)
+                self._db.commit()
+                return default
+            self._touched[key] = now
+            if len(self._touched) >= self.touch_batch:
+                self._flush_touched()
+                self._db.commit()
+            return json.loads(row[0])
+
+    def put(self, key: str, value) -> None:
+        now = self.clock()
+        with self._lock:
+            exists = self._db.execute(f'SELECT 1 FROM {self.table} WHERE key = ?', (key,)).fetchone()
+            self._db.execute(
+                f'INSERT OR REPLACE INTO {self.table} (key, value, written_at, accessed_at) VALUES (?, ?, ?, ?)',
+                (key, json.dumps(value, ensure_ascii=False), now, now),
+            )
+            self._touched.pop(key, None)
+            self._count += 0 if exists else 1
+            self._evict(now)
+            self._db.commit()
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._count -= self._db.execute(f'DELETE FROM {self.table} WHERE key = ?', (key,)).rowcount
+            self._touched.pop(key, None)
+            self._db.commit()
+
+    def _flush_touched(self) -> None:
+        if self._touched:
+            self._db.executemany(f'UPDATE {self.table} SET accessed_at = ? WHERE key = ?',
+                                 [(accessed_at, key) for key, accessed_at in self._touched.items()])
+            self._touched.clear()
+
+    def _evict(self, now: float) -> None:
+        if self.ttl is not None and now - self._swept_at >= self.sweep_interval:
+            self._swept_at = now
+            self._count -= self._db.execute(
+                f'DELETE FROM {self.table} WHERE written_at < ?', (now - self.ttl,)
+            ).rowcount
+        if self.max_entries is not None and self._count > self.max_entries:
+            self._flush_touched()
+            self._db.execute(
+                f'DELETE FROM {self.table} WHERE key IN (SELECT key FROM {self.table} ORDER BY accessed_at LIMIT ?)',
+                (self._count - self.max_entries + self.evict_batch - 1,),
+            )
+            # Recount so other processes writing to the same file can't make the count drift
+            self._count = self._db.execute(f'SELECT COUNT(*) FROM {self.table}').fetchone()[0]
+
+    def flush(self) -> None:
+        """Writes buffered read access times"""
+        with self._lock:
+            self._flush_touched()
+            self._db.commit()
+
+    def keys(self) -> list:
+        """Keys that have not expired, least recently used first"""
+        horizon = self.clock() - self.ttl if self.ttl is not None else float('-inf')
+        with self._lock:
+            self._flush_touched()
+            self._db.commit()
+            rows = self._db.execute(
+                f'SELECT key FROM {self.table} WHERE written_at >= ? ORDER BY accessed_at', (horizon,)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def __len__(self) -> int:
+        """Stored rows, including expired ones not swept yet"""
+        with self._lock:
+            return self._count
+
+    def close(self) -> None:
+        with self._lock:
+            self._flush_touched()
+            self._db.commit()
+            self._db.close()
+
+
+def benchmark(rows: int = 20_000, max_entries: int = 10_000, path: str = ':memory:') -> dict:
+    """Times filling a bounded store past its cap, then reading every live key"""
+    store = StateStore(path, table='bench', ttl=3600, max_entries=max_entries)
+    started = time.perf_counter()
+    for n in range(rows):
+        store.put(f'key-{n}', {'n': n})
+    put_seconds = time.perf_counter() - started
+    started = time.perf_counter()
+    for n in range(rows - max_entries, rows):
+        store.get(f'key-{n}')
+    get_seconds = time.perf_counter() - started
+    report = {'rows': rows, 'stored': len(store), 'put_us': put_seconds / rows * 1e6,
+              'get_us': get_seconds / max_entries * 1e6}
+    store.close()
+    return report
+
+
+if __name__ == "__main__":
+    # python -m trigger_utils.store [rows] [max_entries] [path]
+    args = sys.argv[1:]
+    report = benchmark(int(args[0]) if args else 20_000, int(args[1]) if len(args) > 1 else 10_000,
+                       args[2] if len(args) > 2 else ':memory:')
+    print(f"{report['rows']:,} puts ({report['stored']:,} kept): {report['put_us']:.1f} us/put,"
+          f" {report['get_us']:.1f} us/get")
@@ -0,0 +1,38 @@
+from trigger_utils.store import StateStore
+
+
+class ThreadStore:
+    """Remembers the latest summary of each Gmail thread so updates only send the new messages"""
+
+    def __init__(self, path: str = ':memory:', ttl: float = 30 * 24 * 3600, max_entries: int = 50_000,
+                 max_message_ids: int = 200, store=None):
+        if store is None:
+            store = StateStore(path, table='gmail_threads', ttl=ttl, max_entries=max_entries)
+        self.store = store
+        self.max_message_ids = max_message_ids
+
+    def get(self, thread_id: str):
+        return self.store.get(thread_id) if thread_id else None
+
+    def incremental_document(self, document: dict) -> dict:
+        """Returns the document to analyze: the message itself, or previous summary plus delta"""
+        thread = self.get(document.get('threadId'))
+        if thread is None:
+            return document
+        return {
+            'threadId': document['threadId'],
+            'previousSummary': thread['summary'],
+            'summarizedMessages': len(thread['messageIds']),
+            'newMessages': [document],
+        }
+
+    def is_summarized(self, document: dict) -> bool:
+        thread = self.get(document.get('threadId'))
+        return thread is not None and document.get('id') in thread['messageIds']
+
+    def remember(self, thread_id: str, message_id: str, summary: str) -> None:
+        if not thread_id:
+            return
+        thread = self.get(thread_id) or {'messageIds': []}
+        message_ids = [mid for mid in thread['messageIds'] if mid != message_id] + [message_id]
+        self.store.put(thread_id, {'summary': summary, 'messageIds': message_ids[-self.max_message_ids:]})